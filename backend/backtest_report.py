@@ -0,0 +1,208 @@
+"""
+Headless backtest results with optional report writers.
+
+BacktestResult holds the metrics, the per-bar equity curve and the closed trades of
+one backtest. Nothing here is printed or plotted unless asked for: the PNG writer
+renders off-screen on a matplotlib Agg canvas (no pyplot, no GUI backend) and
+matplotlib is imported only inside it, as is the Parquet engine inside pandas.
+Batch and CI runs that only need metrics, CSV or JSON never import matplotlib.
+
+Run `python backtest_report.py` to measure module import and per-run time.
+"""
+import json
+import math
+import os
+import numpy as np
+
+
+class BacktestResult:
+    """
+    Metrics, equity curve (DataFrame indexed like the input prices) and trades of one backtest.
+    """
+
+    def __init__(self, params, metrics, equity_curve, trades):
+        self.params = params
+        self.metrics = metrics
+        self.equity_curve = equity_curve
+        self.trades = trades
+
+    def summary(self):
+        """
+        Returns the human-readable report that backtest_smma_cross prints.
+        """
+        curve = self.equity_curve
+        m = self.metrics
+        lines = [
+            "=" * 50,
+            f"SMMA {self.params['fast_period']}/{self.params['slow_period']} Crossover Strategy Backtest",
+            "=" * 50,
+            f"Period: {curve.index[0].date()} to {curve.index[-1].date()}",
+            f"Initial Capital: ${self.params['initial_capital']:,.2f}",
+            "",
+            "Performance Metrics:",
+            f"  Strategy Return: {m['total_return']:.2f}%",
+            f"  Buy & Hold Return: {m['market_return']:.2f}%",
+            f"  Final Portfolio Value: ${curve['Portfolio_Value'].iloc[-1]:,.2f}",
+            f"  Number of Trades: {m['num_trades']}",
+            f"  Win Rate: {m['win_rate']:.2f}%",
+            f"  Sharpe Ratio: {m['sharpe']:.2f}",
+            f"  Max Drawdown: {m['max_drawdown']:.2f}%",
+            "=" * 50,
+        ]
+        return "\n".join(lines)
+
+    def to_json(self, path):
+        """
+        Writes params and metrics as JSON (NaN becomes null).
+        """
+        def clean(value):
+            value = value.item() if isinstance(value, np.generic) else value
+            return None if isinstance(value, float) and math.isnan(value) else value
+        payload = {
+            'params': {k: clean(v) for k, v in self.params.items()},
+            'metrics': {k: clean(v) for k, v in self.metrics.items()},
+        }
+        with open(path, 'w') as f:
+            json.dump(payload, f, indent=2)
+        return path
+
+    def to_csv(self, path, trades_path=None):
+        """
+        Writes the equity curve (and optionally the trades) as CSV.
+        """
+        self.equity_curve.to_csv(path)
+        if trades_path:
+            self.trades.to_csv(trades_path, index=False)
+        return path
+
+    def to_parquet(self, path):
+        """
+        Writes the equity curve as Parquet; needs pyarrow or fastparquet installed.
+        """
+        self.equity_curve.to_parquet(path)
+        return path
+
+    def draw(self, figure):
+        """
+        Draws the price/SMMA/signal, cumulative-return and drawdown panels onto a matplotlib Figure.
+        """
+        curve = self.equity_curve
+        fast_period, slow_period = self.params['fast_period'], self.params['slow_period']
+        ax1, ax2, ax3 = figure.subplots(3, 1, sharex=True)
+        buy_signals = curve[curve['Position'] == 2]
+        sell_signals = curve[curve['Position'] == -2]
+
+        # Price and SMMAs
+        ax1.plot(curve.index, curve['Close'], label='Close Price', linewidth=1.5)
+        ax1.plot(curve.index, curve['SMMA_fast'], label=f'SMMA {fast_period}', linewidth=1)
+        ax1.plot(curve.index, curve['SMMA_slow'], label=f'SMMA {slow_period}', linewidth=1)
+        ax1.scatter(buy_signals.index, buy_signals['Close'],
+                    color='green', marker='^', s=100, label='Buy', zorder=5)
+        ax1.scatter(sell_signals.index, sell_signals['Close'],
+                    color='red', marker='v', s=100, label='Sell', zorder=5)
+        ax1.set_ylabel('Price')
+        ax1.set_title(f'SMMA {fast_period}/{slow_period} Crossover Strategy')
+        ax1.legend()
+        ax1.grid(alpha=0.3)
+
+        # Cumulative returns
+        ax2.plot(curve.index, curve['Cumulative_Strategy'], label='Strategy', linewidth=2)
+        ax2.plot(curve.index, curve['Cumulative_Market'], label='Buy & Hold', linewidth=2, alpha=0.7)
+        ax2.set_ylabel('Cumulative Returns')
+        ax2.legend()
+        ax2.grid(alpha=0.3)
+
+        # Drawdown
+        ax3.fill_between(curve.index, curve['Drawdown'] * 100, 0, alpha=0.3, color='red')
+        ax3.set_ylabel('Drawdown (%)')
+        ax3.set_xlabel('Date')
+        ax3.grid(alpha=0.3)
+
+        figure.tight_layout()
+        return figure
+
+    def to_png(self, path, dpi=100):
+        """
+        Renders the report off-screen with the Agg canvas and saves it as PNG.
+        """
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        figure = Figure(figsize=(14, 10))
+        FigureCanvasAgg(figure)
+        self.draw(figure)
+        figure.savefig(path, dpi=dpi)
+        return path
+
+    def show(self):
+        """
+        Displays the report in an interactive matplotlib window (blocks until it is closed).
+        """
+        import matplotlib.pyplot as plt
+
+        self.draw(plt.figure(figsize=(14, 10)))
+        plt.show()
+
+    def write_reports(self, directory, formats=('json', 'csv')):
+        """
+        Writes the requested reports ('json', 'csv', 'parquet', 'png') into directory; returns their paths.
+        """
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, f"smma_{self.params['fast_period']}_{self.params['slow_period']}")
+        writers = {
+            'json': lambda: self.to_json(f"{stem}_metrics.json"),
+            'csv': lambda: self.to_csv(f"{stem}_equity.csv", f"{stem}_trades.csv"),
+            'parquet': lambda: self.to_parquet(f"{stem}_equity.parquet"),
+            'png': lambda: self.to_png(f"{stem}.png"),
+        }
+        return [writers[fmt]() for fmt in formats]
+
+
+if __name__ == '__main__':
+    import subprocess
+    import sys
+    import tempfile
+    import time
+
+    def import_seconds(statement):
+        code = f"import time; start = time.perf_counter(); {statement}; print(time.perf_counter() - start)"
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        return float(output.stdout.strip())
+
+    modules = subprocess.run(
+        [sys.executable, '-c', "import sys, smma_strategy; print('matplotlib' in sys.modules)"],
+        capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    ).stdout.strip()
+    print(f"import smma_strategy: {import_seconds('import smma_strategy') * 1000:.0f} ms "
+          f"(matplotlib imported: {modules})")
+    try:
+        print(f"import matplotlib.pyplot (previously paid by every run): "
+              f"{import_seconds('import matplotlib.pyplot') * 1000:.0f} ms")
+    except subprocess.CalledProcessError:
+        print("import matplotlib.pyplot: matplotlib is not installed")
+
+    import pandas as pd
+    from smma_strategy import generate_sample_data, run_backtest
+
+    rng = np.random.default_rng(7)
+    minute_bars = 252 * 375
+    samples = {
+        'daily': generate_sample_data(),
+        '1-minute, 1y': pd.DataFrame(
+            {'Close': 20000 * np.exp(np.cumsum(rng.normal(0, 0.0005, minute_bars)))},
+            index=pd.date_range('2024-01-01 09:15', periods=minute_bars, freq='min'),
+        ),
+    }
+    for label, df in samples.items():
+        timings = []
+        for _ in range(2):
+            start = time.perf_counter()
+            result = run_backtest(df)
+            timings.append(time.perf_counter() - start)
+        with tempfile.TemporaryDirectory() as directory:
+            start = time.perf_counter()
+            result.write_reports(directory)
+            report_time = time.perf_counter() - start
+        print(f"{label} ({len(df):,} bars): run_backtest first {timings[0] * 1000:.1f} ms, "
+              f"then {timings[1] * 1000:.1f} ms; JSON+CSV reports {report_time * 1000:.1f} ms")
@@ -0,0 +1,131 @@
+"""
+Parallel parameter sweep for the SMMA crossover strategy.
+
+Every distinct SMMA period in the grid is computed once in the parent process.
+The close prices and the SMMA matrix are placed in one
+multiprocessing.shared_memory block, and pool workers attach to it by name, so
+each (fast, slow) pair costs only the crossover kernel and nothing is pickled
+apart from the small metrics dicts that come back. Capital settings scale the
+final portfolio value only, so each pair is backtested once for all of them.
+
+Run `python backtest_sweep.py --fast 2:22 --slow 10:210:10` to sweep a 20x20 grid
+over five years of sample 1-minute bars.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from smma_strategy import crossover_backtest, smma_array
+from logger_config import get_logger
+
+# Get logger instance
+logger = get_logger(__name__)
+
+SWEEP_WORKERS = int(os.environ.get("SWEEP_WORKERS", os.cpu_count() or 1))
+# (fast, slow) pairs handed to a worker per task
+SWEEP_CHUNK_SIZE = 8
+
+# Set in each worker by _attach: (shared memory handle, close prices, {period: row of the SMMA matrix})
+_shared = None
+
+
+def _attach(name, bars, periods):
+    global _shared
+    block = shared_memory.SharedMemory(name=name)
+    matrix = np.ndarray((len(periods) + 1, bars), dtype=np.float64, buffer=block.buf)
+    _shared = (block, matrix[0], {period: matrix[i + 1] for i, period in enumerate(periods)})
+
+
+def _run_pairs(pairs, periods_per_year):
+    _, close, smma = _shared
+    results = []
+    for fast, slow in pairs:
+        result = crossover_backtest(close, smma[fast], smma[slow], periods_per_year)
+        results.append({'fast_period': fast, 'slow_period': slow, 'final_multiple': result['cumulative_strategy'][-1],
+                        **result['metrics']})
+    return results
+
+
+def parameter_pairs(fast_periods, slow_periods):
+    """
+    Returns the (fast, slow) pairs of the grid where the fast period is shorter than the slow one.
+    """
+    return [(fast, slow) for fast in fast_periods for slow in slow_periods if fast < slow]
+
+
+def sweep(close, fast_periods, slow_periods, capitals=(10000,), workers=SWEEP_WORKERS,
+          periods_per_year=252, rank_by='sharpe'):
+    """
+    Backtests every (fast, slow) pair over `close` across a process pool and returns a metrics
+    DataFrame with one row per (pair, capital), ranked by `rank_by` (best first).
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    pairs = parameter_pairs(fast_periods, slow_periods)
+    if not pairs:
+        raise ValueError("The grid has no pair with fast_period < slow_period")
+    periods = sorted({period for pair in pairs for period in pair})
+
+    block = shared_memory.SharedMemory(create=True, size=(len(periods) + 1) * close.nbytes)
+    try:
+        matrix = np.ndarray((len(periods) + 1, len(close)), dtype=np.float64, buffer=block.buf)
+        matrix[0] = close
+        for i, period in enumerate(periods):
+            matrix[i + 1] = smma_array(close, period)
+
+        chunks = [pairs[i:i + SWEEP_CHUNK_SIZE] for i in range(0, len(pairs), SWEEP_CHUNK_SIZE)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                 initargs=(block.name, len(close), periods)) as pool:
+            rows = [row for chunk in pool.map(_run_pairs, chunks, [periods_per_year] * len(chunks)) for row in chunk]
+        del matrix
+    finally:
+        block.close()
+        block.unlink()
+
+    table = pd.DataFrame(rows)
+    table = table.merge(pd.DataFrame({'initial_capital': list(capitals)}), how='cross')
+    table['final_value'] = table['initial_capital'] * table.pop('final_multiple')
+    table = table.sort_values([rank_by, 'total_return'], ascending=False, ignore_index=True)
+    table.insert(0, 'rank', table.index + 1)
+    logger.info(f"Swept {len(pairs)} SMMA pairs over {len(close)} bars with {workers} workers")
+    return table
+
+
+def parse_range(value):
+    """
+    Parses 'start:stop[:step]' (stop exclusive) or a comma-separated list of ints.
+    """
+    if ':' in value:
+        return list(range(*(int(part) for part in value.split(':'))))
+    return [int(part) for part in value.split(',')]
+
+
+if __name__ == '__main__':
+    from smma_strategy import load_data_from_csv
+
+    parser = argparse.ArgumentParser(description="Sweep SMMA crossover parameters in parallel")
+    parser.add_argument('--csv', help="OHLCV CSV (Date, Open, High, Low, Close, Volume); sample data if omitted")
+    parser.add_argument('--years', type=int, default=5, help="Years of sample 1-minute bars")
+    parser.add_argument('--fast', type=parse_range, default=parse_range('2:22'))
+    parser.add_argument('--slow', type=parse_range, default=parse_range('10:210:10'))
+    parser.add_argument('--capital', type=parse_range, default=[10000])
+    parser.add_argument('--workers', type=int, default=SWEEP_WORKERS)
+    parser.add_argument('--rank-by', default='sharpe')
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.csv:
+        prices = load_data_from_csv(args.csv)['Close'].to_numpy()
+    else:
+        rng = np.random.default_rng(7)
+        prices = 20000 * np.exp(np.cumsum(rng.normal(0, 0.0005, args.years * 252 * 375)))
+
+    start = time.perf_counter()
+    results = sweep(prices, args.fast, args.slow, args.capital, workers=args.workers, rank_by=args.rank_by)
+    elapsed = time.perf_counter() - start
+    pair_count = len(parameter_pairs(args.fast, args.slow))
+    print(f"{pair_count} pairs x {len(args.capital)} capital settings over {len(prices):,} bars "
+          f"in {elapsed:.2f}s with {args.workers} workers")
+    print(results.head(args.top).to_string(index=False, float_format=lambda v: f"{v:.2f}"))
@@ -0,0 +1,214 @@
+"""
+Pub/sub broadcast of the per-cycle snapshot to streaming clients (SSE and WebSocket).
+
+poll_data publishes one snapshot per cycle. The broadcaster diffs it against the
+previous one and encodes the message once, then every subscriber's queue gets the
+same string (encoded with json_encoding.encode), so the cost of a cycle does not grow with the number of clients apart
+from the queue puts. Messages are JSON:
+
+    {"type": "snapshot", "version": n, "data": {...}}
+    {"type": "delta", "version": n, "base": n - 1, "changed": [[path, value], ...], "removed": [path, ...]}
+
+A path is the list of keys from the snapshot root. Dicts are diffed key by key and any
+other value is replaced whole, so keyed collections (the option chain is keyed by
+instrument_key) only send the contracts and fields that moved. New subscribers
+start with a full snapshot. A subscriber whose queue fills up (a slow client) has
+its backlog dropped and is resynced with a full snapshot.
+
+Run `python broadcast.py` to measure fan-out cost and message sizes.
+"""
+import asyncio
+import os
+import threading
+from json_encoding import encode
+from logger_config import get_logger
+
+# Get logger instance
+logger = get_logger(__name__)
+
+# Messages buffered per subscriber before it is resynced with a full snapshot
+SNAPSHOT_QUEUE_SIZE = int(os.environ.get("SNAPSHOT_QUEUE_SIZE", 8))
+# Seconds without a message after which subscribe() yields None so streams can send a keepalive
+SNAPSHOT_KEEPALIVE = float(os.environ.get("SNAPSHOT_KEEPALIVE", 15))
+
+
+def diff(old, new, path=()):
+    """
+    Returns (changed, removed): [path, value] pairs and paths that turn `old` into `new`.
+    """
+    changed, removed = [], []
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        if old != new:
+            changed.append([list(path), new])
+        return changed, removed
+    for key, value in new.items():
+        if key not in old:
+            changed.append([list(path) + [key], value])
+        else:
+            sub_changed, sub_removed = diff(old[key], value, path + (key,))
+            changed += sub_changed
+            removed += sub_removed
+    removed += [list(path) + [key] for key in old if key not in new]
+    return changed, removed
+
+
+def apply_delta(snapshot, changed, removed):
+    """
+    Applies a delta to a (JSON-decoded) snapshot in place and returns it.
+    """
+    for path in removed:
+        parent = snapshot
+        for key in path[:-1]:
+            parent = parent[key]
+        parent.pop(path[-1], None)
+    for path, value in changed:
+        if not path:
+            return value
+        parent = snapshot
+        for key in path[:-1]:
+            parent = parent.setdefault(key, {})
+        parent[path[-1]] = value
+    return snapshot
+
+
+class SnapshotBroadcaster:
+    """
+    Holds the latest snapshot and fans encoded snapshot/delta messages out to subscriber queues.
+    Must be used from the event loop thread.
+    """
+
+    def __init__(self, queue_size=SNAPSHOT_QUEUE_SIZE, keepalive=SNAPSHOT_KEEPALIVE):
+        self.queue_size = queue_size
+        self.keepalive = keepalive
+        self.version = 0
+        self.snapshot = None
+        self._full_message = None
+        self._subscribers = set()
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def full_message(self):
+        """
+        Returns the encoded full-snapshot message for the current version (encoded once per version).
+        """
+        if self._full_message is None and self.snapshot is not None:
+            self._full_message = encode({'type': 'snapshot', 'version': self.version, 'data': self.snapshot}).decode()
+        return self._full_message
+
+    def publish(self, snapshot):
+        """
+        Publishes a new snapshot (a JSON-serializable dict) and returns the encoded message sent to subscribers.
+        """
+        previous = self.snapshot
+        self.version += 1
+        self.snapshot = snapshot
+        self._full_message = None
+        if previous is None:
+            message = self.full_message()
+        else:
+            changed, removed = diff(previous, snapshot)
+            message = encode({'type': 'delta', 'version': self.version, 'base': self.version - 1,
+                              'changed': changed, 'removed': removed}).decode()
+        resynced = 0
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self.full_message())
+                resynced += 1
+        logger.debug(f"Published snapshot v{self.version} ({len(message)} bytes) to {len(self._subscribers)} "
+                     f"subscribers, {resynced} resynced")
+        return message
+
+    async def subscribe(self):
+        """
+        Yields encoded messages, starting with the current full snapshot, and None after `keepalive`
+        idle seconds. Close it (contextlib.aclosing) to unsubscribe.
+        """
+        queue = asyncio.Queue(self.queue_size)
+        if self.snapshot is not None:
+            queue.put_nowait(self.full_message())
+        self._subscribers.add(queue)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), self.keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self._subscribers.discard(queue)
+
+
+_broadcaster = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_broadcaster():
+    """
+    Returns the process-wide SnapshotBroadcaster.
+    """
+    global _broadcaster
+    if _broadcaster is None:
+        with _broadcaster_lock:
+            if _broadcaster is None:
+                _broadcaster = SnapshotBroadcaster()
+    return _broadcaster
+
+
+if __name__ == '__main__':
+    import json
+    import random
+    import time
+    from contextlib import aclosing
+
+    def make_snapshot(rng, chain, cycle):
+        # Most cycles move LTP and OI on only part of the chain
+        for contract in chain.values():
+            if rng.random() < 0.5:
+                contract['ltp'] = round(contract['ltp'] + rng.gauss(0, 2), 2)
+                contract['oi'] += rng.randint(-500, 500)
+        call_oi = sum(c['oi'] for c in chain.values() if c['option_type'] == 'CE')
+        put_oi = sum(c['oi'] for c in chain.values() if c['option_type'] == 'PE')
+        return {'version_time': cycle, 'nifty_ltp': 25000 + rng.gauss(0, 20), 'pcr': put_oi / call_oi,
+                'chain': {key: dict(contract) for key, contract in chain.items()}}
+
+    async def bench(subscribers=1000, cycles=50, strikes=100):
+        rng = random.Random(1)
+        chain = {f"NSE_FO|{i}": {'strike_price': 20000 + 50 * (i // 2), 'option_type': 'CE' if i % 2 else 'PE',
+                                 'ltp': 100.0, 'oi': 100000, 'change_in_oi': 0}
+                 for i in range(strikes * 2)}
+        broadcaster = SnapshotBroadcaster(queue_size=cycles + 1)
+        streams = [broadcaster.subscribe() for _ in range(subscribers)]
+        # A subscription registers its queue when first iterated
+        pending = [asyncio.ensure_future(anext(stream)) for stream in streams]
+        await asyncio.sleep(0)
+
+        publish_times, per_client_times, sizes = [], [], []
+        for cycle in range(cycles):
+            snapshot = make_snapshot(rng, chain, cycle)
+            start = time.perf_counter()
+            message = broadcaster.publish(snapshot)
+            publish_times.append(time.perf_counter() - start)
+            sizes.append((len(broadcaster.full_message()), len(message)))
+            # What answering every client separately costs: one encode per client
+            start = time.perf_counter()
+            for _ in range(subscribers):
+                json.dumps(snapshot)
+            per_client_times.append(time.perf_counter() - start)
+
+        await asyncio.gather(*pending)
+        for stream in streams:
+            async with aclosing(stream):
+                pass
+
+        full, delta = zip(*sizes[1:])
+        print(f"{subscribers} subscribers, {strikes * 2}-contract chain: publish median "
+              f"{sorted(publish_times)[len(publish_times) // 2] * 1000:.2f} ms per cycle vs "
+              f"{sorted(per_client_times)[len(per_client_times) // 2] * 1000:.1f} ms encoding per client")
+        print(f"message size: full snapshot {sum(full) / len(full):,.0f} bytes, delta {sum(delta) / len(delta):,.0f} bytes")
+
+    asyncio.run(bench())
@@ -0,0 +1,169 @@
+"""
+High-throughput writer for option snapshots.
+
+Rows are written with SQLAlchemy Core instead of ORM objects: COPY FROM STDIN on
+PostgreSQL, executemany on SQLite and batched multi-row INSERT ... VALUES on any
+other backend. Several poll cycles can be accumulated and flushed together in a
+single transaction.
+
+Run `python bulk_writer.py` to compare it with the ORM add_all path.
+"""
+import csv
+import io
+import os
+import threading
+from sqlalchemy import insert
+import models
+from logger_config import get_logger
+
+# Get logger instance
+logger = get_logger(__name__)
+
+# Number of poll cycles to accumulate before writing them in one transaction
+WRITE_FLUSH_CYCLES = int(os.environ.get("WRITE_FLUSH_CYCLES", 1))
+# Rows per INSERT ... VALUES statement on backends without COPY or fast executemany
+INSERT_BATCH_SIZE = 1000
+
+OPTION_DATA_COLUMNS = (
+    'snapshot_id', 'timestamp', 'instrument_key', 'strike_price', 'option_type', 'ltp', 'oi', 'change_in_oi',
+    'iv', 'delta', 'gamma', 'theta', 'vega',
+)
+
+
+class OptionDataWriter:
+    """
+    Accumulates snapshots with their rows and writes them in bulk.
+    """
+
+    def __init__(self, engine, flush_cycles=WRITE_FLUSH_CYCLES):
+        self.engine = engine
+        self.flush_cycles = flush_cycles
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def add(self, snapshot, rows):
+        """
+        Queues one snapshot (dict of Snapshot columns) with its option rows (dicts of OptionData columns).
+        Flushes once flush_cycles snapshots are pending. Returns the number of rows written.
+        """
+        with self._lock:
+            self._pending.append((snapshot, rows))
+            if len(self._pending) < self.flush_cycles:
+                return 0
+        return self.flush()
+
+    def flush(self):
+        """
+        Writes all pending snapshots and rows in one transaction. Returns the number of rows written.
+        If the write fails the snapshots stay pending and the error is re-raised.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+
+        try:
+            with self.engine.begin() as conn:
+                snapshot_ids = conn.execute(
+                    insert(models.Snapshot).returning(models.Snapshot.id, sort_by_parameter_order=True),
+                    [snapshot for snapshot, _ in pending]
+                ).scalars().all()
+                rows = []
+                for snapshot_id, (snapshot, snapshot_rows) in zip(snapshot_ids, pending):
+                    for row in snapshot_rows:
+                        rows.append({**row, 'snapshot_id': snapshot_id, 'timestamp': snapshot['taken_at']})
+                self._write_rows(conn, rows)
+        except Exception:
+            # The transaction rolled back; keep the snapshots, ahead of any queued meanwhile, for the next flush
+            with self._lock:
+                self._pending[:0] = pending
+            raise
+        logger.info(f"Wrote {len(pending)} snapshots with {len(rows)} option rows")
+        return len(rows)
+
+    def _write_rows(self, conn, rows):
+        if not rows:
+            return
+        dialect = conn.dialect.name
+        if dialect == 'postgresql':
+            self._copy_rows(conn, rows)
+        elif dialect == 'sqlite':
+            conn.execute(insert(models.OptionData), rows)
+        else:
+            for i in range(0, len(rows), INSERT_BATCH_SIZE):
+                conn.execute(insert(models.OptionData).values(rows[i:i + INSERT_BATCH_SIZE]))
+
+    def _copy_rows(self, conn, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(['' if row.get(c) is None else row[c] for c in OPTION_DATA_COLUMNS])
+        buffer.seek(0)
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY option_data ({', '.join(OPTION_DATA_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+        finally:
+            cursor.close()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_option_writer():
+    """
+    Returns the process-wide OptionDataWriter bound to the application database.
+    """
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                import database
+                _writer = OptionDataWriter(database.engine)
+    return _writer
+
+
+if __name__ == '__main__':
+    import datetime
+    import time
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from database import Base
+
+    cycles = 20
+    rows_per_cycle = 2000
+
+    def make_cycle(n):
+        taken_at = datetime.datetime(2024, 1, 1) + datetime.timedelta(minutes=5 * n)
+        snapshot = {'taken_at': taken_at, 'spot': 25000.0, 'expiry': 0}
+        rows = [{'instrument_key': f"NSE_FO|{i}", 'strike_price': 20000.0 + 50 * (i // 2),
+                 'option_type': 'CE' if i % 2 else 'PE', 'ltp': 100.0, 'oi': 1000.0, 'change_in_oi': 0.0}
+                for i in range(rows_per_cycle)]
+        return snapshot, rows
+
+    results = {}
+    for label, flush_cycles in (('orm', None), ('core', 1), ('core x5', 5)):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        data = [make_cycle(n) for n in range(cycles)]
+        start = time.perf_counter()
+        if flush_cycles is None:
+            db = sessionmaker(bind=engine)()
+            for snapshot, rows in data:
+                snap = models.Snapshot(**snapshot)
+                db.add(snap)
+                db.add_all([models.OptionData(snapshot=snap, timestamp=snapshot['taken_at'], **row) for row in rows])
+                db.commit()
+            db.close()
+        else:
+            writer = OptionDataWriter(engine, flush_cycles=flush_cycles)
+            for snapshot, rows in data:
+                writer.add(snapshot, rows)
+            writer.flush()
+        results[label] = time.perf_counter() - start
+
+    total = cycles * rows_per_cycle
+    for label, seconds in results.items():
+        print(f"{label:<8} {seconds:7.3f}s  {total / seconds:>10,.0f} rows/s")
@@ -0,0 +1,154 @@
+"""
+Shared in-process cache for candle responses.
+
+Entries are keyed by (instrument_key, unit, interval, from_date, to_date) and expire
+at the next candle boundary for their timeframe, when a new candle can appear.
+The cache is LRU-bounded, and concurrent misses for the same key are coalesced so
+only one upstream call is made while the others wait for its result.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from logger_config import get_logger
+
+# Get logger instance
+logger = get_logger(__name__)
+
+CANDLE_CACHE_SIZE = int(os.environ.get("CANDLE_CACHE_SIZE", 256))
+# Seconds to wait past a candle boundary so the broker has closed the candle
+CANDLE_CACHE_GRACE = float(os.environ.get("CANDLE_CACHE_GRACE", 2))
+
+UNIT_SECONDS = {'minutes': 60, 'hours': 3600, 'days': 86400}
+
+
+def next_candle_boundary(unit, interval, now):
+    """
+    Returns the epoch time at which the current `interval` `unit` candle closes.
+    Boundaries are in exchange time whatever the server's timezone: intraday candles are
+    aligned to the 09:15 session open like the broker's (and resampler.py's), daily and
+    longer ones to exchange midnight.
+    """
+    from candle_store import EXCHANGE_UTC_OFFSET
+    from resampler import SESSION_OPEN
+
+    if unit in ('weeks', 'months'):
+        unit, interval = 'days', 1
+    step = UNIT_SECONDS[unit] * interval
+    offset = EXCHANGE_UTC_OFFSET.total_seconds()
+    local = now + offset
+    anchor = local - local % UNIT_SECONDS['days'] + (0 if unit == 'days' else SESSION_OPEN)
+    return anchor + ((local - anchor) // step + 1) * step - offset
+
+
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class CandleCache:
+    """
+    LRU cache with candle-aligned TTLs and single-flight miss coalescing.
+    """
+
+    def __init__(self, maxsize=CANDLE_CACHE_SIZE, grace=CANDLE_CACHE_GRACE, clock=time.time):
+        self.maxsize = maxsize
+        self.grace = grace
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get_or_fetch(self, instrument_key, unit, interval, from_date, to_date, fetch):
+        """
+        Returns the cached value for the key, calling fetch() on a miss.
+        fetch() returning None means "nothing usable" and is not cached.
+        """
+        key = (instrument_key, unit, interval, from_date, to_date)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = fetch()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+                if flight.error is None and flight.value is not None:
+                    expires_at = next_candle_boundary(unit, interval, now) + self.grace
+                    self._entries[key] = (flight.value, expires_at)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+            flight.event.set()
+        return flight.value
+
+    def invalidate(self, instrument_key=None):
+        """
+        Drops all entries, or only those for one instrument.
+        """
+        with self._lock:
+            if instrument_key is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == instrument_key]:
+                    del self._entries[key]
+
+    def stats(self):
+        """
+        Returns the cache counters.
+        """
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_candle_cache():
+    """
+    Returns the process-wide CandleCache.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CandleCache()
+    return _cache
@@ -0,0 +1,326 @@
+"""
+Local columnar candle store backing history reads.
+
+Candles are kept as one memory-mapped .npy file per instrument, timeframe and
+exchange day:
+
+    CANDLE_STORE_DIR/<instrument_key>/<unit>_<interval>/<YYYYMMDD>.npy
+
+Each file holds a structured array (ts, open, high, low, close, volume, oi), with
+ts in epoch seconds, oldest first. Reads are date-range queries. Completed days
+that are not on disk yet are fetched from the history API in as few requests as
+the API's range limits allow and written back, including empty files for days
+without trading. A response with no candles at all may be a transient API failure,
+so its days are remembered in memory, read as empty, and fetched once more after
+EMPTY_RETRY_SECONDS; if that reply is empty too they are stored as empty days. Each past
+day is therefore fetched at most twice per process. Fetches for different series run
+concurrently; reads of the same series wait for the one fetch in flight. Today's candles
+are still changing, so they always come from the intraday API through the candle cache
+and are never persisted.
+
+Callers get NumPy arrays directly (read(...)['close']); to_candles() converts back
+to the API's newest-first list-of-lists for JSON responses. read_bars() derives any
+other timeframe from the 1-minute series (see resampler.py), so one upstream stream
+per instrument serves every timeframe; today's bars are resampled incrementally.
+"""
+import datetime
+import os
+import threading
+import time
+import numpy as np
+import upstox_client
+from candle_cache import get_candle_cache
+from logger_config import get_logger
+
+# Get logger instance
+logger = get_logger(__name__)
+
+CANDLE_STORE_DIR = os.environ.get(
+    "CANDLE_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'candle_store')
+)
+CANDLE_DTYPE = np.dtype([
+    ('ts', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'), ('volume', '<i8'), ('oi', '<i8'),
+])
+# Longest date range the history API serves per request, by unit
+MAX_FETCH_DAYS = {'minutes': 28, 'hours': 90, 'days': 3650, 'weeks': 3650, 'months': 3650}
+# Exchange timezone offset of the timestamps the API returns
+EXCHANGE_UTC_OFFSET = datetime.timedelta(hours=5, minutes=30)
+# Seconds before days of an empty reply are fetched again to confirm them as days without trading
+EMPTY_RETRY_SECONDS = float(os.environ.get("EMPTY_RETRY_SECONDS", 900))
+
+
+def to_array(candles):
+    """
+    Converts API candles ([iso_ts, o, h, l, c, v, oi] lists, any order) to a CANDLE_DTYPE array, oldest first.
+    """
+    array = np.empty(len(candles), dtype=CANDLE_DTYPE)
+    if not candles:
+        return array
+    stamps = [c[0] for c in candles]
+    offset = datetime.datetime.fromisoformat(stamps[0]).utcoffset() or datetime.timedelta()
+    array['ts'] = np.array([s[:19] for s in stamps], dtype='datetime64[s]').astype(np.int64) - int(offset.total_seconds())
+    for i, name in enumerate(CANDLE_DTYPE.names[1:], start=1):
+        array[name] = [c[i] if len(c) > i and c[i] is not None else 0 for c in candles]
+    return np.sort(array, order='ts')
+
+
+def to_candles(array):
+    """
+    Converts a CANDLE_DTYPE array back to API-style newest-first candles with exchange-time ISO timestamps.
+    """
+    offset = int(EXCHANGE_UTC_OFFSET.total_seconds())
+    sign = '+' if offset >= 0 else '-'
+    suffix = f"{sign}{abs(offset) // 3600:02d}:{abs(offset) % 3600 // 60:02d}"
+    stamps = np.datetime_as_string((array['ts'] + offset).astype('datetime64[s]'))
+    rows = zip(stamps, array['open'].tolist(), array['high'].tolist(), array['low'].tolist(),
+               array['close'].tolist(), array['volume'].tolist(), array['oi'].tolist())
+    return [[f"{ts}{suffix}", o, h, l, c, v, oi] for ts, o, h, l, c, v, oi in rows][::-1]
+
+
+def exchange_day(ts):
+    """
+    Returns the exchange-local date of epoch-second timestamps, as datetime64[D].
+    """
+    return (np.asarray(ts) + int(EXCHANGE_UTC_OFFSET.total_seconds())).astype('datetime64[s]').astype('datetime64[D]')
+
+
+def _date(value):
+    return value if isinstance(value, datetime.date) else datetime.date.fromisoformat(value)
+
+
+class CandleStore:
+    """
+    Day-partitioned on-disk candles with fetch-on-miss from the history API.
+    """
+
+    def __init__(self, root=CANDLE_STORE_DIR, api=None, today=datetime.date.today, clock=time.monotonic):
+        self.root = root
+        self.api = api
+        self._today = today
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._series_locks = {}
+        # (series_dir, day) -> clock time of a reply with no candles, for days not stored yet
+        self._empty_days = {}
+        self._resamplers = {}
+        self.upstream_calls = 0
+
+    def _api(self, api=None):
+        if api is not None:
+            return api
+        if self.api is None:
+            self.api = upstox_client.HistoryV3Api()
+        return self.api
+
+    def _count_call(self):
+        with self._lock:
+            self.upstream_calls += 1
+
+    def _series_lock(self, series_dir):
+        with self._lock:
+            return self._series_locks.setdefault(series_dir, threading.Lock())
+
+    def _series_dir(self, instrument_key, unit, interval):
+        safe_key = instrument_key.replace('|', '_').replace(' ', '_')
+        return os.path.join(self.root, safe_key, f"{unit}_{interval}")
+
+    def _day_path(self, series_dir, day):
+        return os.path.join(series_dir, f"{day:%Y%m%d}.npy")
+
+    def _write_day(self, series_dir, day, array):
+        path = self._day_path(series_dir, day)
+        tmp_path = path + '.tmp.npy'
+        np.save(tmp_path, array)
+        os.replace(tmp_path, path)
+
+    def _fetch_range(self, instrument_key, unit, interval, series_dir, first, last, kwargs, api=None):
+        """
+        Fetches [first, last] from the history API and stores every day of it, empty days included.
+        Days of a response with no candles at all are only stored once a retry confirms them.
+        """
+        response = self._api(api).get_historical_candle_data1(
+            instrument_key, unit, interval, last.isoformat(), first.isoformat(), **kwargs
+        )
+        self._count_call()
+        array = to_array(getattr(getattr(response, 'data', None), 'candles', None) or [])
+        days = exchange_day(array['ts'])
+        now = self._clock()
+        unconfirmed = 0
+        day = first
+        while day <= last:
+            if len(array) or (series_dir, day) in self._empty_days:
+                self._write_day(series_dir, day, array[days == np.datetime64(day)])
+                self._empty_days.pop((series_dir, day), None)
+            else:
+                # Cannot tell a day without trading from a failed reply until a retry agrees
+                self._empty_days[(series_dir, day)] = now
+                unconfirmed += 1
+            day += datetime.timedelta(days=1)
+        if unconfirmed:
+            logger.info(f"No {interval} {unit} candles for {instrument_key} from {first} to {last}, "
+                        f"retrying in {EMPTY_RETRY_SECONDS:.0f}s before storing them as empty")
+        else:
+            logger.info(f"Stored {len(array)} {interval} {unit} candles for {instrument_key} from {first} to {last}")
+
+    def _fill_missing(self, instrument_key, unit, interval, series_dir, start, end, kwargs, api=None):
+        missing = []
+        retry_before = self._clock() - EMPTY_RETRY_SECONDS
+        day = start
+        while day <= end:
+            if (not os.path.exists(self._day_path(series_dir, day))
+                    and self._empty_days.get((series_dir, day), retry_before) <= retry_before):
+                missing.append(day)
+            day += datetime.timedelta(days=1)
+        if not missing:
+            return
+        os.makedirs(series_dir, exist_ok=True)
+        # Group consecutive missing days into ranges no longer than the API allows
+        max_days = MAX_FETCH_DAYS.get(unit, 28)
+        first = prev = missing[0]
+        for day in missing[1:] + [None]:
+            if day is not None and (day - prev).days == 1 and (day - first).days < max_days:
+                prev = day
+                continue
+            self._fetch_range(instrument_key, unit, interval, series_dir, first, prev, kwargs, api)
+            first = prev = day
+
+    def _today_candles(self, instrument_key, unit, interval, kwargs, api=None):
+        today = self._today().isoformat()
+
+        def fetch():
+            response = self._api(api).get_intra_day_candle_data(instrument_key, unit, interval, **kwargs)
+            self._count_call()
+            return to_array(getattr(getattr(response, 'data', None), 'candles', None) or [])
+        # An overriding client gets its own cache entry so its candles are not served to other callers
+        cache_key = ('store', instrument_key) if api is None else ('store', instrument_key, id(api))
+        return get_candle_cache().get_or_fetch(cache_key, unit, interval, today, today, fetch)
+
+    def read(self, instrument_key, unit, interval, start, end, timeout=None, api=None):
+        """
+        Returns the candles between the start and end dates (inclusive, dates or ISO strings)
+        as a CANDLE_DTYPE array, oldest first. `timeout` applies to each upstream request and
+        `api` overrides the store's HistoryV3Api client for this read.
+        """
+        kwargs = {'_request_timeout': timeout} if timeout else {}
+        start, end = _date(start), _date(end)
+        today = self._today()
+        series_dir = self._series_dir(instrument_key, unit, interval)
+        last_complete = min(end, today - datetime.timedelta(days=1))
+        if start <= last_complete:
+            with self._series_lock(series_dir):
+                self._fill_missing(instrument_key, unit, interval, series_dir, start, last_complete, kwargs, api)
+
+        parts = []
+        day = start
+        while day <= last_complete:
+            path = self._day_path(series_dir, day)
+            # Days of an empty reply awaiting their retry have no file yet
+            part = np.load(path, mmap_mode='r') if os.path.exists(path) else ()
+            if len(part):
+                parts.append(part)
+            day += datetime.timedelta(days=1)
+        if start <= today <= end:
+            parts.append(self._today_candles(instrument_key, unit, interval, kwargs, api))
+        if not parts:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        return np.concatenate(parts)
+
+    def _today_bars(self, instrument_key, unit, interval, kwargs, api=None):
+        from resampler import BarResampler
+
+        today = self._today()
+        minutes = self._today_candles(instrument_key, 'minutes', 1, kwargs, api)
+        with self._lock:
+            day, resampler = self._resamplers.get((instrument_key, unit, interval), (None, None))
+            if day != today:
+                resampler = BarResampler(unit, interval)
+                self._resamplers[(instrument_key, unit, interval)] = (today, resampler)
+            resampler.update(minutes)
+            return resampler.bars()
+
+    def read_bars(self, instrument_key, unit, interval, start, end, timeout=None, api=None):
+        """
+        Like read(), but builds the (unit, interval) bars from the stored 1-minute series.
+        """
+        from resampler import resample
+
+        if (unit, interval) == ('minutes', 1):
+            return self.read(instrument_key, unit, interval, start, end, timeout, api)
+        kwargs = {'_request_timeout': timeout} if timeout else {}
+        start, end = _date(start), _date(end)
+        today = self._today()
+        parts = []
+        last_complete = min(end, today - datetime.timedelta(days=1))
+        if start <= last_complete:
+            parts.append(resample(self.read(instrument_key, 'minutes', 1, start, last_complete, timeout, api),
+                                  unit, interval))
+        if start <= today <= end:
+            parts.append(self._today_bars(instrument_key, unit, interval, kwargs, api))
+        if not parts:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        return np.concatenate(parts)
+
+    def latest_day(self, instrument_key, unit, interval, end, lookback_days=6, timeout=None, api=None):
+        """
+        Returns the (unit, interval) bars of the most recent day with data in the lookback_days before `end`
+        (inclusive), resampled from 1-minute bars.
+        """
+        end = _date(end)
+        array = self.read_bars(instrument_key, unit, interval, end - datetime.timedelta(days=lookback_days), end,
+                               timeout, api)
+        if not len(array):
+            return array
+        days = exchange_day(array['ts'])
+        return array[days == days[-1]]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_candle_store():
+    """
+    Returns the process-wide CandleStore.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = CandleStore()
+    return _store
+
+
+if __name__ == '__main__':
+    import tempfile
+    from fakes import FakeHistoryV3Api, make_candles
+
+    # 60 days of 1-minute bars served by a fake API with 50 ms latency per call
+    end = datetime.datetime.combine(datetime.date.today() - datetime.timedelta(days=1), datetime.time(15, 29))
+    history = make_candles(count=60 * 1440, unit_minutes=1, end=end, seed=5)
+    api = FakeHistoryV3Api(latency=0.05, candles=history)
+    store = CandleStore(root=tempfile.mkdtemp(), api=api)
+    yesterday = datetime.date.today() - datetime.timedelta(days=1)
+    windows = [(yesterday - datetime.timedelta(days=days), yesterday) for days in (5, 10, 30, 30, 5, 10, 30)]
+
+    start = time.perf_counter()
+    for first, last in windows:
+        candles = api.get_historical_candle_data1('NSE_INDEX|Nifty 50', 'minutes', 1, last.isoformat(),
+                                                  first.isoformat()).data.candles
+        closes = np.array([c[4] for c in candles], dtype=float)
+    direct_time = time.perf_counter() - start
+    direct_calls = api.calls
+
+    api.calls = 0
+    start = time.perf_counter()
+    for first, last in windows:
+        closes = store.read('NSE_INDEX|Nifty 50', 'minutes', 1, first, last)['close']
+    store_time = time.perf_counter() - start
+    calls = store.upstream_calls
+    start = time.perf_counter()
+    for first, last in windows:
+        closes = store.read('NSE_INDEX|Nifty 50', 'minutes', 1, first, last)['close']
+    warm_time = time.perf_counter() - start
+    print(f"{len(windows)} overlapping range reads: direct API {direct_time * 1000:.0f} ms / {direct_calls} calls, "
+          f"candle store {store_time * 1000:.0f} ms / {calls} calls, "
+          f"again from disk {warm_time * 1000:.1f} ms / {store.upstream_calls - calls} calls")
@@ -0,0 +1,346 @@
+"""
+Vectorized option-chain analytics: max pain, PCR by moneyness band, OI-weighted
+support/resistance and change-in-OI buildup classification.
+
+An OptionChain holds one expiry as strike-aligned arrays: sorted unique strikes, and
+CE and PE arrays (ltp, oi, change_in_oi) indexed the same way. A side with no
+contract at a strike has zero OI and a NaN LTP. analyze() computes every metric from
+those arrays in one pass with no per-contract Python loop. Max pain uses prefix
+sums, so it is O(strikes) rather than O(strikes^2).
+
+ChainAnalytics keeps the previous cycle's chain per expiry, so buildup compares each
+contract's LTP with the previous cycle. Rows may carry an 'expiry' (epoch ms, as in
+the instrument master) so that one cycle can cover several expiries. Rows without a
+change_in_oi take it from the previous cycle's OI. chain_contracts() and quote_chain()
+build such rows for every listed strike of a set of expiries, which is what the poll
+loop analyzes (not just the stored ATM window).
+
+Run `python chain_analytics.py` to benchmark a 5000-contract, multi-expiry chain
+against a plain-Python implementation.
+"""
+import datetime
+import threading
+import numpy as np
+from instrument_master import expiry_date
+from logger_config import get_logger
+
+# Get logger instance
+logger = get_logger(__name__)
+
+# Upper edges of the |strike / spot - 1| bands PCR is reported for; the last band is open-ended
+PCR_BANDS = (0.01, 0.02, 0.05)
+BUILDUPS = ('long_buildup', 'short_buildup', 'short_covering', 'long_unwinding')
+
+
+class OptionChain:
+    """
+    One expiry's contracts as strike-aligned CE/PE arrays.
+    """
+
+    def __init__(self, strikes, call_ltp, call_oi, call_change_in_oi, put_ltp, put_oi, put_change_in_oi):
+        self.strikes = strikes
+        self.call_ltp = call_ltp
+        self.call_oi = call_oi
+        self.call_change_in_oi = call_change_in_oi
+        self.put_ltp = put_ltp
+        self.put_oi = put_oi
+        self.put_change_in_oi = put_change_in_oi
+
+    def __len__(self):
+        return len(self.strikes)
+
+    @classmethod
+    def from_arrays(cls, strike_price, is_call, ltp, oi, change_in_oi):
+        """
+        Builds the chain from per-contract arrays (any order; a repeated strike/type keeps its last contract).
+        """
+        strikes, index = np.unique(np.asarray(strike_price, dtype=np.float64), return_inverse=True)
+        is_call = np.asarray(is_call, dtype=bool)
+        sides = {}
+        for side, mask in (('call', is_call), ('put', ~is_call)):
+            for name, values, fill in (('ltp', ltp, np.nan), ('oi', oi, 0.0), ('change_in_oi', change_in_oi, 0.0)):
+                column = np.full(len(strikes), fill)
+                column[index[mask]] = np.asarray(values, dtype=np.float64)[mask]
+                sides[f"{side}_{name}"] = column
+        return cls(strikes, **sides)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Builds the chain from ingestion rows (dicts with strike_price, option_type, ltp, oi and change_in_oi).
+        """
+        count = len(rows)
+        return cls.from_arrays(
+            np.fromiter((r['strike_price'] for r in rows), np.float64, count),
+            np.fromiter((r['option_type'] == 'CE' for r in rows), bool, count),
+            np.fromiter((r['ltp'] for r in rows), np.float64, count),
+            np.fromiter((r['oi'] for r in rows), np.float64, count),
+            np.fromiter((np.nan if r.get('change_in_oi') is None else r['change_in_oi'] for r in rows),
+                        np.float64, count),
+        )
+
+    def fill_change_in_oi(self, previous):
+        """
+        Replaces unknown (NaN) change_in_oi with the change from `previous`'s OI, or 0 where that is unknown too.
+        """
+        for side in ('call', 'put'):
+            change = getattr(self, f"{side}_change_in_oi")
+            missing = np.isnan(change)
+            if missing.any():
+                derived = getattr(self, f"{side}_oi") - self.aligned(previous, f"{side}_oi")
+                change[missing] = np.nan_to_num(derived[missing])
+
+    def aligned(self, other, name):
+        """
+        Returns `other`'s column `name` on this chain's strikes, NaN where `other` has no such strike.
+        """
+        result = np.full(len(self.strikes), np.nan)
+        if other is None or not len(other):
+            return result
+        index = np.minimum(np.searchsorted(other.strikes, self.strikes), len(other.strikes) - 1)
+        found = other.strikes[index] == self.strikes
+        result[found] = getattr(other, name)[index[found]]
+        return result
+
+
+def max_pain(chain):
+    """
+    Returns the strike at which option holders' total intrinsic value at expiry is lowest, or None.
+    """
+    if not len(chain):
+        return None
+    strikes, calls, puts = chain.strikes, chain.call_oi, chain.put_oi
+    # Calls struck below K pay calls_i * (K - K_i): K * sum(calls_i) - sum(calls_i * K_i) over i < j
+    call_oi_below = np.concatenate(([0.0], np.cumsum(calls)[:-1]))
+    call_value_below = np.concatenate(([0.0], np.cumsum(calls * strikes)[:-1]))
+    # Puts struck above K pay puts_i * (K_i - K), over i > j
+    put_oi_above = np.concatenate((np.cumsum(puts[::-1])[::-1][1:], [0.0]))
+    put_value_above = np.concatenate((np.cumsum((puts * strikes)[::-1])[::-1][1:], [0.0]))
+    payout = strikes * call_oi_below - call_value_below + put_value_above - strikes * put_oi_above
+    return float(strikes[np.argmin(payout)])
+
+
+def band_labels(bands=PCR_BANDS):
+    edges = [0.0, *bands]
+    return [f"{lo * 100:g}-{hi * 100:g}%" for lo, hi in zip(edges, edges[1:])] + [f">{bands[-1] * 100:g}%"]
+
+
+def pcr_by_band(chain, spot, bands=PCR_BANDS):
+    """
+    Returns {band: {'call_oi', 'put_oi', 'pcr'}} for strikes grouped by their distance from spot.
+    pcr is None for a band without call OI.
+    """
+    band = np.digitize(np.abs(chain.strikes / spot - 1), bands, right=True)
+    call_oi = np.bincount(band, weights=chain.call_oi, minlength=len(bands) + 1)
+    put_oi = np.bincount(band, weights=chain.put_oi, minlength=len(bands) + 1)
+    return {
+        label: {'call_oi': float(c), 'put_oi': float(p), 'pcr': float(p / c) if c > 0 else None}
+        for label, c, p in zip(band_labels(bands), call_oi, put_oi)
+    }
+
+
+def oi_levels(chain, spot):
+    """
+    Returns OI-weighted support (put OI at or below spot) and resistance (call OI at or above spot),
+    plus the single strikes with the most put/call OI on those sides. Missing levels are None.
+    """
+    below = chain.strikes <= spot
+    above = chain.strikes >= spot
+    levels = {}
+    for name, strongest, mask, oi in (('support', 'max_put_oi_strike', below, chain.put_oi),
+                                      ('resistance', 'max_call_oi_strike', above, chain.call_oi)):
+        weights = oi[mask]
+        total = weights.sum()
+        levels[name] = float(np.dot(chain.strikes[mask], weights) / total) if total > 0 else None
+        levels[strongest] = float(chain.strikes[mask][np.argmax(weights)]) if total > 0 else None
+    return levels
+
+
+def classify_buildup(ltp_change, change_in_oi):
+    """
+    Returns each contract's buildup as an index into BUILDUPS, or -1 where price or OI did not move
+    (or the previous LTP is unknown): price and OI up is long buildup, price down and OI up short
+    buildup, price up and OI down short covering, both down long unwinding.
+    """
+    price_up, price_down = ltp_change > 0, ltp_change < 0
+    oi_up, oi_down = change_in_oi > 0, change_in_oi < 0
+    return np.select([price_up & oi_up, price_down & oi_up, price_up & oi_down, price_down & oi_down],
+                     [0, 1, 2, 3], default=-1)
+
+
+def buildup_summary(chain, previous):
+    """
+    Returns {'CE'|'PE': {buildup: {'count', 'oi_change'}}} comparing LTPs with the previous cycle's chain.
+    """
+    summary = {}
+    for option_type, side in (('CE', 'call'), ('PE', 'put')):
+        ltp_change = getattr(chain, f"{side}_ltp") - chain.aligned(previous, f"{side}_ltp")
+        change_in_oi = getattr(chain, f"{side}_change_in_oi")
+        codes = classify_buildup(ltp_change, change_in_oi)
+        counts = np.bincount(codes + 1, minlength=len(BUILDUPS) + 1)[1:]
+        oi_change = np.bincount(codes + 1, weights=change_in_oi, minlength=len(BUILDUPS) + 1)[1:]
+        summary[option_type] = {name: {'count': int(n), 'oi_change': float(oi)}
+                                for name, n, oi in zip(BUILDUPS, counts, oi_change)}
+    return summary
+
+
+def analyze(chain, spot, previous=None):
+    """
+    Returns every chain metric for one expiry as plain JSON-serializable values.
+    """
+    total_call_oi = float(chain.call_oi.sum())
+    total_put_oi = float(chain.put_oi.sum())
+    return {
+        'strikes': len(chain),
+        'total_call_oi': total_call_oi,
+        'total_put_oi': total_put_oi,
+        'pcr': total_put_oi / total_call_oi if total_call_oi > 0 else 0,
+        'max_pain': max_pain(chain),
+        'pcr_by_band': pcr_by_band(chain, spot),
+        'levels': oi_levels(chain, spot),
+        'buildup': buildup_summary(chain, previous),
+    }
+
+
+def expiry_key(expiry):
+    """
+    The exchange-local expiry date ('YYYY-MM-DD') for an instrument-master expiry epoch in milliseconds.
+    """
+    return expiry_date(expiry).isoformat()
+
+
+class ChainAnalytics:
+    """
+    Analyzes each cycle's chain per expiry, keeping the previous cycle for buildup classification.
+    """
+
+    def __init__(self):
+        self._previous = {}
+        self._lock = threading.Lock()
+
+    def update(self, rows, spot, expiry=None):
+        """
+        Analyzes one cycle's rows and returns {expiry date: analysis}. Rows without an 'expiry' belong to `expiry`.
+        """
+        groups = {}
+        for row in rows:
+            groups.setdefault(row.get('expiry', expiry), []).append(row)
+        result = {}
+        with self._lock:
+            for group_expiry, group in sorted(groups.items(), key=lambda item: item[0] or 0):
+                key = expiry_key(group_expiry) if group_expiry is not None else 'unknown'
+                chain = OptionChain.from_rows(group)
+                chain.fill_change_in_oi(self._previous.get(key))
+                result[key] = analyze(chain, spot, self._previous.get(key))
+                self._previous[key] = chain
+            # Expiries no longer in the chain (expired) stop being tracked
+            for key in set(self._previous) - set(result):
+                del self._previous[key]
+        return result
+
+
+def chain_contracts(master, symbol, expiries):
+    """
+    Returns the CE/PE instrument records for every listed strike of each expiry.
+    """
+    contracts = []
+    for expiry in expiries:
+        for strike in master.strikes(symbol, expiry):
+            for option_type in ('CE', 'PE'):
+                option = master.find(symbol, expiry, strike, option_type)
+                if option:
+                    contracts.append(option)
+    return contracts
+
+
+def quote_chain(quote_source, contracts):
+    """
+    Quotes the contracts (batched by the quote source) and returns update() rows for those with a quote.
+    """
+    quotes = quote_source.get_quotes([c['instrument_key'] for c in contracts])
+    return [
+        {'instrument_key': c['instrument_key'], 'expiry': c['expiry'], 'strike_price': c['strike_price'],
+         'option_type': c['instrument_type'], 'ltp': quotes[c['instrument_key']]['ltp'],
+         'oi': quotes[c['instrument_key']]['oi']}
+        for c in contracts if c['instrument_key'] in quotes
+    ]
+
+
+_analytics = None
+_analytics_lock = threading.Lock()
+
+
+def get_chain_analytics():
+    """
+    Returns the process-wide ChainAnalytics.
+    """
+    global _analytics
+    if _analytics is None:
+        with _analytics_lock:
+            if _analytics is None:
+                _analytics = ChainAnalytics()
+    return _analytics
+
+
+if __name__ == '__main__':
+    import random
+    import time
+
+    def reference(rows, previous_ltp, spot):
+        # Plain Python over the same rows, as the sums in the API handlers are written
+        strikes = sorted({r['strike_price'] for r in rows})
+        calls = {r['strike_price']: r['oi'] for r in rows if r['option_type'] == 'CE'}
+        puts = {r['strike_price']: r['oi'] for r in rows if r['option_type'] == 'PE'}
+        payout = {k: sum(calls.get(s, 0) * max(k - s, 0) + puts.get(s, 0) * max(s - k, 0) for s in strikes)
+                  for k in strikes}
+        near = [r for r in rows if abs(r['strike_price'] / spot - 1) <= PCR_BANDS[0]]
+        near_pcr = sum(r['oi'] for r in near if r['option_type'] == 'PE') / \
+            sum(r['oi'] for r in near if r['option_type'] == 'CE')
+        long_buildup = sum(1 for r in rows if r['option_type'] == 'CE' and r['change_in_oi'] > 0 and
+                           r['ltp'] > previous_ltp.get((r['strike_price'], 'CE'), r['ltp']))
+        return min(strikes, key=lambda k: payout[k]), near_pcr, long_buildup
+
+    def make_rows(rng, expiries, strikes, spot, previous=None):
+        rows = []
+        for expiry in expiries:
+            for i in range(strikes):
+                strike = spot - 50 * (strikes // 2) + 50 * i
+                for option_type in ('CE', 'PE'):
+                    old = (previous or {}).get((expiry, strike, option_type))
+                    oi = float(rng.randint(1000, 200000)) if old is None else max(0.0, old['oi'] + rng.randint(-3000, 3000))
+                    rows.append({'expiry': expiry, 'strike_price': strike, 'option_type': option_type,
+                                 'ltp': round(rng.uniform(1, 800), 2), 'oi': oi,
+                                 'change_in_oi': 0 if old is None else oi - old['oi']})
+        return rows
+
+    rng = random.Random(1)
+    spot = 25000.0
+    today = datetime.datetime.combine(datetime.date.today(), datetime.time(15, 30))
+    expiries = [int((today + datetime.timedelta(days=7 * week)).timestamp() * 1000) for week in range(5)]
+    first = make_rows(rng, expiries, 500, spot)
+    second = make_rows(rng, expiries, 500, spot, {(r['expiry'], r['strike_price'], r['option_type']): r for r in first})
+
+    analytics = ChainAnalytics()
+    timings = []
+    for _ in range(50):
+        analytics.update(first, spot)
+        start = time.perf_counter()
+        result = analytics.update(second, spot)
+        timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    expected = {}
+    for expiry in expiries:
+        rows = [r for r in second if r['expiry'] == expiry]
+        previous_ltp = {(r['strike_price'], r['option_type']): r['ltp'] for r in first if r['expiry'] == expiry}
+        expected[expiry_key(expiry)] = reference(rows, previous_ltp, spot)
+    python_time = time.perf_counter() - start
+
+    chain = OptionChain.from_rows(second[:1000])
+    start = time.perf_counter()
+    for _ in range(100):
+        analyze(chain, spot, chain)
+    analyze_time = (time.perf_counter() - start) / 100
+    print(f"{len(second)} contracts over {len(expiries)} expiries: rows -> analytics median "
+          f"{np.median(timings) * 1000:.2f} ms (analyze alone {analyze_time * 1000:.2f} ms per expiry), "
+          f"plain Python {python_time * 1000:.0f} ms")
@@ -1,24 +1,56 @@
+import threading
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import models
+import partitions
 
+# Latest OI per instrument_key as last written by this process. Keys known to have
+# no rows map to None, so steady-state polls resolve previous OI without any reads.
+_last_oi = {}
+_last_oi_lock = threading.Lock()
 
-def save_option_data(db: Session, option_data_list: list[models.OptionData]):
+
+def record_latest_oi(latest):
     """
-    Saves a list of OptionData objects to the database.
+    Updates the in-process last-OI cache from the (instrument_key, oi) pairs being written.
     """
-    db.add_all(option_data_list)
-    db.commit()
+    with _last_oi_lock:
+        _last_oi.update(latest)
 
 
 def get_latest_option_data(db: Session):
     """
     Retrieves the most recent batch of option data from the database.
     """
-    latest_timestamp = db.query(models.OptionData.timestamp).order_by(models.OptionData.timestamp.desc()).first()
-    if latest_timestamp:
-        return db.query(models.OptionData).filter(models.OptionData.timestamp == latest_timestamp[0]).all()
+    latest_snapshot_id = db.query(models.Snapshot.id).order_by(models.Snapshot.id.desc()).first()
+    if latest_snapshot_id:
+        return db.query(models.OptionData).filter(models.OptionData.snapshot_id == latest_snapshot_id[0]).all()
     return []
 
+def get_oi_history(db: Session, instrument_key: str, start, end):
+    """
+    Retrieves OI history for one instrument over [start, end), routed to raw partitions or rollups by range.
+    """
+    return partitions.oi_history(db.connection(), instrument_key, start, end)
+
+
+async def get_latest_option_data_async(db: AsyncSession):
+    """
+    Async get_latest_option_data for the FastAPI handlers, in a single round trip.
+    """
+    latest_snapshot_id = select(models.Snapshot.id).order_by(models.Snapshot.id.desc()).limit(1).scalar_subquery()
+    result = await db.scalars(select(models.OptionData).filter(models.OptionData.snapshot_id == latest_snapshot_id))
+    return result.all()
+
+
+async def get_oi_history_async(db: AsyncSession, instrument_key: str, start, end):
+    """
+    Async get_oi_history; the partition routing runs on the session's connection via run_sync.
+    """
+    return await db.run_sync(get_oi_history, instrument_key, start, end)
+
+
 def get_previous_oi(db: Session, instrument_key: str):
     """
     Retrieves the most recent OI for a given instrument key, to calculate the change.
@@ -27,3 +59,158 @@ def get_previous_oi(db: Session, instrument_key: str):
     if latest_record:
         return latest_record.oi
     return None
+
+
+def get_latest_oi_bulk(db: Session, instrument_keys=None):
+    """
+    Retrieves the most recent OI for many instrument keys in a single query.
+    Returns {instrument_key: oi}; with instrument_keys=None every instrument is returned.
+    """
+    row_number = func.row_number().over(
+        partition_by=models.OptionData.instrument_key,
+        order_by=(models.OptionData.snapshot_id.desc(), models.OptionData.id.desc())
+    ).label('rn')
+    query = db.query(models.OptionData.instrument_key, models.OptionData.oi, row_number)
+    if instrument_keys is not None:
+        query = query.filter(models.OptionData.instrument_key.in_(list(instrument_keys)))
+    latest = query.subquery()
+    rows = db.query(latest.c.instrument_key, latest.c.oi).filter(latest.c.rn == 1).all()
+    return {instrument_key: oi for instrument_key, oi in rows}
+
+
+def warm_last_oi_cache(db: Session):
+    """
+    Loads the latest OI of every instrument into the in-process cache.
+    """
+    latest = get_latest_oi_bulk(db)
+    with _last_oi_lock:
+        _last_oi.clear()
+        _last_oi.update(latest)
+    return len(latest)
+
+
+def get_previous_oi_bulk(db: Session, instrument_keys):
+    """
+    Returns {instrument_key: previous OI or None} for the given keys.
+    Keys are served from the in-process cache; only unseen keys are queried, in one round trip.
+    """
+    with _last_oi_lock:
+        missing = [key for key in instrument_keys if key not in _last_oi]
+    if missing:
+        latest = get_latest_oi_bulk(db, missing)
+        with _last_oi_lock:
+            for key in missing:
+                _last_oi.setdefault(key, latest.get(key))
+    with _last_oi_lock:
+        return {key: _last_oi[key] for key in instrument_keys}
+
+
+def _bench_previous_oi(args):
+    """
+    Per-cycle DB time to resolve previous OI, against the number of strikes tracked.
+    """
+    import time
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from database import Base
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    BenchSession = sessionmaker(bind=engine)
+    history_cycles = 200
+
+    print(f"{'strikes':>8}{'N+1 (ms)':>12}{'bulk (ms)':>12}{'cached (ms)':>14}")
+    for strikes in (10, 50, 200):
+        db = BenchSession()
+        db.query(models.OptionData).delete()
+        keys = [f"NSE_FO|{i}" for i in range(strikes * 2)]
+        db.bulk_insert_mappings(models.OptionData, [
+            {'instrument_key': key, 'strike_price': 0, 'option_type': 'CE', 'ltp': 0, 'oi': cycle, 'change_in_oi': 0}
+            for cycle in range(history_cycles) for key in keys
+        ])
+        db.commit()
+
+        start = time.perf_counter()
+        for key in keys:
+            get_previous_oi(db, key)
+        n_plus_one = time.perf_counter() - start
+
+        start = time.perf_counter()
+        get_latest_oi_bulk(db, keys)
+        bulk = time.perf_counter() - start
+
+        warm_last_oi_cache(db)
+        start = time.perf_counter()
+        get_previous_oi_bulk(db, keys)
+        cached = time.perf_counter() - start
+        db.close()
+        print(f"{strikes:>8}{n_plus_one * 1000:>12.2f}{bulk * 1000:>12.2f}{cached * 1000:>14.3f}")
+
+
+def _bench_latest_batch(args):
+    """
+    Latest-batch read latency as a synthetic option_data table grows to args.rows rows.
+    """
+    import datetime
+    import os
+    import tempfile
+    import time
+    from sqlalchemy import create_engine, insert
+    from sqlalchemy.orm import sessionmaker
+    from database import Base
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    BenchSession = sessionmaker(bind=engine)
+    rows_per_snapshot = 22
+    checkpoints = [n for n in (10_000, 100_000, 1_000_000, 10_000_000) if n <= args.rows] or [args.rows]
+    start_time = datetime.datetime(2024, 1, 1)
+
+    def legacy_latest(db):
+        latest_timestamp = db.query(models.OptionData.timestamp).order_by(models.OptionData.timestamp.desc()).first()
+        return db.query(models.OptionData).filter(models.OptionData.timestamp == latest_timestamp[0]).all()
+
+    def timed(fn, db, repeat=20):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn(db)
+        return (time.perf_counter() - start) / repeat * 1000
+
+    print(f"{'rows':>12}{'max(timestamp) (ms)':>22}{'snapshot index (ms)':>22}")
+    snapshot_id = 0
+    written = 0
+    for checkpoint in checkpoints:
+        with engine.begin() as conn:
+            while written < checkpoint:
+                snapshots = []
+                option_rows = []
+                for _ in range(min(1000, (checkpoint - written) // rows_per_snapshot + 1)):
+                    snapshot_id += 1
+                    taken_at = start_time + datetime.timedelta(minutes=5 * snapshot_id)
+                    snapshots.append({'id': snapshot_id, 'taken_at': taken_at, 'spot': 25000.0})
+                    option_rows.extend(
+                        {'snapshot_id': snapshot_id, 'timestamp': taken_at, 'instrument_key': f"NSE_FO|{i}",
+                         'strike_price': 24500.0 + 50 * (i // 2), 'option_type': 'CE' if i % 2 else 'PE',
+                         'ltp': 100.0, 'oi': 1000.0, 'change_in_oi': 0.0}
+                        for i in range(rows_per_snapshot)
+                    )
+                conn.execute(insert(models.Snapshot), snapshots)
+                conn.execute(insert(models.OptionData), option_rows)
+                written += len(option_rows)
+        db = BenchSession()
+        print(f"{written:>12,}{timed(legacy_latest, db):>22.3f}{timed(get_latest_option_data, db):>22.3f}")
+        db.close()
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmarks for the option_data access paths")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('previous-oi', help="N+1 vs bulk vs cached previous-OI lookups")
+    latest = subparsers.add_parser('latest-batch', help="Latest-batch read latency as the table grows")
+    latest.add_argument('--rows', type=int, default=10_000_000)
+    args = parser.parse_args()
+    {'previous-oi': _bench_previous_oi, 'latest-batch': _bench_latest_batch}[args.command](args)
@@ -1,6 +1,9 @@
 import datetime
 import upstox_client
-import json
+from candle_cache import get_candle_cache
+from candle_store import get_candle_store, to_candles
+from fetch_engine import get_fetch_engine
+from instrument_master import expiry_date, get_instrument_master
 from logger_config import get_logger
 
 # Get logger instance
@@ -13,22 +16,18 @@ def get_instrument_key(symbol, expiry_date, strike_price=None, option_type=None)
     """
     logger.info(f"Searching instrument key for symbol={symbol}, expiry={expiry_date}, strike={strike_price}, type={option_type}")
     try:
-        with open('../NSE_FO.json', 'r') as f:
-            data = json.load(f)
-
-        for instrument in data:
-            if instrument['asset_symbol'] == symbol:
-                # Match expiry date (handle potential format differences if necessary)
-                # This is a simplified match, a more robust solution might be needed
-                if expiry_date in instrument['trading_symbol']:
-                    if strike_price and option_type:
-                        if instrument['strike_price'] == strike_price and instrument['instrument_type'] == option_type:
-                            logger.info(f"Found instrument key: {instrument['instrument_key']}")
-                            return instrument['instrument_key']
-                    elif not strike_price and not option_type: # For futures
-                        if instrument['instrument_type'] == 'FUT':
-                            logger.info(f"Found futures instrument key: {instrument['instrument_key']}")
-                            return instrument['instrument_key']
+        master = get_instrument_master()
+        for expiry in master.expiries_matching(symbol, expiry_date):
+            if strike_price and option_type:
+                instrument = master.find(symbol, expiry, strike_price, option_type)
+                if instrument:
+                    logger.info(f"Found instrument key: {instrument['instrument_key']}")
+                    return instrument['instrument_key']
+            elif not strike_price and not option_type: # For futures
+                instrument = master.find(symbol, expiry, 0, 'FUT')
+                if instrument:
+                    logger.info(f"Found futures instrument key: {instrument['instrument_key']}")
+                    return instrument['instrument_key']
         logger.warning(f"No instrument key found for symbol={symbol}, expiry={expiry_date}")
         return None
     except Exception as e:
@@ -36,33 +35,34 @@ def get_instrument_key(symbol, expiry_date, strike_price=None, option_type=None)
         return None
 
 
-def fetch_intraday_data(instrument_key):
+def fetch_intraday_data(instrument_key, api=None, timeout=None):
     """
     Fetches intraday candle data for a given instrument key using upstox_client.
-    If no intraday candles are returned, fetches historical data for the previous 6 days and returns the latest day's data.
+    If no intraday candles are returned, reads the previous 6 days from the candle store and returns the latest day's data.
+    `api` overrides the HistoryV3Api client and `timeout` is the per-request timeout in seconds.
     """
     logger.info(f"Fetching intraday data for instrument_key={instrument_key}")
-    api = upstox_client.HistoryV3Api()
+    client = api or upstox_client.HistoryV3Api()
+    kwargs = {'_request_timeout': timeout} if timeout else {}
     today = datetime.datetime.today()
-    start_date = today.strftime('%Y-%m-%d')
     try:
         # Try intraday first
-        intraday = api.get_intra_day_candle_data(instrument_key, 'minutes', 5)
+        intraday = client.get_intra_day_candle_data(instrument_key, 'minutes', 5, **kwargs)
         candles = getattr(getattr(intraday, 'data', None), 'candles', [])
         if candles:
             logger.info(f"Fetched {len(candles)} intraday candles for {instrument_key}")
             return {'data': {'candles': candles}}
 
-        # If no intraday data, fallback to historical for last 6 days
+        # If no intraday data, fallback to the candle store's most recent day in the last 6 days
         logger.warning(f"No intraday data for {instrument_key}, falling back to historical data")
-        hist_start = (today - datetime.timedelta(days=6)).strftime('%Y-%m-%d')
-        hist = api.get_historical_candle_data1(instrument_key, 'minutes', 5, start_date, hist_start)
-        hist_candles = getattr(getattr(hist, 'data', None), 'candles', [])
-        if hist_candles:
-            latest_date = hist_candles[0][0].split('T')[0]
+        yesterday = (today - datetime.timedelta(days=1)).date()
+        latest_day = get_candle_store().latest_day(instrument_key, 'minutes', 5, yesterday, lookback_days=5,
+                                                   timeout=timeout, api=api)
+        if len(latest_day):
             # Return only the latest day's candle as a 2D array for compatibility
-            hist_candle_filtered = [c for c in hist_candles if c[0].startswith(latest_date)]
-            logger.info(f"Fetched {len(hist_candle_filtered)} historical candles for {instrument_key} on {latest_date}")
+            hist_candle_filtered = to_candles(latest_day)
+            logger.info(f"Fetched {len(hist_candle_filtered)} historical candles for {instrument_key} "
+                        f"on {hist_candle_filtered[0][0].split('T')[0]}")
             return {'data': {'candles': hist_candle_filtered}}
 
         logger.warning(f"No candle data available for {instrument_key}")
@@ -74,37 +74,48 @@ def fetch_intraday_data(instrument_key):
 
 def fetch_intraday_data_without_filter(instrument_key):
     """
-    Fetches intraday candle data for a given instrument key using upstox_client.
-    If no intraday candles are returned, fetches historical data for the previous 6 days and returns the latest day's data.
+    Returns today's 5-minute candles for a given instrument key, resampled from the candle store's 1-minute stream.
+    If there are none yet, returns the 5-minute candles of the previous 6 days.
+    Responses are shared through the candle cache until the current 5-minute candle closes.
+    """
+    today = datetime.datetime.today().strftime('%Y-%m-%d')
+    data = get_candle_cache().get_or_fetch(
+        instrument_key, 'minutes', 5, today, today,
+        lambda: _fetch_intraday_data_without_filter(instrument_key)
+    )
+    return data or {'data': {'candles': []}}
+
+
+def _fetch_intraday_data_without_filter(instrument_key):
+    """
+    Upstream fetch behind fetch_intraday_data_without_filter. Returns None when no candles are available.
     """
     logger.info(f"Fetching intraday data without filter for instrument_key={instrument_key}")
-    api = upstox_client.HistoryV3Api()
-    today = datetime.datetime.today()
-    start_date = today.strftime('%Y-%m-%d')
+    store = get_candle_store()
+    today = datetime.date.today()
     interval = 5
     unit = 'minutes'
     try:
-        # Try intraday first
-        intraday = api.get_intra_day_candle_data(instrument_key, unit, interval)
-        candles = getattr(getattr(intraday, 'data', None), 'candles', [])
+        # Try intraday first: today's 5-minute bars resampled from the 1-minute stream
+        candles = to_candles(store.read_bars(instrument_key, unit, interval, today, today))
         if candles:
             logger.info(f"Fetched {len(candles)} intraday candles (unfiltered) for {instrument_key}")
             return {'data': {'candles': candles}}
 
-        # If no intraday data, fallback to historical for last 6 days
+        # If no intraday data, fallback to the candle store for the last 6 days
         logger.warning(f"No intraday data for {instrument_key}, falling back to historical data")
-        hist_start = (today - datetime.timedelta(days=6)).strftime('%Y-%m-%d')
-        hist = api.get_historical_candle_data1(instrument_key, 'minutes', 5, start_date, hist_start)
-        hist_candles = getattr(getattr(hist, 'data', None), 'candles', [])
+        hist_start = today - datetime.timedelta(days=6)
+        yesterday = today - datetime.timedelta(days=1)
+        hist_candles = to_candles(store.read_bars(instrument_key, unit, interval, hist_start, yesterday))
         if hist_candles:
             logger.info(f"Fetched {len(hist_candles)} historical candles (unfiltered) for {instrument_key}")
             return {'data': {'candles': hist_candles}}
 
         logger.warning(f"No candle data available for {instrument_key}")
-        return {'data': {'candles': []}}
+        return None
     except Exception as e:
         logger.error(f"Error fetching intraday data without filter for {instrument_key}: {str(e)}", exc_info=True)
-        return {'data': {'candles': []}}
+        return None
 
 
 def get_nifty_50_price():
@@ -113,17 +124,16 @@ def get_nifty_50_price():
     """
     logger.info("Fetching Nifty 50 price")
     try:
-        today_date = datetime.datetime.today().strftime('%Y-%m-%d')
         days_interval = 7
-        start_date = (datetime.datetime.today() - datetime.timedelta(days=days_interval)).strftime('%Y-%m-%d')
-        history_client = upstox_client.HistoryV3Api()
-        nifty_data = history_client.get_intra_day_candle_data('NSE_INDEX|Nifty 50', 'minutes', 5)
-        if nifty_data.data.candles:
+        today = datetime.date.today()
+        store = get_candle_store()
+        nifty_data = store.read('NSE_INDEX|Nifty 50', 'minutes', 1, today, today)
+        if len(nifty_data):
             logger.info("Found intraday candles for Nifty 50")
         else:
-            nifty_data = history_client.get_historical_candle_data1('NSE_INDEX|Nifty 50', 'days', 1, today_date, start_date)
-        latest_candle = nifty_data.data.candles[0]
-        price = latest_candle[4]  # Return the closing price of the latest candle
+            nifty_data = store.read_bars('NSE_INDEX|Nifty 50', 'days', 1,
+                                         today - datetime.timedelta(days=days_interval), today - datetime.timedelta(days=1))
+        price = float(nifty_data['close'][-1])  # Return the closing price of the latest candle
         logger.info(f"Nifty 50 price: {price}")
         return price
     except Exception as e:
@@ -137,46 +147,18 @@ def select_option_contracts(nifty_price):
     """
     logger.info(f"Selecting option contracts for Nifty price: {nifty_price}")
     try:
-        with open('../NSE_FO.json', 'r') as f:
-            data = json.load(f)
-
-        # Filter for Nifty options and get the nearest expiry date
-        nifty_options = [ins for ins in data if ins['asset_symbol'] == 'NIFTY' and ins['instrument_type'] in ['CE', 'PE']]
-
-        if not nifty_options:
-            logger.error("No Nifty options found in NSE_FO.json")
-            return [], []
-
-        # Find the closest expiry date from today
-        from datetime import datetime
-        today = datetime.now()
+        master = get_instrument_master()
 
-        # Calculate expiry dates and their difference from today
-        for option in nifty_options:
-            option['expiry_datetime'] = datetime.fromtimestamp(option['expiry'] / 1000)
-            option['days_to_expiry'] = (option['expiry_datetime'] - today).days
-
-        # Filter for options that haven't expired yet
-        future_options = [opt for opt in nifty_options if opt['days_to_expiry'] >= 0]
-
-        if not future_options:
+        # Find the closest expiry that has not passed yet
+        expiry = master.nearest_expiry('NIFTY')
+        if expiry is None:
             logger.error("No future Nifty options found.")
             return [], []
-
-        # Find the minimum days to expiry
-        min_days_to_expiry = min(opt['days_to_expiry'] for opt in future_options)
-        logger.info(f"Closest expiry in {min_days_to_expiry} days")
-
-        # Filter for options with the closest expiry date
-        closest_expiry_options = [opt for opt in future_options if opt['days_to_expiry'] == min_days_to_expiry]
-
-        # Separate calls and puts
-        calls = sorted([opt for opt in closest_expiry_options if opt['instrument_type'] == 'CE'], key=lambda x: x['strike_price'])
-        puts = sorted([opt for opt in closest_expiry_options if opt['instrument_type'] == 'PE'], key=lambda x: x['strike_price'])
+        logger.info(f"Closest expiry on {expiry_date(expiry)}")
 
         # Find 5 calls above the nifty price and 5 puts below
-        selected_calls = sorted([c for c in calls if c['strike_price'] > nifty_price], key=lambda x: x['strike_price'])[:5]
-        selected_puts = sorted([p for p in puts if p['strike_price'] < nifty_price], key=lambda x: x['strike_price'], reverse=True)[:5]
+        selected_calls = master.options_above('NIFTY', expiry, 'CE', nifty_price, 5)
+        selected_puts = master.options_below('NIFTY', expiry, 'PE', nifty_price, 5)
 
         logger.info(f"Selected {len(selected_calls)} call contracts and {len(selected_puts)} put contracts")
         return selected_calls, selected_puts
@@ -185,18 +167,36 @@ def select_option_contracts(nifty_price):
         return [], []
 
 
-def process_oi_data(options):
+def process_oi_data(options, api=None, engine=None):
     """
-    Fetches and processes OI data for the given options.
+    Fetches and processes OI data for the given options, keyed by strike price.
+    Candles for all options are fetched concurrently on the shared fetch engine.
+    """
+    oi_data = {data['strike_price']: data for data in _oi_by_instrument(options, api, engine).values()}
+    logger.info(f"Processed OI data for {len(oi_data)} strikes")
+    return oi_data
+
+
+def _oi_by_instrument(options, api=None, engine=None):
+    """
+    Fetches and processes OI data for the given options, keyed by instrument key.
     """
     logger.info(f"Processing OI data for {len(options)} options")
+    engine = engine or get_fetch_engine()
+    candles_by_key, failures = engine.map(
+        lambda key: fetch_intraday_data(key, api=api, timeout=engine.timeout),
+        [option['instrument_key'] for option in options]
+    )
+    if failures:
+        logger.warning(f"Failed to fetch candles for {len(failures)} of {len(options)} options")
+
     oi_data = {}
     for option in options:
         instrument_key = option['instrument_key']
         strike_price = option['strike_price']
         logger.debug(f"Processing OI for strike {strike_price}, instrument_key={instrument_key}")
 
-        data = fetch_intraday_data(instrument_key)
+        data = candles_by_key.get(instrument_key)
         if data and data['data']['candles']:
             candles = data['data']['candles']
             # Assuming the last candle is the most recent
@@ -204,7 +204,7 @@ def process_oi_data(options):
             # Assuming the first candle of the day is the last in the list
             initial_oi = candles[-1][6]
             oi_change = latest_oi - initial_oi
-            oi_data[strike_price] = {
+            oi_data[instrument_key] = {
                 "strike_price": strike_price,
                 "instrument_key": instrument_key,
                 "initial_oi": initial_oi,
@@ -215,15 +215,23 @@ def process_oi_data(options):
         else:
             logger.warning(f"No candle data for {instrument_key}, simulating data")
             # Simulate some data for demonstration purposes
-            oi_data[strike_price] = {
+            oi_data[instrument_key] = {
                 "strike_price": strike_price,
                 "instrument_key": instrument_key,
                 "initial_oi": 1000,
                 "latest_oi": 1000 + (strike_price % 100) * 10, # Simulate some change
                 "oi_change": (strike_price % 100) * 10
             }
-
-    logger.info(f"Processed OI data for {len(oi_data)} strikes")
     return oi_data
 
-# This file is now a module to be imported by server.py
+
+def process_oi_data_batch(calls, puts, api=None, engine=None):
+    """
+    Processes calls and puts in a single concurrent batch.
+    Returns (call_oi_data, put_oi_data).
+    """
+    # Calls and puts share strikes, so keep them apart by instrument key until they are split by leg
+    oi_data = _oi_by_instrument(calls + puts, api=api, engine=engine)
+    call_oi_data = {option['strike_price']: oi_data[option['instrument_key']] for option in calls}
+    put_oi_data = {option['strike_price']: oi_data[option['instrument_key']] for option in puts}
+    return call_oi_data, put_oi_data
@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -12,7 +13,36 @@ engine = create_engine(
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async drivers for the FastAPI data path
+ASYNC_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg', 'postgres': 'postgresql+asyncpg'}
+
+
+def async_url(url):
+    """
+    Returns DATABASE_URL with its driver swapped for the asyncio one (aiosqlite or asyncpg).
+    """
+    scheme, rest = url.split('://', 1)
+    return f"{ASYNC_DRIVERS.get(scheme.split('+')[0], scheme)}://{rest}"
+
+
+async_engine = create_async_engine(async_url(DATABASE_URL))
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+def _sqlite_wal(dbapi_connection, connection_record):
+    # In WAL mode the async readers do not block the poll loop's writes (or each other)
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.close()
+
+
+if engine.dialect.name == 'sqlite':
+    event.listen(engine, 'connect', _sqlite_wal)
+    event.listen(async_engine.sync_engine, 'connect', _sqlite_wal)
+
 Base = declarative_base()
 
 def create_db_and_tables():
+    import migrations
     Base.metadata.create_all(bind=engine)
+    migrations.upgrade(engine)
@@ -0,0 +1,99 @@
+"""
+Offline stand-ins for the upstox_client APIs and quote sources, used by benchmarks and load tests.
+
+Each fake mimics the response shape of the real SDK (objects with a .data
+attribute) and can inject a fixed latency per call to model network round trips.
+"""
+import datetime
+import random
+import threading
+import time
+from types import SimpleNamespace
+from quote_source import QUOTE_BATCH_SIZE, QuoteSource, chunked
+
+
+def make_candles(count=75, unit_minutes=5, start_price=25000.0, start_oi=100000, end=None, seed=None):
+    """
+    Builds newest-first [timestamp, open, high, low, close, volume, oi] candles like the history API returns.
+    """
+    rng = random.Random(seed)
+    end = end or datetime.datetime.now().replace(second=0, microsecond=0)
+    price = start_price
+    oi = start_oi
+    candles = []
+    for i in range(count):
+        ts = end - datetime.timedelta(minutes=unit_minutes * (count - 1 - i))
+        open_ = price
+        close = price + rng.gauss(0, 10)
+        high = max(open_, close) + abs(rng.gauss(0, 5))
+        low = min(open_, close) - abs(rng.gauss(0, 5))
+        oi = max(0, oi + rng.randint(-2000, 2000))
+        candles.append([ts.strftime('%Y-%m-%dT%H:%M:%S+05:30'), open_, high, low, close, rng.randint(1000, 10000), oi])
+        price = close
+    candles.reverse()
+    return candles
+
+
+class FakeHistoryV3Api:
+    """
+    Fake HistoryV3Api with injectable per-call latency and a call counter.
+    """
+
+    def __init__(self, latency=0.05, candles=None):
+        self.latency = latency
+        self.candles = candles if candles is not None else make_candles(seed=1)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _respond(self):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return SimpleNamespace(data=SimpleNamespace(candles=list(self.candles)))
+
+    def get_intra_day_candle_data(self, instrument_key, unit, interval, **kwargs):
+        # Like the real endpoint, only the current (newest) session is returned
+        response = self._respond()
+        if response.data.candles:
+            session = response.data.candles[0][0][:10]
+            response.data.candles = [c for c in response.data.candles if c[0][:10] == session]
+        return response
+
+    def get_historical_candle_data1(self, instrument_key, unit, interval, to_date, from_date, **kwargs):
+        response = self._respond()
+        response.data.candles = [c for c in response.data.candles if from_date <= c[0][:10] <= to_date]
+        return response
+
+
+class FakeQuoteSource(QuoteSource):
+    """
+    Quote source serving a random walk of spot, LTP and OI, with per-call latency.
+    """
+
+    def __init__(self, spot=25000.0, latency=0.0, batch_size=QUOTE_BATCH_SIZE, seed=None):
+        super().__init__()
+        self.spot = spot
+        self.latency = latency
+        self.batch_size = batch_size
+        self._rng = random.Random(seed)
+        self._oi = {}
+
+    def get_spot(self):
+        self._count_call()
+        if self.latency:
+            time.sleep(self.latency)
+        self.spot += self._rng.gauss(0, 10)
+        return self.spot
+
+    def get_quotes(self, instrument_keys):
+        quotes = {}
+        for batch in chunked(list(instrument_keys), self.batch_size):
+            self._count_call()
+            if self.latency:
+                time.sleep(self.latency)
+            for key in batch:
+                oi = self._oi.get(key, self._rng.randint(1000, 100000))
+                oi = self._oi[key] = max(0, oi + self._rng.randint(-2000, 2000))
+                quotes[key] = {'ltp': round(self._rng.uniform(1, 500), 2), 'oi': float(oi)}
+        return quotes
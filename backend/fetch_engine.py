@@ -0,0 +1,110 @@
+"""
+Bounded thread pool for running blocking upstox_client calls concurrently.
+
+The SDK is synchronous, so batches of history calls are fanned out over a shared
+ThreadPoolExecutor. A batch takes roughly as long as its slowest call instead of
+the sum of all calls. Calls that raise or miss their deadline are reported as
+failures so callers can still use the partial result.
+
+Run `python fetch_engine.py` to compare serial and concurrent fetching against a
+fake HistoryV3Api with injected latency; tests/test_fetch_engine.py covers results,
+failures, timeouts and concurrency.
+"""
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from logger_config import get_logger
+
+# Get logger instance
+logger = get_logger(__name__)
+
+FETCH_CONCURRENCY = int(os.environ.get("FETCH_CONCURRENCY", 8))
+FETCH_TIMEOUT = float(os.environ.get("FETCH_TIMEOUT", 10))
+
+
+class FetchEngine:
+    """
+    Runs a function over many items on a bounded worker pool.
+    """
+
+    def __init__(self, max_workers=FETCH_CONCURRENCY, timeout=FETCH_TIMEOUT):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='upstream-fetch')
+
+    def map(self, func, items, timeout=None):
+        """
+        Calls func(item) for every item concurrently.
+
+        Returns (results, failures): dicts keyed by item holding the return value or
+        the exception. Each call gets `timeout` seconds once a worker picks it up; calls
+        still running after the batch deadline are reported as TimeoutError.
+        """
+        items = list(dict.fromkeys(items))
+        if not items:
+            return {}, {}
+        timeout = self.timeout if timeout is None else timeout
+        futures = {self._executor.submit(func, item): item for item in items}
+        # Items beyond max_workers queue behind earlier ones, so allow one timeout per wave
+        waves = math.ceil(len(items) / self.max_workers)
+        done, not_done = wait(futures, timeout=timeout * waves)
+
+        results = {}
+        failures = {}
+        for future in done:
+            item = futures[future]
+            try:
+                results[item] = future.result()
+            except Exception as e:
+                logger.error(f"Upstream call failed for {item}: {str(e)}")
+                failures[item] = e
+        for future in not_done:
+            item = futures[future]
+            future.cancel()
+            logger.warning(f"Upstream call timed out for {item}")
+            failures[item] = TimeoutError(f"Timed out after {timeout}s")
+        return results, failures
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_fetch_engine():
+    """
+    Returns the process-wide FetchEngine.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = FetchEngine()
+    return _engine
+
+
+if __name__ == '__main__':
+    from data_fetcher import fetch_intraday_data, process_oi_data
+    from fakes import FakeHistoryV3Api
+
+    latency = 0.2
+    options = [{'instrument_key': f'NSE_FO|{i}', 'strike_price': 24000 + 50 * i} for i in range(20)]
+
+    api = FakeHistoryV3Api(latency=latency)
+    start = time.perf_counter()
+    for option in options:
+        fetch_intraday_data(option['instrument_key'], api=api)
+    serial = time.perf_counter() - start
+
+    api = FakeHistoryV3Api(latency=latency)
+    start = time.perf_counter()
+    process_oi_data(options, api=api, engine=FetchEngine(max_workers=8))
+    concurrent = time.perf_counter() - start
+
+    print(f"{len(options)} contracts at {latency * 1000:.0f} ms per call")
+    print(f"serial:     {serial:.2f}s")
+    print(f"concurrent: {concurrent:.2f}s ({api.calls} calls, 8 workers)")
@@ -1,13 +1,15 @@
 from fastapi import FastAPI, Query
 from pydantic import BaseModel
 import numpy as np
-import upstox_client
-import datetime
 import logging
+from bisect import bisect_left
+from indicator_utils import rolling_max, rolling_min
 
 # Pivot window size (left/right of center bar)
 LEFT = 15
 RIGHT = 15
+# Levels whose prices are within this many points of each other are merged into one zone
+ZONE_TOLERANCE = 10
 
 app = FastAPI()
 
@@ -18,28 +20,116 @@ class SupportResistanceResult(BaseModel):
     trade_zone: str
 
 
-def get_support_resistance(interval: int, unit: str):
+def find_pivots(dates, highs, lows, left=LEFT, right=RIGHT):
+    """
+    Returns (supports, resistances) as lists of (date, price): bars whose low/high is the
+    min/max of the `left` bars before, the bar itself and the `right` bars after.
+    """
+    highs = np.asarray(highs, dtype=float)
+    lows = np.asarray(lows, dtype=float)
+    window = left + right + 1
+    if len(highs) < window:
+        return [], []
+    centers = np.arange(left, len(highs) - right)
+    # The trailing window ending `right` bars after a center is exactly that center's pivot window
+    resistance_idx = centers[highs[centers] == rolling_max(highs, window)[centers + right]]
+    support_idx = centers[lows[centers] == rolling_min(lows, window)[centers + right]]
+    supports = [(dates[i], float(lows[i])) for i in support_idx]
+    resistances = [(dates[i], float(highs[i])) for i in resistance_idx]
+    return supports, resistances
+
+
+def cluster_levels(levels, tolerance=ZONE_TOLERANCE):
+    """
+    Groups (date, price) levels into zones at most `tolerance` wide, lowest first,
+    as {'low', 'high', 'level' (mean price), 'touches'}.
+    """
+    zones = []
+    for price in sorted(price for _, price in levels):
+        if zones and price - zones[-1]['low'] <= tolerance:
+            zone = zones[-1]
+            zone['high'] = price
+            zone['level'] += (price - zone['level']) / (zone['touches'] + 1)
+            zone['touches'] += 1
+        else:
+            zones.append({'low': price, 'high': price, 'level': price, 'touches': 1})
+    return zones
+
+
+def get_support_resistance(interval: int, unit: str, left: int = LEFT, right: int = RIGHT,
+                           zone_tolerance: float = ZONE_TOLERANCE):
+    """
+    Pivot supports/resistances of Nifty 50 over the last 30 days (365 for daily candles), newest first.
+    Candles and the default LEFT/RIGHT pivots come from the incrementally refreshed level store.
+    """
     try:
-        api_client = upstox_client.HistoryV3Api()
-        today_date = datetime.datetime.today().strftime('%Y-%m-%d')
-        days_interval = 30
-        if unit == 'days':
-            days_interval = 365
-        start_date = (datetime.datetime.today() - datetime.timedelta(days=days_interval)).strftime('%Y-%m-%d')
         # Ensure unit is correct for API
         valid_units = ["minutes", "days"]
         if unit not in valid_units:
             raise ValueError(f"Invalid unit: {unit}. Must be one of {valid_units}")
-        raw_data = api_client.get_historical_candle_data1("NSE_INDEX|Nifty 50", unit, interval, today_date, start_date)
-        if not hasattr(raw_data, 'data') or not hasattr(raw_data.data, 'candles'):
-            raise ValueError("No candle data returned from API")
-        data = raw_data.data.candles
-        if not data:
+        from level_store import get_level_store
+        series = get_level_store().get(interval, unit)
+        if not series.dates:
             raise ValueError("Empty candle data returned from API")
-        dates = [x[0] for x in data]
-        highs = np.array([x[2] for x in data])
-        lows = np.array([x[3] for x in data])
+        if (left, right) == (LEFT, RIGHT):
+            supports = [tuple(p) for p in series.supports]
+            resistances = [tuple(p) for p in series.resistances]
+        else:
+            supports, resistances = find_pivots(series.dates, series.highs, series.lows, left, right)
+        # Newest first, in the order the history API returns candles
+        supports.reverse()
+        resistances.reverse()
+
+        current_price = series.highs[-1]  # or use close price if available
+
+        trade_zone = check_trade_zone(current_price, supports, resistances)
+        return {
+            "supports": supports,
+            "resistances": resistances,
+            "trade_zone": trade_zone,
+            "support_zones": cluster_levels(supports, zone_tolerance),
+            "resistance_zones": cluster_levels(resistances, zone_tolerance),
+        }
+    except Exception as e:
+        logging.exception("Error in get_support_resistance")
+        return {"error": str(e)}
+
+
+def level_prices(levels):
+    """
+    Returns the prices of (date, price) levels, sorted for trade_zone.
+    """
+    return sorted(price for _, price in levels)
+
+
+def is_near_level(sorted_prices, price, tolerance):
+    """
+    True if any of the sorted prices lies within `tolerance` of `price` (binary search).
+    """
+    i = bisect_left(sorted_prices, price - tolerance)
+    return i < len(sorted_prices) and sorted_prices[i] <= price + tolerance
+
 
+def trade_zone(price, support_prices, resistance_prices, tolerance=5):
+    """
+    check_trade_zone for levels already reduced to sorted prices with level_prices.
+    """
+    if is_near_level(support_prices, price, tolerance):
+        return "on support"
+    if is_near_level(resistance_prices, price, tolerance):
+        return "on resistance"
+    return "no trade"
+
+
+def check_trade_zone(current_price1, supports1, resistances1, tolerance=5):
+    return trade_zone(current_price1, level_prices(supports1), level_prices(resistances1), tolerance)
+
+
+if __name__ == '__main__':
+    import time
+
+    def legacy_pivots(dates, highs, lows):
+        # The previous per-bar implementation, kept as the benchmark reference
         def is_pivot_high(idx):
             if idx < LEFT or idx + RIGHT >= len(highs):
                 return False
@@ -52,27 +142,43 @@ def get_support_resistance(interval: int, unit: str):
 
         resistances = [(dates[i], float(highs[i])) for i in range(len(highs)) if is_pivot_high(i)]
         supports = [(dates[i], float(lows[i])) for i in range(len(lows)) if is_pivot_low(i)]
+        return supports, resistances
 
-        current_price = highs[-1]  # or use close price if available
-
-        trade_zone = check_trade_zone(current_price, supports, resistances)
-        api_client.api_client.__del__()
-        return {
-            "supports": supports,
-            "resistances": resistances,
-            "trade_zone": trade_zone
-        }
-    except Exception as e:
-        logging.exception("Error in get_support_resistance")
-        return {"error": str(e)}
+    def legacy_trade_zone(current_price1, supports1, resistances1, tolerance=5):
+        for _, support in supports1:
+            if abs(current_price1 - support) <= tolerance:
+                return "on support"
+        for _, resistance in resistances1:
+            if abs(current_price1 - resistance) <= tolerance:
+                return "on resistance"
+        return "no trade"
 
+    # A year of 1-minute candles: 252 sessions of 375 bars, prices rounded to the 0.05 tick
+    bars = 252 * 375
+    rng = np.random.default_rng(11)
+    closes = np.round((22000 + np.cumsum(rng.normal(0, 3, bars))) / 0.05) * 0.05
+    highs = closes + np.round(rng.random(bars) * 10 / 0.05) * 0.05
+    lows = closes - np.round(rng.random(bars) * 10 / 0.05) * 0.05
+    dates = [str(i) for i in range(bars)]
 
-def check_trade_zone(current_price1, supports1, resistances1, tolerance=5):
-    for _, support in supports1:
-        if abs(current_price1 - support) <= tolerance:
-            return "on support"
-    for _, resistance in resistances1:
-        if abs(current_price1 - resistance) <= tolerance:
-            return "on resistance"
-    return "no trade"
+    start = time.perf_counter()
+    legacy_pivots(dates, highs, lows)
+    legacy_time = time.perf_counter() - start
+    start = time.perf_counter()
+    supports, resistances = find_pivots(dates, highs, lows)
+    vector_time = time.perf_counter() - start
+    print(f"pivots on {bars:,} 1-minute bars: loop {legacy_time * 1000:.0f} ms, vectorized {vector_time * 1000:.1f} ms "
+          f"({legacy_time / vector_time:.0f}x), {len(supports)} supports, {len(resistances)} resistances")
 
+    queries = closes[::10]
+    start = time.perf_counter()
+    for price in queries:
+        legacy_trade_zone(price, supports, resistances)
+    legacy_time = time.perf_counter() - start
+    start = time.perf_counter()
+    support_prices, resistance_prices = level_prices(supports), level_prices(resistances)
+    for price in queries:
+        trade_zone(price, support_prices, resistance_prices)
+    bisect_time = time.perf_counter() - start
+    print(f"{len(queries):,} trade-zone checks: linear {legacy_time * 1000:.0f} ms, bisect {bisect_time * 1000:.1f} ms "
+          f"({legacy_time / bisect_time:.0f}x), {len(cluster_levels(supports))} support zones")
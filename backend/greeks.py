@@ -0,0 +1,358 @@
+"""
+Vectorized Black-Scholes implied volatility and Greeks for the whole option chain.
+
+Every function takes NumPy arrays (one element per contract) and works on the whole
+chain at once. Pricing is European (Black-Scholes with a continuous dividend yield),
+which fits NSE index options. Time to expiry runs, in calendar years, to the 15:30 IST
+close on the expiry date of the instrument master's `expiry` epoch (ms). The master
+stamps expiries at 23:59:59 IST, but contracts settle at the close. A contract past its
+settlement gets NaN.
+
+implied_volatility() runs Newton-Raphson on every contract at once, safeguarded by a
+per-contract bracket [IV_MIN, IV_MAX]. Each iteration narrows the bracket around the
+root, and any contract whose Newton step would leave it (tiny vega, far OTM) takes a
+bisection step instead. Contracts drop out of the active set as they converge. Prices
+outside the no-arbitrage bounds, or contracts that do not converge, get NaN.
+
+GreeksEngine adds iv/delta/gamma/theta/vega to each poll cycle's rows. It warm-starts
+each contract's solve from the IV that contract had in the previous snapshot, which
+roughly halves the solve time when the market has moved little.
+
+The normal CDF comes from scipy when it is installed (optional) and from a rational
+erfc approximation (|error| < 1.2e-7) otherwise.
+
+Run `python greeks.py` to benchmark 5,000 contracts per solve.
+"""
+import math
+import os
+import threading
+import time
+import numpy as np
+from candle_store import EXCHANGE_UTC_OFFSET
+from logger_config import get_logger
+
+# Get logger instance
+logger = get_logger(__name__)
+
+RISK_FREE_RATE = float(os.environ.get("RISK_FREE_RATE", 0.065))
+DIVIDEND_YIELD = float(os.environ.get("DIVIDEND_YIELD", 0.0))
+SECONDS_PER_YEAR = 365 * 86400
+# Options settle at the close, in exchange-local seconds after midnight (15:30)
+SETTLEMENT_TIME = 15 * 3600 + 30 * 60
+IV_MIN = 1e-4
+IV_MAX = 5.0
+# Converged once the model price is within this of the market price, or the bracket is this narrow
+IV_PRICE_TOLERANCE = 1e-6
+IV_BRACKET_TOLERANCE = 1e-9
+IV_MAX_ITERATIONS = 100
+GREEK_FIELDS = ('iv', 'delta', 'gamma', 'theta', 'vega')
+
+_ndtr = None
+
+
+def _ndtr_function():
+    """
+    Returns scipy.special.ndtr, or None if scipy is not installed (scipy is optional).
+    """
+    global _ndtr
+    if _ndtr is None:
+        try:
+            from scipy.special import ndtr
+            _ndtr = ndtr
+        except ImportError:
+            _ndtr = False
+    return _ndtr or None
+
+
+def _erfc(x):
+    # Chebyshev-fitted erfc (Numerical Recipes erfcc), fractional error below 1.2e-7 everywhere
+    z = np.abs(x)
+    t = 1.0 / (1.0 + 0.5 * z)
+    poly = -z * z - 1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (0.09678418 + t * (
+        -0.18628806 + t * (0.27886807 + t * (-1.13520398 + t * (1.48851587 + t * (-0.82215223 + t * 0.17087277))))))))
+    result = t * np.exp(poly)
+    return np.where(x >= 0, result, 2.0 - result)
+
+
+def norm_cdf(x):
+    ndtr = _ndtr_function()
+    if ndtr:
+        return ndtr(x)
+    return 0.5 * _erfc(-np.asarray(x) / math.sqrt(2))
+
+
+def norm_pdf(x):
+    return np.exp(-0.5 * np.square(x)) / math.sqrt(2 * math.pi)
+
+
+def settlement_epoch(expiry):
+    """
+    Returns the epoch seconds of the close (15:30 exchange time) on the expiry date of instrument-master
+    expiry epochs in ms, or the expiry itself if that is earlier.
+    """
+    offset = EXCHANGE_UTC_OFFSET.total_seconds()
+    seconds = np.asarray(expiry, dtype=np.float64) / 1000
+    local = seconds + offset
+    close = local - np.mod(local, 86400) + SETTLEMENT_TIME - offset
+    return np.minimum(seconds, close)
+
+
+def years_to_expiry(expiry, now=None):
+    """
+    Returns calendar years from `now` (epoch seconds, default the current time) to the settlement of
+    instrument-master expiry epochs in ms, NaN for contracts past settlement.
+    """
+    now = time.time() if now is None else now
+    years = (settlement_epoch(expiry) - now) / SECONDS_PER_YEAR
+    return np.where(years > 0, years, np.nan)
+
+
+def _d1_d2(spot, strike, years, sigma, rate, dividend):
+    sigma_sqrt_t = sigma * np.sqrt(years)
+    d1 = (np.log(spot / strike) + (rate - dividend + 0.5 * sigma * sigma) * years) / sigma_sqrt_t
+    return d1, d1 - sigma_sqrt_t
+
+
+def bs_price(spot, strike, years, sigma, is_call, rate=RISK_FREE_RATE, dividend=DIVIDEND_YIELD):
+    """
+    European option prices.
+    """
+    d1, d2 = _d1_d2(spot, strike, years, sigma, rate, dividend)
+    spot_pv = spot * np.exp(-dividend * years)
+    strike_pv = strike * np.exp(-rate * years)
+    call = spot_pv * norm_cdf(d1) - strike_pv * norm_cdf(d2)
+    put = strike_pv * norm_cdf(-d2) - spot_pv * norm_cdf(-d1)
+    return np.where(is_call, call, put)
+
+
+def _price_and_vega(spot, strike, years, sigma, is_call, rate, dividend):
+    d1, d2 = _d1_d2(spot, strike, years, sigma, rate, dividend)
+    spot_pv = spot * np.exp(-dividend * years)
+    strike_pv = strike * np.exp(-rate * years)
+    # Put price from put-call parity saves two CDF evaluations
+    call = spot_pv * norm_cdf(d1) - strike_pv * norm_cdf(d2)
+    price = np.where(is_call, call, call - spot_pv + strike_pv)
+    return price, spot_pv * norm_pdf(d1) * np.sqrt(years)
+
+
+def bs_greeks(spot, strike, years, sigma, is_call, rate=RISK_FREE_RATE, dividend=DIVIDEND_YIELD):
+    """
+    Returns {'delta', 'gamma', 'theta', 'vega'}: theta per calendar day, vega per 1 point (1%) of volatility.
+    """
+    d1, d2 = _d1_d2(spot, strike, years, sigma, rate, dividend)
+    sqrt_t = np.sqrt(years)
+    spot_df = np.exp(-dividend * years)
+    strike_pv = strike * np.exp(-rate * years)
+    pdf_d1 = norm_pdf(d1)
+    cdf_d1, cdf_d2 = norm_cdf(d1), norm_cdf(d2)
+    decay = -spot * spot_df * pdf_d1 * sigma / (2 * sqrt_t)
+    call_theta = decay - rate * strike_pv * cdf_d2 + dividend * spot * spot_df * cdf_d1
+    put_theta = decay + rate * strike_pv * (1 - cdf_d2) - dividend * spot * spot_df * (1 - cdf_d1)
+    return {
+        'delta': np.where(is_call, spot_df * cdf_d1, spot_df * (cdf_d1 - 1)),
+        'gamma': spot_df * pdf_d1 / (spot * sigma * sqrt_t),
+        'theta': np.where(is_call, call_theta, put_theta) / 365,
+        'vega': spot * spot_df * pdf_d1 * sqrt_t / 100,
+    }
+
+
+def implied_volatility(price, spot, strike, years, is_call, rate=RISK_FREE_RATE, dividend=DIVIDEND_YIELD,
+                       initial=None, max_iterations=IV_MAX_ITERATIONS):
+    """
+    Solves Black-Scholes implied volatility for every contract. `initial` seeds the solve (NaN where
+    unknown). Returns (iv, iterations): iv is NaN where the price admits no volatility in
+    [IV_MIN, IV_MAX] or the solve did not converge.
+    """
+    price, spot, strike, years = np.broadcast_arrays(*(np.asarray(a, dtype=np.float64)
+                                                       for a in (price, spot, strike, years)))
+    is_call = np.broadcast_to(np.asarray(is_call, dtype=bool), price.shape)
+    spot_pv = spot * np.exp(-dividend * np.nan_to_num(years))
+    strike_pv = strike * np.exp(-rate * np.nan_to_num(years))
+    lower = np.maximum(np.where(is_call, spot_pv - strike_pv, strike_pv - spot_pv), 0)
+    upper = np.where(is_call, spot_pv, strike_pv)
+    active = (years > 0) & (price > lower) & (price < upper)
+
+    # Brenner-Subrahmanyam ATM approximation where there is no usable seed
+    seed = np.sqrt(2 * np.pi / np.where(years > 0, years, 1)) * price / spot
+    if initial is not None:
+        initial = np.asarray(initial, dtype=np.float64)
+        seed = np.where(np.isfinite(initial) & (initial > IV_MIN) & (initial < IV_MAX), initial, seed)
+    sigma = np.clip(np.nan_to_num(seed, nan=0.2), 2 * IV_MIN, IV_MAX / 2)
+    low = np.full(price.shape, IV_MIN)
+    high = np.full(price.shape, IV_MAX)
+    converged = np.zeros(price.shape, dtype=bool)
+
+    iterations = 0
+    index = np.flatnonzero(active)
+    while len(index) and iterations < max_iterations:
+        iterations += 1
+        s = sigma[index]
+        model, vega = _price_and_vega(spot[index], strike[index], years[index], s, is_call[index], rate, dividend)
+        error = model - price[index]
+        # Price rises with volatility, so the root lies below s if the model is too expensive
+        too_high = error > 0
+        lo = np.where(too_high, low[index], s)
+        hi = np.where(too_high, s, high[index])
+        low[index], high[index] = lo, hi
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            step = s - error / vega
+        outside = ~np.isfinite(step) | (step <= lo) | (step >= hi)
+        sigma[index] = np.where(outside, 0.5 * (lo + hi), step)
+        done = (np.abs(error) < IV_PRICE_TOLERANCE) | (hi - lo < IV_BRACKET_TOLERANCE)
+        sigma[index[done]] = s[done]
+        converged[index[done]] = True
+        index = index[~done]
+
+    # A root pinned at a bracket edge means the price needs a volatility outside [IV_MIN, IV_MAX]
+    iv = np.where(converged & (sigma > IV_MIN * 1.01) & (sigma < IV_MAX * 0.99), sigma, np.nan)
+    return iv, iterations
+
+
+class GreeksEngine:
+    """
+    Per-cycle IV and Greeks for a chain, warm-started from each contract's previous IV.
+    """
+
+    def __init__(self, rate=RISK_FREE_RATE, dividend=DIVIDEND_YIELD, warm_start=True):
+        self.rate = rate
+        self.dividend = dividend
+        self.warm_start = warm_start
+        self._previous_iv = {}
+        self._lock = threading.Lock()
+
+    def compute(self, rows, spot, expiry=None, now=None):
+        """
+        Returns {'iv', 'delta', 'gamma', 'theta', 'vega'} arrays aligned with rows (dicts with instrument_key,
+        strike_price, option_type and ltp), NaN where unknown. Rows without an instrument-master 'expiry'
+        expire at `expiry`.
+        """
+        count = len(rows)
+        keys = [r['instrument_key'] for r in rows]
+        strike = np.fromiter((r['strike_price'] for r in rows), np.float64, count)
+        is_call = np.fromiter((r['option_type'] == 'CE' for r in rows), bool, count)
+        price = np.fromiter((r['ltp'] for r in rows), np.float64, count)
+        years = years_to_expiry(np.fromiter((r.get('expiry', expiry) for r in rows), np.float64, count), now)
+        with self._lock:
+            initial = None
+            if self.warm_start and self._previous_iv:
+                initial = np.fromiter((self._previous_iv.get(k, np.nan) for k in keys), np.float64, count)
+            iv, iterations = implied_volatility(price, spot, strike, years, is_call, self.rate, self.dividend,
+                                                initial=initial)
+            self._previous_iv = {k: v for k, v in zip(keys, iv.tolist()) if v == v}
+        with np.errstate(invalid='ignore', divide='ignore'):
+            greeks = bs_greeks(spot, strike, years, iv, is_call, self.rate, self.dividend)
+        logger.debug(f"Solved IV for {np.isfinite(iv).sum()}/{count} contracts in {iterations} iterations")
+        return {'iv': iv, **greeks}
+
+    def annotate(self, rows, spot, expiry=None, now=None):
+        """
+        Adds iv/delta/gamma/theta/vega to each row in place (None where unknown) and returns the rows.
+        """
+        if not rows:
+            return rows
+        columns = self.compute(rows, spot, expiry, now)
+        for name in GREEK_FIELDS:
+            for row, value in zip(rows, columns[name].tolist()):
+                row[name] = value if value == value else None
+        return rows
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_greeks_engine():
+    """
+    Returns the process-wide GreeksEngine.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = GreeksEngine()
+    return _engine
+
+
+if __name__ == '__main__':
+    import random
+    from statistics import NormalDist
+
+    def scalar_iv(price, spot, strike, years, is_call, rate=RISK_FREE_RATE, dividend=DIVIDEND_YIELD):
+        # Per-contract Newton with math.* calls, as a plain-Python implementation would be written
+        cdf = NormalDist().cdf
+        sigma = 0.2
+        for _ in range(IV_MAX_ITERATIONS):
+            sqrt_t = math.sqrt(years)
+            d1 = (math.log(spot / strike) + (rate - dividend + 0.5 * sigma * sigma) * years) / (sigma * sqrt_t)
+            d2 = d1 - sigma * sqrt_t
+            spot_pv, strike_pv = spot * math.exp(-dividend * years), strike * math.exp(-rate * years)
+            call = spot_pv * cdf(d1) - strike_pv * cdf(d2)
+            model = call if is_call else call - spot_pv + strike_pv
+            vega = spot_pv * math.exp(-0.5 * d1 * d1) / math.sqrt(2 * math.pi) * sqrt_t
+            if abs(model - price) < IV_PRICE_TOLERANCE:
+                return sigma
+            if vega == 0:
+                return float('nan')
+            sigma = min(max(sigma - (model - price) / vega, IV_MIN), IV_MAX)
+        return float('nan')
+
+    # 5,000 contracts: 10 weekly expiries x 250 strikes (spot +-25%) x CE/PE, priced off a volatility smile
+    rng = random.Random(7)
+    spot = 25000.0
+    now = time.time()
+    rows = []
+    for week in range(1, 11):
+        expiry = (now + week * 7 * 86400) * 1000
+        for i in range(250):
+            strike = spot + 50 * (i - 125)
+            for option_type in ('CE', 'PE'):
+                rows.append({'instrument_key': f"NSE_FO|{week}{i}{option_type}", 'strike_price': strike,
+                             'option_type': option_type, 'expiry': expiry,
+                             'true_iv': 0.12 + 0.5 * (strike / spot - 1) ** 2 + rng.uniform(-0.005, 0.005)})
+    strike = np.array([r['strike_price'] for r in rows])
+    is_call = np.array([r['option_type'] == 'CE' for r in rows])
+    years = years_to_expiry([r['expiry'] for r in rows], now)
+    true_iv = np.array([r['true_iv'] for r in rows])
+    prices = np.round(bs_price(spot, strike, years, true_iv, is_call), 2)
+    for row, price in zip(rows, prices.tolist()):
+        row['ltp'] = price
+
+    def timed(fn, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = fn()
+        return (time.perf_counter() - start) / repeat * 1000, result
+
+    cold_ms, (iv, cold_iterations) = timed(lambda: implied_volatility(prices, spot, strike, years, is_call), 20)
+    solvable = np.isfinite(iv)
+    # IV is only pinned down where the price moves with it; elsewhere the 0.01 rounding dominates
+    sensitive = solvable & (bs_greeks(spot, strike, years, true_iv, is_call)['vega'] > 1)
+    greeks_ms, _ = timed(lambda: bs_greeks(spot, strike, years, iv, is_call), 20)
+
+    # The next snapshot: spot and prices move a little, seeded from this snapshot's IV
+    moved_spot = spot * 1.001
+    moved = np.round(bs_price(moved_spot, strike, years, true_iv * 1.01, is_call), 2)
+    warm_ms, (_, warm_iterations) = timed(
+        lambda: implied_volatility(moved, moved_spot, strike, years, is_call, initial=iv), 20)
+    moved_cold_ms, (_, moved_cold_iterations) = timed(
+        lambda: implied_volatility(moved, moved_spot, strike, years, is_call), 20)
+
+    engine = GreeksEngine()
+    engine.annotate(rows, spot, now=now)
+    engine_ms, _ = timed(lambda: engine.annotate(rows, spot, now=now), 20)
+
+    sample = range(0, len(rows), 10)
+    start = time.perf_counter()
+    for i in sample:
+        scalar_iv(prices[i], spot, strike[i], years[i], is_call[i])
+    scalar_ms = (time.perf_counter() - start) * 1000 * len(rows) / len(sample)
+
+    print(f"{len(rows):,} contracts, {solvable.sum():,} with a solvable price "
+          f"(the rest are deep ITM/OTM, priced at or past their no-arbitrage bound after rounding):")
+    print(f"  cold IV solve {cold_ms:.1f} ms ({cold_iterations} iterations), Greeks {greeks_ms:.1f} ms")
+    print(f"  next snapshot: warm start {warm_ms:.1f} ms ({warm_iterations} iterations) vs cold "
+          f"{moved_cold_ms:.1f} ms ({moved_cold_iterations} iterations)")
+    print(f"  GreeksEngine.annotate on rows (warm) {engine_ms:.1f} ms")
+    print(f"  max |IV error| {np.abs(iv - true_iv)[sensitive].max():.2e} where vega > 1 per vol point "
+          f"({sensitive.sum():,} contracts); "
+          f"per-contract scalar Newton ~{scalar_ms:.0f} ms for the chain")
@@ -1,38 +1,224 @@
+"""
+Vectorized technical indicators over NumPy arrays.
+
+Wilder smoothing is a first-order recursive filter, evaluated with
+scipy.signal.lfilter for long series when SciPy is installed and with a blocked
+closed-form NumPy evaluation otherwise (stepwise for decays so small that
+decay**-k would overflow within a block). scipy.signal takes about a second to
+import, so it is only imported the first time a long series needs it. Rolling
+min/max run in O(n) whatever the window (van Herk/Gil-Werman). Every *_series
+function returns the full series; calculate_stochrsi keeps returning only the
+latest value for the API endpoints.
+
+Run `python indicator_utils.py` to benchmark against the previous loop-based
+implementation on 100k bars; tests/test_indicator_utils.py checks that they agree.
+"""
 import numpy as np
 
+# Block length for the NumPy fallback; keeps decay**-BLOCK well inside float64 range
+_FILTER_BLOCK = 256
+# Smallest decay**_FILTER_BLOCK the blocked evaluation accepts before dividing by it
+_MIN_BLOCK_POWER = 1e-250
+# Shorter series use the NumPy evaluation, which is fast enough to not be worth importing SciPy for
+LFILTER_MIN_LENGTH = 50_000
+
+_lfilter = None
+
+
+def _scipy_lfilter():
+    """
+    Returns scipy.signal.lfilter, imported on first use, or None when SciPy is not installed.
+    """
+    global _lfilter
+    if _lfilter is None:
+        try:
+            from scipy.signal import lfilter
+        except ImportError:  # SciPy is optional
+            lfilter = False
+        _lfilter = lfilter
+    return _lfilter or None
+
+
+def recursive_filter(x, decay, initial):
+    """
+    Evaluates y[t] = decay * y[t-1] + x[t] with y[-1] = initial, for all t.
+    """
+    x = np.asarray(x, dtype=float)
+    if len(x) == 0 or decay == 0:
+        return x.copy()
+    lfilter = _scipy_lfilter() if len(x) >= LFILTER_MIN_LENGTH else None
+    if lfilter is not None:
+        y, _ = lfilter([1.0], [1.0, -decay], x, zi=[decay * initial])
+        return y
+    if decay ** _FILTER_BLOCK < _MIN_BLOCK_POWER:
+        y = np.empty_like(x)
+        prev = initial
+        for i, value in enumerate(x.tolist()):
+            prev = decay * prev + value
+            y[i] = prev
+        return y
+    # Within a block, y[t] = decay**(t+1) * (y_prev + sum_{k<=t} x[k] / decay**(k+1))
+    y = np.empty_like(x)
+    prev = initial
+    for start in range(0, len(x), _FILTER_BLOCK):
+        block = x[start:start + _FILTER_BLOCK]
+        powers = decay ** np.arange(1, len(block) + 1)
+        y[start:start + len(block)] = powers * (prev + np.cumsum(block / powers))
+        prev = y[start + len(block) - 1]
+    return y
+
+
+def wilder_smooth(values, period, initial):
+    """
+    Wilder's smoothing: avg[t] = (avg[t-1] * (period - 1) + values[t]) / period, seeded with `initial`.
+    """
+    return recursive_filter(np.asarray(values, dtype=float) / period, (period - 1) / period, initial)
+
+
+def _rolling_extreme(values, window, ufunc, fill):
+    """
+    Trailing-window extreme in O(n) (van Herk/Gil-Werman): prefix and suffix extremes within
+    blocks of `window` values, combined pairwise for every window.
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    out = np.full(n, np.nan)
+    if n < window:
+        return out
+    padded = np.full(-(-n // window) * window, fill)
+    padded[:n] = values
+    blocks = padded.reshape(-1, window)
+    prefix = ufunc.accumulate(blocks, axis=1).ravel()
+    suffix = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    # Window [i, i + window - 1] = suffix of i's block + prefix up to the window's end
+    starts = np.arange(n - window + 1)
+    out[window - 1:] = ufunc(suffix[starts], prefix[starts + window - 1])
+    return out
+
+
+def rolling_min(values, window):
+    """
+    Minimum over each trailing window; entries before the first full window are NaN.
+    """
+    return _rolling_extreme(values, window, np.minimum, np.inf)
+
+
+def rolling_max(values, window):
+    """
+    Maximum over each trailing window; entries before the first full window are NaN.
+    """
+    return _rolling_extreme(values, window, np.maximum, -np.inf)
+
+
+def _rsi_from_averages(up, down):
+    # A zero average loss yields rs = 0, matching the original implementation
+    rs = np.divide(up, down, out=np.zeros_like(up), where=down != 0)
+    return 100. - 100. / (1. + rs)
+
+
+def rsi_series(closes, period=14):
+    """
+    Wilder RSI for every bar. The first `period` bars hold the seed RSI.
+    Returns None if there are not enough closes.
+    """
+    closes = np.asarray(closes, dtype=float)
+    if len(closes) <= period:
+        return None
+    deltas = np.diff(closes)
+    seed = deltas[:period + 1]
+    up0 = seed[seed >= 0].sum() / period
+    down0 = -seed[seed < 0].sum() / period
+    # Bar i (i >= period) is smoothed with deltas[i - 1]
+    gains = np.clip(deltas[period - 1:], 0, None)
+    losses = np.clip(-deltas[period - 1:], 0, None)
+    up = wilder_smooth(gains, period, up0)
+    down = wilder_smooth(losses, period, down0)
+
+    rsi = np.empty(len(closes))
+    rsi[:period] = _rsi_from_averages(np.array([up0]), np.array([down0]))[0]
+    rsi[period:] = _rsi_from_averages(up, down)
+    return rsi
+
+
+def stochrsi_series(closes, period=14):
+    """
+    Stochastic RSI (0-1) for every bar; the first `period` bars are 0.
+    Returns None if there are fewer than 2 * period closes.
+    """
+    if len(closes) < period * 2:
+        return None
+    rsi = rsi_series(closes, period)
+    lowest = rolling_min(rsi, period)
+    highest = rolling_max(rsi, period)
+    spread = highest - lowest
+    stochrsi = np.zeros_like(rsi)
+    valid = np.arange(len(rsi)) >= period
+    np.divide(rsi - lowest, spread, out=stochrsi, where=valid & (spread != 0))
+    return stochrsi
+
+
+def closes_from_candles(candles):
+    """
+    Extracts close prices from a {'data': {'candles': [...]}} response as a float array.
+    """
+    return np.array([c[4] for c in candles['data']['candles']], dtype=float)
+
 
 def calculate_stochrsi(candles, period=14):
     """
     Calculate Stochastic RSI from a list of candle dicts with 'close' prices.
     Returns the latest Stochastic RSI value (0-1 float).
     """
-    closes = [c[4] for c in candles['data']['candles']]
-    if len(closes) < period * 2:
+    stochrsi = stochrsi_series(closes_from_candles(candles), period)
+    if stochrsi is None:
         return None
-    # Calculate RSI
-    deltas = np.diff(closes)
-    seed = deltas[:period+1]
-    up = seed[seed >= 0].sum()/period
-    down = -seed[seed < 0].sum()/period
-    rs = up/down if down != 0 else 0
-    rsi = np.zeros_like(closes)
-    rsi[:period] = 100. - 100./(1.+rs)
-    for i in range(period, len(closes)):
-        delta = deltas[i-1]
-        if delta > 0:
-            upval = delta
-            downval = 0.
-        else:
-            upval = 0.
-            downval = -delta
-        up = (up*(period-1) + upval)/period
-        down = (down*(period-1) + downval)/period
-        rs = up/down if down != 0 else 0
-        rsi[i] = 100. - 100./(1.+rs)
-    # Calculate Stochastic RSI
-    stochrsi = np.zeros_like(rsi)
-    for i in range(period, len(rsi)):
-        min_rsi = np.min(rsi[i-period+1:i+1])
-        max_rsi = np.max(rsi[i-period+1:i+1])
-        stochrsi[i] = (rsi[i] - min_rsi) / (max_rsi - min_rsi) if max_rsi != min_rsi else 0
     return float(stochrsi[-1])
+
+
+if __name__ == '__main__':
+    import time
+
+    def loop_stochrsi(closes, period=14):
+        # The previous per-bar implementation, kept here as the benchmark and equivalence reference
+        deltas = np.diff(closes)
+        seed = deltas[:period+1]
+        up = seed[seed >= 0].sum()/period
+        down = -seed[seed < 0].sum()/period
+        rs = up/down if down != 0 else 0
+        rsi = np.zeros_like(closes)
+        rsi[:period] = 100. - 100./(1.+rs)
+        for i in range(period, len(closes)):
+            delta = deltas[i-1]
+            if delta > 0:
+                upval = delta
+                downval = 0.
+            else:
+                upval = 0.
+                downval = -delta
+            up = (up*(period-1) + upval)/period
+            down = (down*(period-1) + downval)/period
+            rs = up/down if down != 0 else 0
+            rsi[i] = 100. - 100./(1.+rs)
+        stochrsi = np.zeros_like(rsi)
+        for i in range(period, len(rsi)):
+            min_rsi = np.min(rsi[i-period+1:i+1])
+            max_rsi = np.max(rsi[i-period+1:i+1])
+            stochrsi[i] = (rsi[i] - min_rsi) / (max_rsi - min_rsi) if max_rsi != min_rsi else 0
+        return stochrsi
+
+    rng = np.random.default_rng(42)
+    closes = 25000 + np.cumsum(rng.normal(0, 10, 100_000))
+
+    start = time.perf_counter()
+    expected = loop_stochrsi(closes)
+    loop_time = time.perf_counter() - start
+
+    _scipy_lfilter()  # keep the one-off SciPy import out of the timing
+    start = time.perf_counter()
+    actual = stochrsi_series(closes)
+    vector_time = time.perf_counter() - start
+
+    max_error = np.max(np.abs(actual - expected))
+    print(f"100k bars: loop {loop_time * 1000:.1f} ms, vectorized {vector_time * 1000:.1f} ms "
+          f"({loop_time / vector_time:.0f}x), filter={'lfilter' if _scipy_lfilter() else 'numpy'}")
+    print(f"max abs difference: {max_error:.2e}")
@@ -0,0 +1,119 @@
+"""
+Option-chain ingestion: one poll cycle turns live quotes into a stored snapshot.
+
+Each cycle reads the spot price, selects the strike window around ATM from the
+instrument master, pulls quotes for every CE/PE in the window with batched quote
+requests, solves IV and Greeks for the whole batch (greeks.py) and hands a snapshot
+plus all its rows to the bulk writer, which writes them in a single transaction.
+
+Run `python ingestion.py --cycles 20 --strikes 50` to load-test the pipeline offline
+against a fake quote source.
+"""
+import argparse
+import datetime
+import time
+import crud
+from bulk_writer import get_option_writer
+from greeks import get_greeks_engine
+from instrument_master import get_instrument_master
+from logger_config import get_logger
+
+# Get logger instance
+logger = get_logger(__name__)
+
+
+def select_window_contracts(master, symbol, expiry, spot_price, strikes_each_side):
+    """
+    Returns the CE/PE instrument records for the ATM strike and `strikes_each_side` strikes either side.
+    """
+    contracts = []
+    for strike in master.strike_window(symbol, expiry, spot_price, below=strikes_each_side, above=strikes_each_side):
+        for option_type in ('CE', 'PE'):
+            option = master.find(symbol, expiry, strike, option_type)
+            if option:
+                contracts.append(option)
+    return contracts
+
+
+def ingest_option_chain(db, quote_source, expiry, symbol='NIFTY', strikes_each_side=5, writer=None):
+    """
+    Runs one ingestion cycle and returns its stats: spot, rows ingested, upstream calls and elapsed seconds,
+    plus the expiry, the snapshot time and the ingested rows themselves ('expiry', 'taken_at', 'chain'). Rows go through `writer` (the shared OptionDataWriter by default), which may hold them for a later flush.
+    """
+    writer = writer or get_option_writer()
+    start = time.perf_counter()
+    calls_before = quote_source.upstream_calls
+    master = get_instrument_master()
+
+    spot_price = quote_source.get_spot()
+    contracts = select_window_contracts(master, symbol, expiry, spot_price, strikes_each_side)
+    quotes = quote_source.get_quotes([c['instrument_key'] for c in contracts])
+
+    previous_oi = crud.get_previous_oi_bulk(db, [c['instrument_key'] for c in contracts if c['instrument_key'] in quotes])
+    option_data_to_save = []
+    for contract in contracts:
+        quote = quotes.get(contract['instrument_key'])
+        if quote is None:
+            logger.warning(f"No quote for {contract['instrument_key']}, skipping")
+            continue
+        prev_oi = previous_oi[contract['instrument_key']]
+        current_oi = quote['oi']
+        option_data_to_save.append({
+            'instrument_key': contract['instrument_key'],
+            'strike_price': contract['strike_price'],
+            'option_type': contract['instrument_type'],
+            'ltp': quote['ltp'],
+            'oi': current_oi,
+            'change_in_oi': current_oi - prev_oi if prev_oi is not None else 0
+        })
+
+    taken_at = datetime.datetime.utcnow()
+    try:
+        get_greeks_engine().annotate(option_data_to_save, spot_price, expiry)
+    except Exception as e:
+        logger.error(f"Error computing Greeks: {str(e)}", exc_info=True)
+    if option_data_to_save:
+        snapshot = {'taken_at': taken_at, 'spot': spot_price, 'expiry': expiry}
+        # Rows may still be buffered in the writer (or kept for a retry), so update the previous-OI cache first
+        crud.record_latest_oi((row['instrument_key'], row['oi']) for row in option_data_to_save)
+        writer.add(snapshot, option_data_to_save)
+
+    stats = {
+        'spot': spot_price,
+        'rows': len(option_data_to_save),
+        'upstream_calls': quote_source.upstream_calls - calls_before,
+        'seconds': time.perf_counter() - start,
+        'expiry': expiry,
+        'taken_at': taken_at,
+        'chain': option_data_to_save,
+    }
+    logger.info(f"Ingested {stats['rows']} rows at spot {spot_price:.2f} with "
+                f"{stats['upstream_calls']} upstream calls in {stats['seconds'] * 1000:.1f} ms")
+    return stats
+
+
+if __name__ == '__main__':
+    import database
+    from fakes import FakeQuoteSource
+
+    parser = argparse.ArgumentParser(description="Load-test the ingestion pipeline against a fake quote source")
+    parser.add_argument('--cycles', type=int, default=20)
+    parser.add_argument('--strikes', type=int, default=5, help="Strikes on each side of ATM")
+    parser.add_argument('--latency', type=float, default=0.05, help="Fake upstream latency per call (s)")
+    args = parser.parse_args()
+
+    database.create_db_and_tables()
+    master = get_instrument_master()
+    expiry = max(master.expiries('NIFTY'), key=lambda e: len(master.strikes('NIFTY', e)))
+    source = FakeQuoteSource(latency=args.latency, seed=1)
+    timings = []
+    for _ in range(args.cycles):
+        db = database.SessionLocal()
+        try:
+            timings.append(ingest_option_chain(db, source, expiry, strikes_each_side=args.strikes))
+        finally:
+            db.close()
+    seconds = sorted(t['seconds'] for t in timings)
+    print(f"{args.cycles} cycles, {timings[-1]['rows']} rows/cycle, "
+          f"{timings[-1]['upstream_calls']} upstream calls/cycle")
+    print(f"cycle latency: median {seconds[len(seconds) // 2] * 1000:.1f} ms, max {seconds[-1] * 1000:.1f} ms")
@@ -0,0 +1,265 @@
+"""
+In-memory instrument master built from the NSE_FO.json instrument dump.
+
+The dump is parsed once and kept column-oriented (one list or array per field) with
+dictionary indexes on instrument_key and on the (asset_symbol, expiry, strike,
+instrument_type) tuple, plus a sorted strike list per (asset_symbol, expiry) so
+ATM lookups are a bisect. The file is only re-parsed when its mtime changes.
+
+If a binary snapshot (see instrument_snapshot.py) at least as new as the JSON dump
+exists, the columns are memory-mapped from it instead of parsing the JSON.
+"""
+import bisect
+import datetime
+import json
+import os
+import threading
+import numpy as np
+from candle_store import EXCHANGE_UTC_OFFSET
+from instrument_snapshot import InstrumentSnapshot
+from logger_config import get_logger
+
+# Get logger instance
+logger = get_logger(__name__)
+
+INSTRUMENTS_FILE = os.environ.get(
+    "INSTRUMENTS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'NSE_FO.json')
+)
+INSTRUMENTS_SNAPSHOT = os.environ.get("INSTRUMENTS_SNAPSHOT", os.path.splitext(INSTRUMENTS_FILE)[0] + '.snap')
+
+# Fields kept from each instrument record, in column order
+FIELDS = (
+    'instrument_key', 'trading_symbol', 'asset_symbol', 'instrument_type', 'segment',
+    'exchange', 'name', 'underlying_key', 'expiry', 'strike_price', 'lot_size',
+    'tick_size', 'freeze_quantity', 'minimum_lot', 'weekly',
+)
+
+
+def expiry_date(expiry):
+    """
+    Returns the exchange-local date of an expiry epoch in milliseconds, whatever the server's timezone.
+    """
+    return (datetime.datetime.fromtimestamp(expiry / 1000, datetime.timezone.utc) + EXCHANGE_UTC_OFFSET).date()
+
+
+def expiry_label(trading_symbol):
+    """
+    Returns the expiry part of a trading symbol, e.g. '30 DEC 25' for 'NIFTY 27000 CE 30 DEC 25'.
+    """
+    return ' '.join(trading_symbol.split()[-3:])
+
+
+def _as_list(column):
+    return column.tolist() if isinstance(column, np.ndarray) else column
+
+
+class InstrumentMaster:
+    """
+    Column-oriented, indexed view over the instrument dump.
+    """
+
+    def __init__(self, path=INSTRUMENTS_FILE, snapshot_path=INSTRUMENTS_SNAPSHOT):
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self._lock = threading.Lock()
+        self._version = None
+        self._columns = {field: [] for field in FIELDS}
+        self._by_key = {}
+        self._by_contract = {}
+        self._strikes = {}
+        self._expiries = {}
+        self._expiry_labels = {}
+
+    def __len__(self):
+        self.refresh()
+        return len(self._columns['instrument_key'])
+
+    def _current_source(self):
+        """
+        Returns (path, mtime) of the file to load: the snapshot if it is up to date, else the JSON dump.
+        """
+        mtime = os.stat(self.path).st_mtime
+        try:
+            snapshot_mtime = os.stat(self.snapshot_path).st_mtime
+        except (OSError, TypeError):
+            return self.path, mtime
+        if snapshot_mtime >= mtime:
+            return self.snapshot_path, snapshot_mtime
+        return self.path, mtime
+
+    def refresh(self):
+        """
+        Reloads the instruments if the source file changed since the last load.
+        """
+        version = self._current_source()
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                self._load(*version)
+
+    def _load(self, path, mtime):
+        logger.info(f"Loading instrument master from {path}")
+        if path == self.snapshot_path:
+            snapshot = InstrumentSnapshot(path)
+            columns = {field: snapshot.columns[field] for field in FIELDS}
+            rows = len(snapshot)
+        else:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            columns = {field: [instrument.get(field) for instrument in data] for field in FIELDS}
+            rows = len(data)
+        self._build(columns)
+        self._version = (path, mtime)
+        logger.info(f"Instrument master loaded with {rows} instruments")
+
+    def _build(self, columns):
+        by_key = {}
+        by_contract = {}
+        strikes = {}
+        expiries = {}
+        expiry_labels = {}
+        contracts = zip(
+            columns['instrument_key'], columns['asset_symbol'], _as_list(columns['expiry']),
+            _as_list(columns['strike_price']), columns['instrument_type'], columns['trading_symbol'],
+        )
+        for row, (key, symbol, expiry, strike, instrument_type, trading_symbol) in enumerate(contracts):
+            by_key[key] = row
+            by_contract[(symbol, expiry, strike, instrument_type)] = row
+            expiries.setdefault(symbol, set()).add(expiry)
+            expiry_labels.setdefault((symbol, expiry), expiry_label(trading_symbol))
+            if instrument_type in ('CE', 'PE'):
+                strikes.setdefault((symbol, expiry), set()).add(strike)
+
+        # Swap everything in at once so readers never see a half-built index
+        self._columns = columns
+        self._by_key = by_key
+        self._by_contract = by_contract
+        self._strikes = {k: sorted(v) for k, v in strikes.items()}
+        self._expiries = {k: sorted(v) for k, v in expiries.items()}
+        self._expiry_labels = expiry_labels
+
+    def _row(self, row):
+        record = {}
+        for field in FIELDS:
+            value = self._columns[field][row]
+            record[field] = value.item() if isinstance(value, np.generic) else value
+        return record
+
+    def get(self, instrument_key):
+        """
+        Returns the instrument record for an instrument key, or None.
+        """
+        self.refresh()
+        row = self._by_key.get(instrument_key)
+        return self._row(row) if row is not None else None
+
+    def find(self, symbol, expiry, strike_price, instrument_type):
+        """
+        Returns the instrument record for a contract, or None.
+        expiry is the epoch in milliseconds as stored in the instrument dump.
+        """
+        self.refresh()
+        row = self._by_contract.get((symbol, expiry, strike_price, instrument_type))
+        return self._row(row) if row is not None else None
+
+    def expiries(self, symbol):
+        """
+        Returns the sorted expiry epochs (ms) available for a symbol.
+        """
+        self.refresh()
+        return self._expiries.get(symbol, [])
+
+    def expiries_matching(self, symbol, expiry_text):
+        """
+        Returns expiries whose trading-symbol label (e.g. '30 DEC 25') contains expiry_text.
+        """
+        return [e for e in self.expiries(symbol) if expiry_text in self._expiry_labels[(symbol, e)]]
+
+    def expiries_on(self, symbol, date):
+        """
+        Returns expiries that fall on the given exchange-local date.
+        """
+        return [e for e in self.expiries(symbol) if expiry_date(e) == date]
+
+    def nearest_expiry(self, symbol, now=None):
+        """
+        Returns the earliest expiry that has not passed yet, or None.
+        """
+        now = now or datetime.datetime.now()
+        expiries = self.expiries(symbol)
+        idx = bisect.bisect_left(expiries, now.timestamp() * 1000)
+        return expiries[idx] if idx < len(expiries) else None
+
+    def strikes(self, symbol, expiry):
+        """
+        Returns the sorted option strikes listed for a symbol and expiry.
+        """
+        self.refresh()
+        return self._strikes.get((symbol, expiry), [])
+
+    def atm_strike(self, symbol, expiry, price):
+        """
+        Returns the strike closest to price, or None if no strikes are listed.
+        """
+        strikes = self.strikes(symbol, expiry)
+        if not strikes:
+            return None
+        idx = bisect.bisect_left(strikes, price)
+        candidates = strikes[max(0, idx - 1):idx + 1]
+        return min(candidates, key=lambda s: abs(s - price))
+
+    def strike_window(self, symbol, expiry, price, below=5, above=5):
+        """
+        Returns the ATM strike plus up to `below` strikes under it and `above` strikes over it.
+        """
+        strikes = self.strikes(symbol, expiry)
+        atm = self.atm_strike(symbol, expiry, price)
+        if atm is None:
+            return []
+        idx = bisect.bisect_left(strikes, atm)
+        return strikes[max(0, idx - below):idx + above + 1]
+
+    def options_above(self, symbol, expiry, instrument_type, price, count):
+        """
+        Returns up to `count` option records with strikes strictly above price, nearest first.
+        """
+        strikes = self.strikes(symbol, expiry)
+        idx = bisect.bisect_right(strikes, price)
+        return self._collect(symbol, expiry, instrument_type, strikes[idx:], count)
+
+    def options_below(self, symbol, expiry, instrument_type, price, count):
+        """
+        Returns up to `count` option records with strikes strictly below price, nearest first.
+        """
+        strikes = self.strikes(symbol, expiry)
+        idx = bisect.bisect_left(strikes, price)
+        return self._collect(symbol, expiry, instrument_type, reversed(strikes[:idx]), count)
+
+    def _collect(self, symbol, expiry, instrument_type, strikes, count):
+        selected = []
+        for strike in strikes:
+            if len(selected) >= count:
+                break
+            row = self._by_contract.get((symbol, expiry, strike, instrument_type))
+            if row is not None:
+                selected.append(self._row(row))
+        return selected
+
+
+_master = None
+_master_lock = threading.Lock()
+
+
+def get_instrument_master():
+    """
+    Returns the process-wide InstrumentMaster, refreshed if the dump changed on disk.
+    """
+    global _master
+    if _master is None:
+        with _master_lock:
+            if _master is None:
+                _master = InstrumentMaster()
+    _master.refresh()
+    return _master
@@ -0,0 +1,284 @@
+"""
+Compact binary snapshot of an instrument dump (NSE_FO.json or NSE.json.gz).
+
+Numeric columns are stored as raw little-endian NumPy arrays and string columns
+are dictionary encoded (int32 codes per row plus a shared string table), all in a
+single file that readers open with np.memmap. Every worker mapping the same file
+shares its pages through the OS page cache instead of holding its own parsed list
+of dicts.
+
+File layout: 8-byte magic, uint64 header length, JSON header, then the column
+buffers, each aligned to 8 bytes.
+
+Usage:
+    python instrument_snapshot.py build --source ../NSE_FO.json --out ../NSE_FO.snap
+    python instrument_snapshot.py bench --source ../NSE_FO.json --snapshot ../NSE_FO.snap
+"""
+import argparse
+import gzip
+import io
+import json
+import os
+import struct
+import subprocess
+import sys
+import numpy as np
+from logger_config import get_logger
+
+# Get logger instance
+logger = get_logger(__name__)
+
+MAGIC = b'OISNAP01'
+ALIGNMENT = 8
+
+NUMERIC_COLUMNS = {
+    'expiry': '<i8',
+    'strike_price': '<f8',
+    'lot_size': '<i4',
+    'tick_size': '<f8',
+    'freeze_quantity': '<f8',
+    'minimum_lot': '<i4',
+    'weekly': '|b1',
+}
+
+STRING_COLUMNS = (
+    'instrument_key', 'trading_symbol', 'asset_symbol', 'instrument_type', 'segment',
+    'exchange', 'name', 'underlying_key',
+)
+
+
+def read_instruments(source):
+    """
+    Reads an instrument dump from a .json or .json.gz file, or from an http(s) URL.
+    """
+    if source.startswith(('http://', 'https://')):
+        import requests
+        response = requests.get(source)
+        response.raise_for_status()
+        raw = response.content
+        if source.endswith('.gz'):
+            raw = gzip.decompress(raw)
+        return json.load(io.BytesIO(raw))
+    if source.endswith('.gz'):
+        with gzip.open(source, 'rt') as f:
+            return json.load(f)
+    with open(source, 'r') as f:
+        return json.load(f)
+
+
+def _pad(buf):
+    return buf + b'\0' * (-len(buf) % ALIGNMENT)
+
+
+def build_snapshot(source, out_path):
+    """
+    Converts an instrument dump into a binary snapshot at out_path.
+    """
+    instruments = read_instruments(source)
+    logger.info(f"Building instrument snapshot from {source} ({len(instruments)} instruments)")
+
+    buffers = []
+    offset = 0
+    columns = {}
+
+    def add_buffer(array):
+        nonlocal offset
+        data = _pad(array.tobytes())
+        spec = {'dtype': array.dtype.str, 'offset': offset, 'length': len(array)}
+        buffers.append(data)
+        offset += len(data)
+        return spec
+
+    for name, dtype in NUMERIC_COLUMNS.items():
+        values = [instrument.get(name) or 0 for instrument in instruments]
+        columns[name] = {'kind': 'numeric', 'data': add_buffer(np.asarray(values, dtype=dtype))}
+
+    for name in STRING_COLUMNS:
+        table = {}
+        codes = np.empty(len(instruments), dtype='<i4')
+        for row, instrument in enumerate(instruments):
+            value = instrument.get(name)
+            codes[row] = -1 if value is None else table.setdefault(value, len(table))
+        encoded = [value.encode('utf-8') for value in table]
+        string_offsets = np.zeros(len(encoded) + 1, dtype='<u4')
+        np.cumsum([len(b) for b in encoded], out=string_offsets[1:])
+        columns[name] = {
+            'kind': 'string',
+            'codes': add_buffer(codes),
+            'table_offsets': add_buffer(string_offsets),
+            'table_blob': add_buffer(np.frombuffer(b''.join(encoded), dtype='|u1')),
+        }
+
+    header = json.dumps({
+        'rows': len(instruments),
+        'source': source,
+        'columns': columns,
+    }).encode('utf-8')
+    # MAGIC plus the length field is 16 bytes, so padding the header keeps buffers aligned
+    header += b' ' * (-len(header) % ALIGNMENT)
+
+    tmp_path = out_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        for data in buffers:
+            f.write(data)
+    # Atomic replace so workers never map a half-written file
+    os.replace(tmp_path, out_path)
+    logger.info(f"Wrote instrument snapshot to {out_path} ({os.path.getsize(out_path)} bytes)")
+    return out_path
+
+
+class StringColumn:
+    """
+    Dictionary-encoded string column: row codes plus a lazily decoded string table.
+    """
+
+    def __init__(self, codes, table_offsets, table_blob):
+        self.codes = codes
+        self._offsets = table_offsets
+        self._blob = table_blob
+        self._table = None
+        self._lookup = None
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def table(self):
+        if self._table is None:
+            offsets = self._offsets.tolist()
+            blob = self._blob.tobytes()
+            self._table = [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+        return self._table
+
+    def code_of(self, value):
+        """
+        Returns the code for value, or -2 (never present) if it is not in the table.
+        """
+        if self._lookup is None:
+            self._lookup = {value: code for code, value in enumerate(self.table)}
+        return self._lookup.get(value, -2)
+
+    def __getitem__(self, row):
+        code = self.codes[row]
+        return self.table[code] if code >= 0 else None
+
+    def __iter__(self):
+        table = self.table
+        return (table[code] if code >= 0 else None for code in self.codes.tolist())
+
+
+class InstrumentSnapshot:
+    """
+    Read-only, memory-mapped view over a snapshot written by build_snapshot.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not an instrument snapshot")
+            (header_len,) = struct.unpack('<Q', f.read(8))
+            header = json.loads(f.read(header_len))
+        self.rows = header['rows']
+        self.source = header['source']
+        data_start = len(MAGIC) + 8 + header_len
+        self._mmap = np.memmap(path, dtype='|u1', mode='r')
+        self.columns = {}
+        for name, spec in header['columns'].items():
+            if spec['kind'] == 'numeric':
+                self.columns[name] = self._view(data_start, spec['data'])
+            else:
+                self.columns[name] = StringColumn(
+                    self._view(data_start, spec['codes']),
+                    self._view(data_start, spec['table_offsets']),
+                    self._view(data_start, spec['table_blob']),
+                )
+
+    def _view(self, data_start, spec):
+        dtype = np.dtype(spec['dtype'])
+        start = data_start + spec['offset']
+        return self._mmap[start:start + spec['length'] * dtype.itemsize].view(dtype)
+
+    def __len__(self):
+        return self.rows
+
+    def select(self, **equals):
+        """
+        Returns the row indexes whose string columns equal all of the given values.
+        """
+        mask = np.ones(self.rows, dtype=bool)
+        for name, value in equals.items():
+            column = self.columns[name]
+            mask &= column.codes == column.code_of(value)
+        return np.flatnonzero(mask)
+
+    def row(self, row):
+        """
+        Returns a single instrument record as a dict.
+        """
+        record = {}
+        for name, column in self.columns.items():
+            value = column[row]
+            record[name] = value.item() if isinstance(value, np.generic) else value
+        return record
+
+
+def _measure(loader, path):
+    """
+    Loads the instruments in a fresh interpreter and reports load time and peak RSS.
+    """
+    code = (
+        "import resource, time, sys\n"
+        "t = time.perf_counter()\n"
+        f"{loader}\n"
+        "elapsed = time.perf_counter() - t\n"
+        "print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n"
+    )
+    before = subprocess.run(
+        [sys.executable, '-c', "import resource, numpy, json, instrument_snapshot;"
+                               "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"],
+        capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', "import numpy, json, instrument_snapshot\n" + code.replace('PATH', repr(path))],
+        capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    elapsed, rss = result.stdout.split()[-2:]
+    return float(elapsed), (int(rss) - int(before.stdout.split()[-1])) / 1024
+
+
+def benchmark(source, snapshot_path):
+    json_loader = "rows = instrument_snapshot.read_instruments(PATH)"
+    snap_loader = ("snap = instrument_snapshot.InstrumentSnapshot(PATH)\n"
+                   "keys = snap.columns['instrument_key'].table")
+    json_time, json_rss = _measure(json_loader, source)
+    snap_time, snap_rss = _measure(snap_loader, snapshot_path)
+    print(f"{'path':<10}{'load (ms)':>12}{'extra RSS (MiB)':>18}")
+    print(f"{'json':<10}{json_time * 1000:>12.2f}{json_rss:>18.2f}")
+    print(f"{'snapshot':<10}{snap_time * 1000:>12.2f}{snap_rss:>18.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or benchmark instrument snapshots")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="Convert an instrument dump into a snapshot")
+    build.add_argument('--source', required=True, help="Path or URL of a .json / .json.gz instrument dump")
+    build.add_argument('--out', required=True, help="Snapshot file to write")
+
+    bench = subparsers.add_parser('bench', help="Compare JSON and snapshot load time and RSS")
+    bench.add_argument('--source', required=True, help="Path of the JSON instrument dump")
+    bench.add_argument('--snapshot', required=True, help="Path of the snapshot built from it")
+
+    args = parser.parse_args(argv)
+    if args.command == 'build':
+        build_snapshot(args.source, args.out)
+    else:
+        benchmark(args.source, args.snapshot)
+
+
+if __name__ == '__main__':
+    main()
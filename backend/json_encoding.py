@@ -0,0 +1,160 @@
+"""
+Fast JSON encoding for API responses.
+
+encode() serializes with orjson (JSON_ENCODER=orjson, the default) and falls back to
+the standard library when orjson is not installed or JSON_ENCODER=json. Both accept
+NumPy arrays and scalars as they are, so handlers can return candle-store columns or
+analytics results without tolist()/float() casts. They also accept datetimes and dates
+(ISO 8601) and non-string dict keys. FastJSONResponse renders with encode() and is the
+app's default response class. Handlers that return NumPy data must return a
+FastJSONResponse themselves, because FastAPI runs plain return values through
+jsonable_encoder first, which does not understand NumPy.
+
+columns() turns per-row records into the compact columnar shape ({field: [values]})
+that the history and chain endpoints serve with ?shape=columns. Field names are then
+sent once instead of once per row.
+
+Run `python json_encoding.py` to compare encode time and payload size for a full
+chain and a year of history.
+"""
+import datetime
+import decimal
+import json
+import os
+import numpy as np
+from fastapi.responses import JSONResponse
+from logger_config import get_logger
+
+# Get logger instance
+logger = get_logger(__name__)
+
+# 'orjson' (default) or 'json' for the standard library encoder
+JSON_ENCODER = os.environ.get("JSON_ENCODER", "orjson")
+SHAPES = ('rows', 'columns')
+
+_orjson = None
+
+
+def _orjson_module():
+    """
+    Returns the orjson module, or None if it is not installed or JSON_ENCODER selects the standard library.
+    """
+    global _orjson
+    if _orjson is None:
+        _orjson = False
+        if JSON_ENCODER == 'orjson':
+            try:
+                import orjson
+                _orjson = orjson
+            except ImportError:
+                logger.warning("orjson is not installed, encoding responses with the standard json module")
+    return _orjson or None
+
+
+def _orjson_default(obj):
+    # orjson serializes C-contiguous numeric arrays itself; column views of structured arrays are strided
+    if isinstance(obj, np.ndarray):
+        return obj.tolist() if obj.flags.c_contiguous else np.ascontiguousarray(obj)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _json_default(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def encode(payload):
+    """
+    Serializes a payload to compact UTF-8 JSON bytes.
+    """
+    orjson = _orjson_module()
+    if orjson:
+        return orjson.dumps(payload, default=_orjson_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_json_default, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with encode(): faster, and NumPy values pass through as they are.
+    """
+
+    def render(self, content):
+        return encode(content)
+
+
+def columns(rows, fields=None):
+    """
+    Returns records as {field: [values]}. Rows may be dicts, sequences in `fields` order
+    (fields required), or a NumPy structured array, whose columns are returned as arrays.
+    """
+    if isinstance(rows, np.ndarray):
+        return {name: rows[name] for name in (fields or rows.dtype.names)}
+    rows = list(rows)
+    if fields is None:
+        fields = list(rows[0]) if rows else []
+    if rows and not isinstance(rows[0], dict):
+        return {field: list(values) for field, values in zip(fields, zip(*rows))}
+    return {field: [row[field] for row in rows] for field in fields}
+
+
+if __name__ == '__main__':
+    import gzip
+    import random
+    import time
+    from fastapi.encoders import jsonable_encoder
+    from candle_store import to_array, to_candles
+    from fakes import make_candles
+
+    def stdlib(payload):
+        # What FastAPI did for a plain return value: jsonable_encoder, then json.dumps
+        return JSONResponse(jsonable_encoder(payload)).body
+
+    def timed(fn, payload, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            body = fn(payload)
+        return (time.perf_counter() - start) / repeat * 1000, body
+
+    rng = random.Random(1)
+    contracts = [{'strike_price': 20000.0 + 50 * (i // 2), 'option_type': 'CE' if i % 2 else 'PE',
+                  'ltp': round(rng.uniform(1, 500), 2), 'oi': float(rng.randint(1000, 100000)),
+                  'change_in_oi': float(rng.randint(-2000, 2000))} for i in range(1000)]
+
+    # A year of 1-minute Nifty bars (252 sessions of 375) and of 15-minute OI rollups
+    end = datetime.datetime.combine(datetime.date.today() - datetime.timedelta(days=1), datetime.time(15, 29))
+    bars = to_array(make_candles(count=252 * 375, unit_minutes=1, end=end, seed=3))
+    start_day = datetime.datetime.combine(datetime.date.today() - datetime.timedelta(days=365), datetime.time(9, 15))
+    oi_history = [{'timestamp': start_day + datetime.timedelta(minutes=15 * i), 'ltp': round(rng.uniform(1, 500), 2),
+                   'oi': float(rng.randint(1000, 100000))} for i in range(252 * 25)]
+
+    cases = [
+        ('option chain, 1000 contracts', contracts, columns(contracts, ('strike_price', 'option_type', 'ltp', 'oi',
+                                                                        'change_in_oi')), 50),
+        ('OI history, 1 year of 15 min', oi_history, columns(oi_history, ('timestamp', 'ltp', 'oi')), 20),
+        ('candles, 1 year of 1 min', to_candles(bars), columns(bars), 3),
+    ]
+    orjson_available = _orjson_module() is not None
+    print(f"{'payload':<30}{'shape':<9}{'json (ms)':>11}{'orjson (ms)':>13}{'bytes':>12}{'gzip bytes':>12}")
+    for label, rows, cols, repeat in cases:
+        for shape, payload in (('rows', rows), ('columns', cols)):
+            if shape == 'columns' and label.startswith('candles'):
+                # jsonable_encoder cannot take NumPy arrays; the stdlib path needs tolist() first
+                json_ms, body = timed(lambda p: stdlib({k: v.tolist() for k, v in p.items()}), payload, repeat)
+            else:
+                json_ms, body = timed(stdlib, payload, repeat)
+            fast_ms, fast_body = timed(encode, payload, repeat)
+            print(f"{label:<30}{shape:<9}{json_ms:>11.2f}{fast_ms if orjson_available else float('nan'):>13.2f}"
+                  f"{len(fast_body):>12,}{len(gzip.compress(fast_body, 6)):>12,}")
@@ -0,0 +1,225 @@
+"""
+Incrementally maintained support/resistance levels per (interval, unit).
+
+Each series keeps its candles (oldest first, trimmed to the lookback the endpoint
+uses) and the pivots confirmed so far. A refresh reads only the days from the last
+stored candle onwards from the candle store (resampled from its 1-minute series,
+which goes upstream only for days it does not hold yet), appends the bars newer than the last stored one and re-runs pivot detection only
+over the new bars plus the LEFT + RIGHT bars before them, since older pivots
+cannot change. No refresh is attempted until a new
+candle can have closed. State is saved to LEVEL_STORE_FILE (at most every
+LEVEL_STORE_SAVE_INTERVAL seconds) so restarts start warm.
+"""
+import datetime
+import json
+import os
+import threading
+import time
+import numpy as np
+from candle_cache import CANDLE_CACHE_GRACE, next_candle_boundary
+from candle_store import get_candle_store, to_candles
+from find_support_resistance_niftyfifty_daily import LEFT, RIGHT, find_pivots
+from logger_config import get_logger
+
+# Get logger instance
+logger = get_logger(__name__)
+
+LEVEL_STORE_FILE = os.environ.get(
+    "LEVEL_STORE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sr_levels.json')
+)
+# Minimum seconds between writes of the state file; save() forces one
+LEVEL_STORE_SAVE_INTERVAL = float(os.environ.get("LEVEL_STORE_SAVE_INTERVAL", 300))
+INSTRUMENT_KEY = "NSE_INDEX|Nifty 50"
+
+
+def lookback_days(unit):
+    return 365 if unit == 'days' else 30
+
+
+class LevelSeries:
+    """
+    Candles (oldest first) and confirmed LEFT/RIGHT pivots of one (interval, unit) series.
+    """
+
+    def __init__(self, dates=None, highs=None, lows=None, supports=None, resistances=None, next_refresh=0.0):
+        self.dates = dates or []
+        self.highs = highs or []
+        self.lows = lows or []
+        self.supports = supports or []
+        self.resistances = resistances or []
+        self.next_refresh = next_refresh
+
+    def merge(self, candles, oldest_date):
+        """
+        Appends newest-first API candles newer than the last stored one (the last stored bar is
+        replaced, as it may still have been forming) and re-detects pivots only where they can change.
+        Returns the number of bars added or replaced.
+        """
+        last = self.dates[-1] if self.dates else ''
+        candles = sorted((c for c in candles if c[0] >= last), key=lambda c: c[0])
+        if not candles:
+            return 0
+        keep = len(self.dates) - 1 if candles[0][0] == last else len(self.dates)
+        self.dates[keep:] = [c[0] for c in candles]
+        self.highs[keep:] = [float(c[2]) for c in candles]
+        self.lows[keep:] = [float(c[3]) for c in candles]
+
+        # Pivots centred before keep - RIGHT only see unchanged bars; re-detect the rest
+        first_center = max(0, keep - RIGHT)
+        first_date = self.dates[first_center]
+        start = max(0, first_center - LEFT)
+        supports, resistances = find_pivots(self.dates[start:], self.highs[start:], self.lows[start:], LEFT, RIGHT)
+        self.supports = [p for p in self.supports if p[0] < first_date] + \
+            [list(p) for p in supports if p[0] >= first_date]
+        self.resistances = [p for p in self.resistances if p[0] < first_date] + \
+            [list(p) for p in resistances if p[0] >= first_date]
+        self.trim(oldest_date)
+        return len(candles)
+
+    def trim(self, oldest_date):
+        """
+        Drops bars and pivots dated before oldest_date (an ISO date string).
+        """
+        cut = 0
+        while cut < len(self.dates) and self.dates[cut][:10] < oldest_date:
+            cut += 1
+        if cut:
+            del self.dates[:cut], self.highs[:cut], self.lows[:cut]
+            self.supports = [p for p in self.supports if p[0][:10] >= oldest_date]
+            self.resistances = [p for p in self.resistances if p[0][:10] >= oldest_date]
+
+    def copy(self):
+        return LevelSeries(list(self.dates), list(self.highs), list(self.lows),
+                           list(self.supports), list(self.resistances), self.next_refresh)
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(**state)
+
+
+class LevelStore:
+    """
+    One LevelSeries per (interval, unit), refreshed incrementally from the candle store and persisted.
+    """
+
+    def __init__(self, candle_store=None, path=LEVEL_STORE_FILE, clock=time.time):
+        self.candle_store = candle_store or get_candle_store()
+        self.path = path
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._series = {}
+        self._last_save = 0.0
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                state = json.load(f)
+            self._series = {tuple(json.loads(key)): LevelSeries.from_dict(s) for key, s in state.items()}
+            logger.info(f"Loaded support/resistance levels for {len(self._series)} series from {self.path}")
+        except Exception as e:
+            logger.error(f"Could not load support/resistance levels from {self.path}: {str(e)}", exc_info=True)
+
+    def save(self):
+        """
+        Writes every series to the state file.
+        """
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        self._last_save = self._clock()
+        state = {json.dumps(list(key)): series.to_dict() for key, series in self._series.items()}
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    def get(self, interval, unit):
+        """
+        Returns a copy of the up-to-date LevelSeries for (interval, unit), fetching only bars newer than
+        the stored ones.
+        """
+        with self._lock:
+            series = self._series.setdefault((interval, unit), LevelSeries())
+            now = self._clock()
+            if now < series.next_refresh:
+                return series.copy()
+            today = datetime.date.fromtimestamp(now)
+            oldest_date = (today - datetime.timedelta(days=lookback_days(unit))).isoformat()
+            from_date = series.dates[-1][:10] if series.dates else oldest_date
+            candles = to_candles(self.candle_store.read_bars(INSTRUMENT_KEY, unit, interval, from_date, today))
+            merged = series.merge(candles, oldest_date)
+            series.next_refresh = next_candle_boundary(unit, interval, now) + CANDLE_CACHE_GRACE
+            if merged and now - self._last_save >= LEVEL_STORE_SAVE_INTERVAL:
+                self._save()
+            logger.debug(f"Refreshed {interval} {unit} levels from {from_date}: {merged} bars, "
+                        f"{len(series.dates)} stored")
+            return series.copy()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_level_store():
+    """
+    Returns the process-wide LevelStore.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = LevelStore()
+    return _store
+
+
+if __name__ == '__main__':
+    import tempfile
+    from candle_cache import get_candle_cache
+    from candle_store import CandleStore
+    from fakes import FakeHistoryV3Api, make_candles
+
+    # 30 sessions of 1-minute bars ending today at 15:29, then today's bars arrive one per request
+    day_bars = 375
+    close_time = datetime.datetime.combine(datetime.date.today(), datetime.time(15, 29))
+    history = make_candles(count=30 * day_bars, unit_minutes=1, end=close_time, seed=3)
+    api = FakeHistoryV3Api(latency=0.0, candles=history[day_bars:])
+
+    def bar_time(candle):
+        return datetime.datetime.fromisoformat(candle[0][:19]).timestamp() + 60
+
+    clock = [bar_time(history[day_bars])]
+    candles_dir = tempfile.mkdtemp()
+    path = os.path.join(tempfile.mkdtemp(), 'levels.json')
+    candle_store = CandleStore(root=candles_dir, api=api, today=lambda: datetime.date.fromtimestamp(clock[0]))
+    store = LevelStore(candle_store=candle_store, path=path, clock=lambda: clock[0])
+
+    start = time.perf_counter()
+    store.get(1, 'minutes')
+    cold = time.perf_counter() - start
+
+    timings = []
+    for i in range(day_bars - 1, -1, -1):
+        api.candles = history[i:]
+        clock[0] = bar_time(history[i])
+        get_candle_cache().invalidate()
+        start = time.perf_counter()
+        series = store.get(1, 'minutes')
+        timings.append(time.perf_counter() - start)
+
+    store.save()
+    start = time.perf_counter()
+    warm = LevelStore(candle_store=candle_store, path=path, clock=lambda: clock[0])
+    load_time = time.perf_counter() - start
+    print(f"cold build of {len(history) - day_bars:,} bars: {cold * 1000:.0f} ms; "
+          f"incremental refresh median {np.median(timings) * 1000:.1f} ms over {len(timings)} new bars; "
+          f"warm restart load {load_time * 1000:.0f} ms ({len(warm._series[(1, 'minutes')].dates):,} bars)")
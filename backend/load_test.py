@@ -0,0 +1,101 @@
+"""
+Load test for the FastAPI app: request latency while option-chain polls are running.
+
+Fires concurrent GET requests at the app in-process (httpx ASGITransport, so the
+event loop under test is this one) while poll cycles against a fake quote source
+run every --interval seconds, and reports p50/p99/max latency for each mode:
+
+    idle      no poll cycles (baseline)
+    inline    the poll cycle runs on the event loop (how poll_data used to run)
+    executor  the poll cycle runs on the upstream executor (main.run_blocking)
+
+Run `python load_test.py --requests 2000 --concurrency 10 --latency 0.2`. Needs httpx.
+The app's database is a temporary SQLite file unless DATABASE_URL is set.
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import tempfile
+import time
+import numpy as np
+from instrument_master import get_instrument_master
+
+
+def percentile_ms(latencies, q):
+    return float(np.percentile(latencies, q)) * 1000
+
+
+async def run_mode(main, client, source, mode, args):
+    stop = asyncio.Event()
+    cycles = 0
+
+    async def poller():
+        nonlocal cycles
+        while mode != 'idle' and not stop.is_set():
+            if mode == 'inline':
+                main.ingest_cycle(source)
+            else:
+                await main.run_blocking(main.ingest_cycle, source)
+            cycles += 1
+            await asyncio.sleep(args.interval)
+
+    latencies = []
+    queue = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait(args.paths[i % len(args.paths)])
+
+    async def worker():
+        while not queue.empty():
+            path = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+    poll_task = asyncio.create_task(poller())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    poll_task.cancel()
+    print(f"{mode:>8}: {len(latencies)} requests in {elapsed:.2f}s during {cycles} poll cycles, "
+          f"p50 {percentile_ms(latencies, 50):.1f} ms, p99 {percentile_ms(latencies, 99):.1f} ms, "
+          f"max {max(latencies) * 1000:.1f} ms")
+
+
+async def run(args):
+    import httpx
+    import main
+    from fakes import FakeQuoteSource
+
+    source = FakeQuoteSource(latency=args.latency, seed=1)
+    main.ingest_cycle(source)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://loadtest') as client:
+        for mode in args.modes:
+            await run_mode(main, client, source, mode, args)
+    main.upstream_executor.shutdown()
+    await main.database.async_engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="p99 request latency while poll cycles run")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.2, help="Fake quote latency per upstream call (s)")
+    parser.add_argument('--interval', type=float, default=0.5, help="Pause between poll cycles (s)")
+    parser.add_argument('--strikes', type=int, default=10, help="Strikes on each side of ATM")
+    parser.add_argument('--paths', nargs='+', default=['/api/v1/option-data', '/'])
+    parser.add_argument('--modes', nargs='+', default=['idle', 'inline', 'executor'],
+                        choices=['idle', 'inline', 'executor'])
+    args = parser.parse_args()
+
+    # Configure the app before main is imported: the expiry with the most strikes, a scratch database
+    master = get_instrument_master()
+    expiry = max(master.expiries('NIFTY'), key=lambda e: len(master.strikes('NIFTY', e)))
+    os.environ.setdefault('EXPIRY_DATE', f"{datetime.datetime.fromtimestamp(expiry / 1000):%Y-%m-%d}")
+    os.environ['STRIKES_EACH_SIDE'] = str(args.strikes)
+    os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'load_test.db')}")
+    asyncio.run(run(args))
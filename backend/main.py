@@ -1,22 +1,43 @@
 import asyncio
-import json
-from datetime import datetime
-import random
-from fastapi import FastAPI, Depends
-from sqlalchemy.orm import Session
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from datetime import date, datetime
+from typing import Literal
+from fastapi import FastAPI, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 import database
-import models
 import crud
+import partitions
+from broadcast import get_broadcaster
+from candle_store import get_candle_store, to_candles
+from chain_analytics import chain_contracts, get_chain_analytics, quote_chain
+from greeks import GREEK_FIELDS
+from bulk_writer import get_option_writer
+from ingestion import ingest_option_chain
+from instrument_master import get_instrument_master
+from json_encoding import FastJSONResponse, columns
+from quote_source import get_quote_source
+from response_cache import get_response_cache
 from decouple import config
 from fastapi.middleware.cors import CORSMiddleware
-from upstox_api import fetch_nifty50_5m_candles, calculate_stochrsi
+from data_fetcher import fetch_intraday_data_without_filter, get_nifty_50_price, select_option_contracts, process_oi_data_batch
+from find_support_resistance_niftyfifty_daily import LEFT, RIGHT, ZONE_TOLERANCE, get_support_resistance
+from streaming_indicators import get_indicator_service
 from logger_config import get_logger
 
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
 
 # Configuration
 EXPIRY_DATE = config('EXPIRY_DATE')
 POLLING_INTERVAL = config('POLLING_INTERVAL', default=300, cast=int)
+MAINTENANCE_INTERVAL = config('MAINTENANCE_INTERVAL', default=3600, cast=int)
+QUOTE_SOURCE = config('QUOTE_SOURCE', default='upstox')
+STRIKES_EACH_SIDE = config('STRIKES_EACH_SIDE', default=5, cast=int)
+ANALYTICS_EXPIRIES = config('ANALYTICS_EXPIRIES', default=3, cast=int)
+UPSTREAM_WORKERS = config('UPSTREAM_WORKERS', default=4, cast=int)
+
+NIFTY_50_KEY = 'NSE_INDEX|Nifty 50'
 
 # Get logger instance
 logger = get_logger(__name__)
@@ -30,165 +51,470 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Blocking work (broker SDK calls, sync DB writes, file I/O) runs here, never on the event loop
+upstream_executor = ThreadPoolExecutor(max_workers=UPSTREAM_WORKERS, thread_name_prefix='upstream')
+
 # Create the database and tables on startup
 database.create_db_and_tables()
 
-def get_db():
+async def get_db():
+    async with database.AsyncSessionLocal() as db:
+        yield db
+
+
+async def run_blocking(fn, *args):
+    """
+    Runs a blocking call on the upstream executor and awaits its result.
+    """
+    return await asyncio.get_running_loop().run_in_executor(upstream_executor, fn, *args)
+
+
+def ingest_cycle(quote_source):
+    """
+    One blocking option-chain poll for the EXPIRY_DATE expiry. Returns the ingestion stats, or None if skipped.
+    """
+    master = get_instrument_master()
+
+    # Find the expiry matching EXPIRY_DATE
+    expiry_datetime = datetime.strptime(EXPIRY_DATE, '%Y-%m-%d')
+    expiries = master.expiries_on('NIFTY', expiry_datetime.date())
+
+    if not expiries:
+        logger.warning(f"No options found for expiry date {EXPIRY_DATE}. Skipping poll.")
+        return None
+
     db = database.SessionLocal()
     try:
-        yield db
+        return ingest_option_chain(db, quote_source, expiries[0], strikes_each_side=STRIKES_EACH_SIDE)
     finally:
         db.close()
 
+
+def analyze_chain(quote_source, stats):
+    """
+    Blocking: quotes every strike of the tracked expiry and the next upcoming ones (ANALYTICS_EXPIRIES in all)
+    and returns the chain analytics per expiry.
+    """
+    master = get_instrument_master()
+    now = datetime.now().timestamp() * 1000
+    upcoming = [e for e in master.expiries('NIFTY') if e > now and e != stats['expiry']]
+    expiries = [stats['expiry'], *upcoming][:ANALYTICS_EXPIRIES]
+    rows = quote_chain(quote_source, chain_contracts(master, 'NIFTY', expiries))
+    logger.info(f"Analyzing {len(rows)} contracts over {len(expiries)} expiries")
+    return get_chain_analytics().update(rows, stats['spot'])
+
+
 async def poll_data():
     """
     The background task that polls data and stores it in the database.
     """
+    quote_source = get_quote_source(QUOTE_SOURCE)
     while True:
         logger.info("Polling data...")
-        # Hardcoded spot price as we cannot fetch live data without an access token
-        spot_price = 25000
+        stats = None
+        try:
+            stats = await run_blocking(ingest_cycle, quote_source)
+        except Exception as e:
+            logger.error(f"Error polling option chain: {str(e)}", exc_info=True)
 
-        with open('NSE_FO.json', 'r') as f:
-            all_options = json.load(f)
+        try:
+            await run_blocking(refresh_nifty50_indicators)
+        except Exception as e:
+            logger.error(f"Error updating Nifty 50 indicators: {str(e)}", exc_info=True)
 
-        # Filter options by expiry date
-        expiry_datetime = datetime.strptime(EXPIRY_DATE, '%Y-%m-%d')
-        filtered_options = [
-            opt for opt in all_options
-            if datetime.fromtimestamp(opt['expiry'] / 1000).date() == expiry_datetime.date()
-        ]
+        # One snapshot per cycle, fanned out to every streaming client and materialized as cached responses
+        if stats and stats['rows']:
+            analytics = {}
+            try:
+                analytics = await run_blocking(analyze_chain, quote_source, stats)
+            except Exception as e:
+                logger.error(f"Error analyzing the option chain: {str(e)}", exc_info=True)
 
-        if not filtered_options:
-            logger.warning(f"No options found for expiry date {EXPIRY_DATE}. Skipping poll.")
-            await asyncio.sleep(POLLING_INTERVAL)
-            continue
+            try:
+                broadcaster = get_broadcaster()
+                broadcaster.publish(build_snapshot(stats, analytics))
+                cache = get_response_cache()
+                cache_option_data(stats['chain'], broadcaster.version)
+                cache.put('chain-analytics', {"taken_at": stats['taken_at'].isoformat(), "spot": stats['spot'],
+                                              "scope": "full_chain", "expiries": analytics}, broadcaster.version)
+                cache.put('snapshot', {"version": broadcaster.version, "data": broadcaster.snapshot},
+                          broadcaster.version)
+            except Exception as e:
+                logger.error(f"Error publishing poll-cycle snapshot: {str(e)}", exc_info=True)
 
-        # Get all unique strikes and sort them
-        all_strikes = sorted(list(set(opt['strike_price'] for opt in filtered_options)))
+        await asyncio.sleep(POLLING_INTERVAL)
 
-        # Find ATM strike
-        atm_strike = min(all_strikes, key=lambda x: abs(x - spot_price))
-        atm_strike_index = all_strikes.index(atm_strike)
 
-        # Select 5 strikes above and 5 below
-        start_index = max(0, atm_strike_index - 5)
-        end_index = min(len(all_strikes), atm_strike_index + 6)
-        selected_strikes = all_strikes[start_index:end_index]
+def stochrsi_analysis(stochrsi):
+    if stochrsi is None:
+        return None
+    if stochrsi > 0.8:
+        return "Overbought: Possible reversal"
+    if stochrsi < 0.2:
+        return "Oversold: Possible reversal"
+    return "Neutral"
 
-        db = database.SessionLocal()
-        try:
-            option_data_to_save = []
-            for strike in selected_strikes:
-                # Find the CE and PE options for the current strike
-                ce_option = next((opt for opt in filtered_options if opt['strike_price'] == strike and opt['instrument_type'] == 'CE'), None)
-                pe_option = next((opt for opt in filtered_options if opt['strike_price'] == strike and opt['instrument_type'] == 'PE'), None)
-
-                if ce_option:
-                    prev_oi = crud.get_previous_oi(db, ce_option['instrument_key'])
-                    current_oi = random.randint(1000, 100000)
-                    option_data_to_save.append(models.OptionData(
-                        instrument_key=ce_option['instrument_key'],
-                        strike_price=ce_option['strike_price'],
-                        option_type='CE',
-                        ltp=random.randint(1, 500),
-                        oi=current_oi,
-                        change_in_oi=current_oi - prev_oi if prev_oi is not None else 0
-                    ))
-                if pe_option:
-                    prev_oi = crud.get_previous_oi(db, pe_option['instrument_key'])
-                    current_oi = random.randint(1000, 100000)
-                    option_data_to_save.append(models.OptionData(
-                        instrument_key=pe_option['instrument_key'],
-                        strike_price=pe_option['strike_price'],
-                        option_type='PE',
-                        ltp=random.randint(1, 500),
-                        oi=current_oi,
-                        change_in_oi=current_oi - prev_oi if prev_oi is not None else 0
-                    ))
-
-            if option_data_to_save:
-                crud.save_option_data(db, option_data_to_save)
-                logger.info(f"Saved {len(option_data_to_save)} records to the database.")
-        finally:
-            db.close()
 
-        await asyncio.sleep(POLLING_INTERVAL)
+def build_snapshot(stats, analytics):
+    """
+    The snapshot published after a poll cycle: option chain (with IV and Greeks) keyed by instrument_key and its PCR,
+    full-chain analytics per expiry (see analyze_chain), Nifty LTP and StochRSI.
+    """
+    chain = {
+        row['instrument_key']: {
+            "strike_price": row['strike_price'],
+            "option_type": row['option_type'],
+            "ltp": row['ltp'],
+            "oi": row['oi'],
+            "change_in_oi": row['change_in_oi'],
+            **{name: row.get(name) for name in GREEK_FIELDS}
+        } for row in stats['chain']
+    }
+    total_call_oi = sum(c['oi'] for c in chain.values() if c['option_type'] == 'CE')
+    total_put_oi = sum(c['oi'] for c in chain.values() if c['option_type'] == 'PE')
+    indicators = get_indicator_service().read(NIFTY_50_KEY, '5minute')
+    stochrsi = indicators['stochrsi'] if indicators else None
+    return {
+        "taken_at": stats['taken_at'].isoformat(),
+        "nifty_ltp": stats['spot'],
+        "total_call_oi": total_call_oi,
+        "total_put_oi": total_put_oi,
+        "pcr": total_put_oi / total_call_oi if total_call_oi > 0 else 0,
+        "chain": chain,
+        "analytics": analytics,
+        "stochrsi": stochrsi,
+        "stochrsi_analysis": stochrsi_analysis(stochrsi)
+    }
+
+
+def refresh_nifty50_indicators():
+    """
+    Feeds new Nifty 50 5-minute candles into the streaming indicators.
+    """
+    return get_indicator_service().refresh(
+        NIFTY_50_KEY, '5minute', lambda: fetch_intraday_data_without_filter(NIFTY_50_KEY)
+    )
+
+
+async def maintain_storage():
+    """
+    The background task that creates partitions, compacts old data into rollups and applies retention.
+    """
+    while True:
+        try:
+            await run_blocking(partitions.run_maintenance, database.engine)
+        except Exception as e:
+            logger.error(f"Error running storage maintenance: {str(e)}", exc_info=True)
+        await asyncio.sleep(MAINTENANCE_INTERVAL)
 
 
 @app.on_event("startup")
 async def startup_event():
+    async with database.AsyncSessionLocal() as db:
+        logger.info(f"Warmed previous-OI cache with {await db.run_sync(crud.warm_last_oi_cache)} instruments")
+    asyncio.create_task(maintain_storage())
     asyncio.create_task(poll_data())
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Write any poll cycles still buffered in the bulk writer
+    await run_blocking(get_option_writer().flush)
+    upstream_executor.shutdown(wait=False)
+    await database.async_engine.dispose()
+
+
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Welcome to the OI Watcher API"}
 
 
-@app.get("/api/v1/option-data")
-def get_option_data(db: Session = Depends(get_db)):
-    """
-    This endpoint retrieves the latest option data from the database,
-    processes it, and returns it in a format suitable for the frontend.
-    """
-    latest_data = crud.get_latest_option_data(db)
+CONTRACT_FIELDS = ('strike_price', 'option_type', 'ltp', 'oi', 'change_in_oi', *GREEK_FIELDS)
 
-    if not latest_data:
-        return {"error": "No data available yet."}
 
-    total_call_oi = sum(d.oi for d in latest_data if d.option_type == 'CE')
-    total_put_oi = sum(d.oi for d in latest_data if d.option_type == 'PE')
+def option_data_payload(contracts, shape='rows'):
+    """
+    The /api/v1/option-data response for one batch of contracts (dicts with the OptionData columns).
+    With shape='columns' the contracts and chart data are sent as parallel arrays.
+    """
+    total_call_oi = sum(d['oi'] for d in contracts if d['option_type'] == 'CE')
+    total_put_oi = sum(d['oi'] for d in contracts if d['option_type'] == 'PE')
 
     pcr = total_put_oi / total_call_oi if total_call_oi > 0 else 0
 
     # Group data by strike price for the bar chart
     oi_by_strike = {}
-    for d in latest_data:
-        if d.strike_price not in oi_by_strike:
-            oi_by_strike[d.strike_price] = {'call_oi': 0, 'put_oi': 0}
-        if d.option_type == 'CE':
-            oi_by_strike[d.strike_price]['call_oi'] = d.oi
+    for d in contracts:
+        if d['strike_price'] not in oi_by_strike:
+            oi_by_strike[d['strike_price']] = {'call_oi': 0, 'put_oi': 0}
+        if d['option_type'] == 'CE':
+            oi_by_strike[d['strike_price']]['call_oi'] = d['oi']
         else:
-            oi_by_strike[d.strike_price]['put_oi'] = d.oi
+            oi_by_strike[d['strike_price']]['put_oi'] = d['oi']
 
     chart_data = [
         {'strike': strike, **ois} for strike, ois in sorted(oi_by_strike.items())
     ]
 
+    rows = [{field: d.get(field) for field in CONTRACT_FIELDS} for d in contracts]
+    if shape == 'columns':
+        return {
+            "contracts": columns(rows, CONTRACT_FIELDS),
+            "oi_chart_data": columns(chart_data, ('strike', 'call_oi', 'put_oi')),
+            "pcr": pcr
+        }
     return {
-        "contracts": [
-            {
-                "strike_price": d.strike_price,
-                "option_type": d.option_type,
-                "ltp": d.ltp,
-                "oi": d.oi,
-                "change_in_oi": d.change_in_oi
-            } for d in latest_data
-        ],
+        "contracts": rows,
         "oi_chart_data": chart_data,
         "pcr": pcr
     }
 
 
+def cache_option_data(contracts, version=None):
+    """
+    Materializes the /api/v1/option-data response in both shapes.
+    """
+    cache = get_response_cache()
+    for shape in ('rows', 'columns'):
+        cache.put(f'option-data:{shape}', option_data_payload(contracts, shape), version)
+
+
+@app.get("/api/v1/option-data")
+async def get_option_data(request: Request, shape: Literal['rows', 'columns'] = 'rows',
+                          db: AsyncSession = Depends(get_db)):
+    """
+    This endpoint serves the latest option data in a format suitable for the frontend.
+    The poll loop materializes it once per cycle; the database is only read before the first cycle.
+    """
+    cached = get_response_cache().get(f'option-data:{shape}')
+    if cached is None:
+        latest_data = await crud.get_latest_option_data_async(db)
+
+        if not latest_data:
+            return {"error": "No data available yet."}
+
+        contracts = [{field: getattr(d, field) for field in CONTRACT_FIELDS} for d in latest_data]
+        cache_option_data(contracts)
+        cached = get_response_cache().get(f'option-data:{shape}')
+    return cached.respond(request)
+
+
+@app.get("/api/v1/oi-history")
+async def get_oi_history(instrument_key: str, start: datetime, end: datetime,
+                         shape: Literal['rows', 'columns'] = 'rows', db: AsyncSession = Depends(get_db)):
+    """
+    OI history for one instrument. Long ranges are served from 15-minute or daily rollups.
+    """
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    history = await crud.get_oi_history_async(db, instrument_key, start, end)
+    return FastJSONResponse({
+        "instrument_key": instrument_key,
+        "history": columns(history, ('timestamp', 'ltp', 'oi')) if shape == 'columns' else history
+    })
+
+
+@app.get("/api/v1/candles")
+async def get_candles(unit: Literal['minutes', 'hours', 'days'], interval: int, start: date, end: date,
+                      instrument_key: str = NIFTY_50_KEY, shape: Literal['rows', 'columns'] = 'rows'):
+    """
+    Candles from the candle store, resampled from 1-minute bars. Rows are API-style
+    [timestamp, open, high, low, close, volume, oi] lists, newest first; columns are
+    parallel arrays (ts in epoch seconds), oldest first.
+    """
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    try:
+        bars = await run_blocking(get_candle_store().read_bars, instrument_key, unit, interval, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse({
+        "instrument_key": instrument_key,
+        "candles": columns(bars) if shape == 'columns' else to_candles(bars)
+    })
+
+
 @app.get("/stochrsi_nifty50_5m")
-def get_stochrsi_nifty50_5m():
+async def get_stochrsi_nifty50_5m():
     logger.info("/stochrsi_nifty50_5m endpoint called")
-    candles = fetch_nifty50_5m_candles()
-    logger.info(f"Fetched {len(candles)} candles for Nifty 50 5m")
-    stochrsi = calculate_stochrsi(candles)
+    # The poll loop keeps the indicators current; only compute here before its first cycle
+    indicators = get_indicator_service().read(NIFTY_50_KEY, '5minute') or await run_blocking(refresh_nifty50_indicators)
+    stochrsi = indicators['stochrsi'] if indicators else None
     if stochrsi is None:
         logger.error("Not enough data to calculate Stochastic RSI")
         return {"error": "Not enough data to calculate Stochastic RSI"}
-    # Analysis
-    if stochrsi > 0.8:
-        analysis = "Overbought: Possible reversal"
-    elif stochrsi < 0.2:
-        analysis = "Oversold: Possible reversal"
-    else:
-        analysis = "Neutral"
+    analysis = stochrsi_analysis(stochrsi)
     logger.info(f"Stochastic RSI: {stochrsi:.2f}, Analysis: {analysis}")
     return {
         "stochrsi": stochrsi,
         "analysis": analysis
     }
+
+
+@app.get("/api/v1/snapshot")
+async def get_snapshot(request: Request):
+    """
+    The latest published poll-cycle snapshot, the same data /api/v1/stream and /api/v1/ws push.
+    """
+    cached = get_response_cache().get('snapshot')
+    if cached is None:
+        return {"error": "No snapshot published yet."}
+    return cached.respond(request)
+
+
+@app.get("/api/v1/chain-analytics")
+async def get_chain_analytics_response(request: Request):
+    """
+    Max pain, PCR by moneyness band, OI-weighted support/resistance and buildup per expiry, from the latest cycle.
+    Covers every listed strike of the next ANALYTICS_EXPIRIES expiries, not only the stored ATM window.
+    """
+    cached = get_response_cache().get('chain-analytics')
+    if cached is None:
+        return {"error": "No chain analytics computed yet."}
+    return cached.respond(request)
+
+
+@app.get("/api/v1/stream")
+async def stream_snapshots():
+    """
+    Server-sent events: the full snapshot, then one delta per poll cycle (see broadcast.py).
+    """
+    async def events():
+        async with aclosing(get_broadcaster().subscribe()) as messages:
+            async for message in messages:
+                yield ": keepalive\n\n" if message is None else f"data: {message}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.websocket("/api/v1/ws")
+async def snapshot_websocket(websocket: WebSocket):
+    """
+    WebSocket carrying the same messages as /api/v1/stream.
+    """
+    await websocket.accept()
+    try:
+        async with aclosing(get_broadcaster().subscribe()) as messages:
+            async for message in messages:
+                if message is not None:
+                    await websocket.send_text(message)
+    except WebSocketDisconnect:
+        pass
+
+
+def build_oi_data():
+    """
+    Blocking: prices the Nifty, selects the option contracts around it and aggregates their OI changes.
+    """
+    nifty_price = get_nifty_50_price()
+    selected_calls, selected_puts = select_option_contracts(nifty_price)
+
+    call_oi_data, put_oi_data = process_oi_data_batch(selected_calls, selected_puts)
+
+    total_put_oi_change = sum(data['oi_change'] for data in put_oi_data.values())
+    total_call_oi_change = sum(data['oi_change'] for data in call_oi_data.values())
+
+    total_put = sum(data['latest_oi'] for data in put_oi_data.values())
+    total_call = sum(data['latest_oi'] for data in call_oi_data.values())
+
+    pcr = total_put_oi_change / total_call_oi_change if total_call_oi_change != 0 else 0
+
+    return {
+        "total_put_oi": total_put,
+        "total_call_oi": total_call,
+        "Call OI Change": total_call_oi_change,
+        "Put OI Change": total_put_oi_change,
+        "Nifty Price": nifty_price,
+        "calls": list(call_oi_data.values()),
+        "puts": list(put_oi_data.values()),
+        "pcr": pcr
+    }
+
+
+@app.get("/api/oi_data")
+async def get_oi_data():
+    return await run_blocking(build_oi_data)
+
+
+@app.get("/support_resistance")
+async def support_resistance(interval: int, unit: str, left: int = LEFT, right: int = RIGHT,
+                             zone_tolerance: float = ZONE_TOLERANCE, shape: Literal['rows', 'columns'] = 'rows'):
+    try:
+        result = await run_blocking(get_support_resistance, interval, unit, left, right, zone_tolerance)
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+    if shape == 'columns' and 'error' not in result:
+        for key in ('supports', 'resistances'):
+            result[key] = columns(result[key], ('date', 'price'))
+        for key in ('support_zones', 'resistance_zones'):
+            result[key] = columns(result[key], ('low', 'high', 'level', 'touches'))
+    return FastJSONResponse(result)
+
+
+async def nifty_candles():
+    """
+    Today's Nifty 50 5-minute candles (newest first), or the previous days' when the market has not opened.
+    """
+    response = await run_blocking(fetch_intraday_data_without_filter, NIFTY_50_KEY)
+    return response['data']['candles']
+
+
+@app.get("/api/nifty_curr")
+async def get_nifty_current():
+    """
+    Get current Nifty price with change and change percentage from previous day
+    """
+    try:
+        candles = await nifty_candles()
+
+        if len(candles) < 2:
+            return JSONResponse({'error': 'Not enough data available'}, status_code=400)
+
+        # Latest candle (most recent)
+        latest_candle = candles[0]
+        ltp = latest_candle[4]  # Close price
+
+        # Candles are sorted newest first, so the oldest one stands in for the previous close
+        previous_close = candles[-1][4]
+
+        # Calculate change and change percentage
+        change = ltp - previous_close
+        change_percent = (change / previous_close) * 100 if previous_close != 0 else 0
+
+        logger.info(f"Nifty current: LTP={ltp}, Change={change}, Change%={change_percent}")
+
+        return {
+            "ltp": round(ltp, 2),
+            "change": round(change, 2),
+            "change_percent": round(change_percent, 2)
+        }
+    except Exception as e:
+        logger.error(f"Error fetching Nifty current price: {str(e)}", exc_info=True)
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+@app.get("/api/nifty_previous_day")
+async def get_nifty_previous_day():
+    """
+    Get previous day OHLC data for Nifty 50
+    """
+    try:
+        candles = await nifty_candles()
+
+        if len(candles) < 2:
+            return JSONResponse({'error': 'Not enough data available'}, status_code=400)
+
+        # For simplicity, using the oldest available candle as reference
+        prev_candle = candles[-1]
+
+        return {
+            "date": prev_candle[0],  # Timestamp
+            "open": round(prev_candle[1], 2),
+            "high": round(prev_candle[2], 2),
+            "low": round(prev_candle[3], 2),
+            "close": round(prev_candle[4], 2)
+        }
+    except Exception as e:
+        logger.error(f"Error fetching previous day OHLC: {str(e)}", exc_info=True)
+        return JSONResponse({'error': str(e)}, status_code=500)
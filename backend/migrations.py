@@ -0,0 +1,117 @@
+"""
+In-place schema upgrades for databases created before a schema change.
+
+create_all() only creates missing tables, so columns and indexes added to
+existing tables are applied here. Every step checks the live schema first and
+is safe to run on every startup.
+"""
+from sqlalchemy import inspect, text
+import models
+from logger_config import get_logger
+
+# Get logger instance
+logger = get_logger(__name__)
+
+
+def _add_snapshot_id(engine):
+    """
+    Adds option_data.snapshot_id and backfills one snapshot per distinct legacy timestamp.
+    """
+    columns = {c['name'] for c in inspect(engine).get_columns('option_data')}
+    if 'snapshot_id' in columns:
+        return
+    logger.info("Upgrading option_data: adding snapshot_id and backfilling snapshots")
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE option_data ADD COLUMN snapshot_id INTEGER REFERENCES snapshot(id)"))
+        conn.execute(text(
+            "INSERT INTO snapshot (taken_at) "
+            "SELECT DISTINCT timestamp FROM option_data WHERE timestamp IS NOT NULL ORDER BY timestamp"
+        ))
+        conn.execute(text(
+            "UPDATE option_data SET snapshot_id = "
+            "(SELECT MIN(snapshot.id) FROM snapshot WHERE snapshot.taken_at = option_data.timestamp) "
+            "WHERE snapshot_id IS NULL"
+        ))
+
+
+def _partition_option_data(engine):
+    """
+    Converts option_data on PostgreSQL into a table partitioned by day on timestamp.
+    Existing rows stay where they are: the old table is attached as the option_data_legacy
+    partition covering everything up to the end of its newest day.
+    """
+    if engine.dialect.name != 'postgresql':
+        return
+    with engine.begin() as conn:
+        if conn.execute(text("SELECT relkind FROM pg_class WHERE relname = 'option_data'")).scalar() == 'p':
+            return
+        logger.info("Upgrading option_data: converting to a partitioned table")
+        conn.execute(text(
+            "UPDATE option_data SET timestamp = COALESCE("
+            "(SELECT taken_at FROM snapshot WHERE snapshot.id = option_data.snapshot_id), 'epoch') "
+            "WHERE timestamp IS NULL"
+        ))
+        upper = conn.execute(text(
+            "SELECT date_trunc('day', MAX(timestamp)) + interval '1 day' FROM option_data"
+        )).scalar()
+        # Index names are schema-wide, so move the old ones out of the way
+        for index in inspect(conn).get_indexes('option_data'):
+            conn.execute(text(
+                f"ALTER INDEX {index['name']} RENAME TO {index['name'].replace('option_data', 'option_data_legacy', 1)}"
+            ))
+        # A partition cannot keep its own primary key; attaching gives it the parent's (id, timestamp) key
+        conn.execute(text("ALTER TABLE option_data DROP CONSTRAINT option_data_pkey"))
+        conn.execute(text("ALTER TABLE option_data RENAME TO option_data_legacy"))
+        conn.execute(text(
+            "CREATE TABLE option_data (LIKE option_data_legacy INCLUDING DEFAULTS) PARTITION BY RANGE (timestamp)"
+        ))
+        # The partition key has to be part of the primary key
+        conn.execute(text("ALTER TABLE option_data ADD PRIMARY KEY (id, timestamp)"))
+        conn.execute(text("ALTER TABLE option_data ADD FOREIGN KEY (snapshot_id) REFERENCES snapshot (id)"))
+        conn.execute(text("ALTER SEQUENCE option_data_id_seq OWNED BY option_data.id"))
+        if upper is None:
+            conn.execute(text("DROP TABLE option_data_legacy"))
+        else:
+            conn.execute(text("ALTER TABLE option_data_legacy ALTER COLUMN timestamp SET NOT NULL"))
+            conn.execute(text(
+                f"ALTER TABLE option_data ATTACH PARTITION option_data_legacy "
+                f"FOR VALUES FROM (MINVALUE) TO ('{upper.isoformat()}')"
+            ))
+        # Catches rows for days whose partition has not been created yet
+        conn.execute(text("CREATE TABLE option_data_default PARTITION OF option_data DEFAULT"))
+
+
+def _add_greek_columns(engine):
+    """
+    Adds the IV/Greeks columns to option_data and, on SQLite, to the per-day tables rotated out of it,
+    which `INSERT ... SELECT *` expects to have the same columns.
+    """
+    inspector = inspect(engine)
+    tables = ['option_data']
+    if engine.dialect.name == 'sqlite':
+        tables += [name for name in inspector.get_table_names() if name.startswith('option_data_p')]
+    for table in tables:
+        columns = {c['name'] for c in inspector.get_columns(table)}
+        missing = [name for name in ('iv', 'delta', 'gamma', 'theta', 'vega') if name not in columns]
+        if not missing:
+            continue
+        logger.info(f"Upgrading {table}: adding {', '.join(missing)}")
+        with engine.begin() as conn:
+            for name in missing:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} FLOAT"))
+
+
+def _create_missing_indexes(engine):
+    for table in models.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def upgrade(engine):
+    """
+    Brings an existing database up to the current models.
+    """
+    _add_snapshot_id(engine)
+    _partition_option_data(engine)
+    _add_greek_columns(engine)
+    _create_missing_indexes(engine)
@@ -1,12 +1,31 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
 from database import Base
 import datetime
 
 
+class Snapshot(Base):
+    """
+    One poll cycle: every OptionData row written by the cycle points at it.
+    """
+    __tablename__ = "snapshot"
+
+    id = Column(Integer, primary_key=True)
+    taken_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    spot = Column(Float)
+    expiry = Column(BigInteger)  # epoch milliseconds, as in the instrument master
+
+
 class OptionData(Base):
     __tablename__ = "option_data"
+    __table_args__ = (
+        Index('ix_option_data_snapshot_id', 'snapshot_id'),
+        Index('ix_option_data_instrument_key_snapshot_id', 'instrument_key', 'snapshot_id'),
+        Index('ix_option_data_timestamp', 'timestamp'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
+    snapshot_id = Column(Integer, ForeignKey('snapshot.id'))
     timestamp = Column(DateTime, default=datetime.datetime.utcnow)
     instrument_key = Column(String, index=True)
     strike_price = Column(Float)
@@ -14,3 +33,55 @@ class OptionData(Base):
     ltp = Column(Float)
     oi = Column(Float)
     change_in_oi = Column(Float)
+    # Black-Scholes implied volatility and Greeks (see greeks.py); NULL where the price has no solution
+    iv = Column(Float)
+    delta = Column(Float)
+    gamma = Column(Float)
+    theta = Column(Float)  # per calendar day
+    vega = Column(Float)  # per 1 point of volatility
+
+    snapshot = relationship(Snapshot)
+
+
+class OIRollup15m(Base):
+    """
+    Per-instrument OI/LTP downsampled to 15-minute buckets by the compaction job.
+    """
+    __tablename__ = "oi_rollup_15m"
+    __table_args__ = (
+        Index('ix_oi_rollup_15m_instrument_key_bucket', 'instrument_key', 'bucket'),
+        Index('ix_oi_rollup_15m_bucket', 'bucket'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    bucket = Column(DateTime)  # bucket start
+    instrument_key = Column(String)
+    strike_price = Column(Float)
+    option_type = Column(String)
+    ltp = Column(Float)  # last in bucket
+    oi = Column(Float)  # last in bucket
+    oi_high = Column(Float)
+    oi_low = Column(Float)
+    oi_change = Column(Float)  # last minus first OI in bucket
+
+
+class OIRollupDaily(Base):
+    """
+    Per-instrument OI/LTP downsampled to one row per day by the compaction job.
+    """
+    __tablename__ = "oi_rollup_daily"
+    __table_args__ = (
+        Index('ix_oi_rollup_daily_instrument_key_bucket', 'instrument_key', 'bucket'),
+        Index('ix_oi_rollup_daily_bucket', 'bucket'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    bucket = Column(DateTime)  # day start
+    instrument_key = Column(String)
+    strike_price = Column(Float)
+    option_type = Column(String)
+    ltp = Column(Float)
+    oi = Column(Float)
+    oi_high = Column(Float)
+    oi_low = Column(Float)
+    oi_change = Column(Float)
@@ -0,0 +1,310 @@
+"""
+Time partitioning, downsampling and retention for option_data.
+
+PostgreSQL: option_data is a declaratively partitioned table (RANGE on timestamp)
+with one partition per day named option_data_pYYYYMMDD, plus a default partition
+as a safety net. Partitions are created a few days ahead.
+
+SQLite: option_data holds only the current day. Older rows are moved into per-day
+tables with the same naming, so the hot table and its indexes stay small.
+
+The maintenance job compacts every completed day into 15-minute and daily OI
+rollups (oi_rollup_15m / oi_rollup_daily) and then drops raw partitions older
+than RAW_RETENTION_DAYS, but only once they have been compacted.
+"""
+import datetime
+import os
+import re
+from sqlalchemy import DateTime, bindparam, func, insert, inspect, select, text
+import models
+from logger_config import get_logger
+
+# Get logger instance
+logger = get_logger(__name__)
+
+RAW_RETENTION_DAYS = int(os.environ.get("RAW_RETENTION_DAYS", 30))
+PARTITION_DAYS_AHEAD = int(os.environ.get("PARTITION_DAYS_AHEAD", 3))
+ROLLUP_MINUTES = 15
+
+PARTITION_PATTERN = re.compile(r'^option_data_p(\d{8})$')
+
+
+def partition_name(day):
+    return f"option_data_p{day:%Y%m%d}"
+
+
+def partition_day(name):
+    """
+    Returns the date encoded in a partition table name, or None for other tables.
+    """
+    match = PARTITION_PATTERN.match(name)
+    return datetime.datetime.strptime(match.group(1), '%Y%m%d').date() if match else None
+
+
+def _day_start(day):
+    return datetime.datetime.combine(day, datetime.time())
+
+
+def _datetime_params(statement, *names):
+    return statement.bindparams(*(bindparam(name, type_=DateTime) for name in names))
+
+
+def _legacy_upper_bound(conn):
+    """
+    Returns the exclusive upper bound of the legacy partition attached during migration, or None.
+    """
+    bound = conn.execute(text(
+        "SELECT pg_get_expr(relpartbound, oid) FROM pg_class WHERE relname = 'option_data_legacy'"
+    )).scalar()
+    match = re.search(r"TO \('([^']+)'\)", bound or '')
+    return datetime.datetime.fromisoformat(match.group(1)) if match else None
+
+
+def day_partitions(conn):
+    """
+    Returns {date: table_name} for the per-day raw partitions that exist.
+    """
+    if conn.dialect.name == 'postgresql':
+        names = conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = 'option_data'"
+        )).scalars().all()
+    else:
+        names = inspect(conn).get_table_names()
+    return {partition_day(name): name for name in names if partition_day(name)}
+
+
+def ensure_partitions(conn, today, days_ahead=PARTITION_DAYS_AHEAD):
+    """
+    Creates PostgreSQL partitions for today and the next days_ahead days.
+    """
+    if conn.dialect.name != 'postgresql':
+        return
+    existing = day_partitions(conn)
+    legacy_upper = _legacy_upper_bound(conn)
+    for offset in range(days_ahead + 1):
+        day = today + datetime.timedelta(days=offset)
+        start = _day_start(day)
+        end = start + datetime.timedelta(days=1)
+        # Days before the legacy partition's upper bound are already covered by it
+        if day in existing or (legacy_upper is not None and start < legacy_upper):
+            continue
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(day)} PARTITION OF option_data "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+        logger.info(f"Created partition {partition_name(day)}")
+
+
+def rotate_sqlite(conn, today):
+    """
+    Moves SQLite rows older than today from option_data into per-day tables.
+    The newest snapshot always stays in option_data so latest-batch reads keep working overnight.
+    """
+    if conn.dialect.name != 'sqlite':
+        return
+    latest_snapshot_id = conn.execute(select(func.max(models.OptionData.snapshot_id))).scalar() or 0
+    days = conn.execute(_datetime_params(text(
+        "SELECT DISTINCT substr(timestamp, 1, 10) FROM option_data "
+        "WHERE timestamp < :start AND snapshot_id IS NOT :latest"
+    ), 'start'), {'start': _day_start(today), 'latest': latest_snapshot_id}).scalars().all()
+    for day_text in days:
+        day = datetime.date.fromisoformat(day_text)
+        name = partition_name(day)
+        params = {
+            'start': _day_start(day), 'end': _day_start(day) + datetime.timedelta(days=1),
+            'latest': latest_snapshot_id,
+        }
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {name} AS SELECT * FROM option_data WHERE 0"))
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{name}_instrument_key_timestamp "
+                          f"ON {name} (instrument_key, timestamp)"))
+        day_filter = "timestamp >= :start AND timestamp < :end AND snapshot_id IS NOT :latest"
+        conn.execute(_datetime_params(text(
+            f"INSERT INTO {name} SELECT * FROM option_data WHERE {day_filter}"
+        ), 'start', 'end'), params)
+        conn.execute(_datetime_params(text(
+            f"DELETE FROM option_data WHERE {day_filter}"
+        ), 'start', 'end'), params)
+        logger.info(f"Moved {day} rows into {name}")
+
+
+def raw_sources(conn, start, end):
+    """
+    Returns the tables that can hold raw rows in [start, end).
+    PostgreSQL prunes partitions itself; on SQLite the matching per-day tables are added.
+    """
+    if conn.dialect.name != 'sqlite':
+        return ['option_data']
+    partitions = day_partitions(conn)
+    sources = [name for day, name in sorted(partitions.items()) if start.date() <= day <= end.date()]
+    return sources + ['option_data']
+
+
+def raw_rows(conn, start, end, instrument_key=None):
+    """
+    Returns raw option rows in [start, end) as mappings, oldest first.
+    """
+    rows = []
+    key_filter = " AND instrument_key = :instrument_key" if instrument_key else ""
+    for source in raw_sources(conn, start, end):
+        statement = _datetime_params(text(
+            f"SELECT timestamp, instrument_key, strike_price, option_type, ltp, oi FROM {source} "
+            f"WHERE timestamp >= :start AND timestamp < :end{key_filter} ORDER BY timestamp"
+        ), 'start', 'end').columns(timestamp=DateTime)
+        params = {'start': start, 'end': end}
+        if instrument_key:
+            params['instrument_key'] = instrument_key
+        rows.extend(conn.execute(statement, params).mappings().all())
+    rows.sort(key=lambda row: row['timestamp'])
+    return rows
+
+
+def _rollup(rows, bucket_of):
+    """
+    Aggregates rows into one record per (instrument_key, bucket): last LTP/OI, OI high/low and OI change.
+    """
+    buckets = {}
+    for row in rows:
+        if row['oi'] is None:
+            continue
+        key = (row['instrument_key'], bucket_of(row['timestamp']))
+        agg = buckets.get(key)
+        if agg is None:
+            buckets[key] = {
+                'bucket': key[1], 'instrument_key': row['instrument_key'], 'strike_price': row['strike_price'],
+                'option_type': row['option_type'], 'ltp': row['ltp'], 'oi': row['oi'],
+                'oi_high': row['oi'], 'oi_low': row['oi'], 'oi_change': 0.0, '_first_oi': row['oi'],
+            }
+            continue
+        agg['ltp'] = row['ltp']
+        agg['oi'] = row['oi']
+        agg['oi_high'] = max(agg['oi_high'], row['oi'])
+        agg['oi_low'] = min(agg['oi_low'], row['oi'])
+        agg['oi_change'] = row['oi'] - agg['_first_oi']
+    return [{k: v for k, v in agg.items() if k != '_first_oi'} for agg in buckets.values()]
+
+
+def _fifteen_minute_bucket(ts):
+    return ts.replace(minute=ts.minute - ts.minute % ROLLUP_MINUTES, second=0, microsecond=0)
+
+
+def _day_bucket(ts):
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def compacted_until(conn):
+    """
+    Returns the first day that has not been compacted yet, or None if nothing was compacted.
+    """
+    last = conn.execute(select(func.max(models.OIRollupDaily.bucket))).scalar()
+    if last is None:
+        return None
+    return last.date() + datetime.timedelta(days=1)
+
+
+def _earliest_raw_day(conn):
+    days = list(day_partitions(conn))
+    earliest = conn.execute(select(func.min(models.OptionData.timestamp))).scalar()
+    if earliest is not None:
+        days.append(earliest.date())
+    return min(days) if days else None
+
+
+def compact(conn, today):
+    """
+    Writes 15-minute and daily rollups for every completed day not compacted yet.
+    """
+    first_day = compacted_until(conn) or _earliest_raw_day(conn)
+    if first_day is None:
+        return 0
+    day = first_day
+    compacted = 0
+    while day < today:
+        start = _day_start(day)
+        rows = raw_rows(conn, start, start + datetime.timedelta(days=1))
+        daily = _rollup(rows, _day_bucket)
+        if daily:
+            conn.execute(insert(models.OIRollup15m), _rollup(rows, _fifteen_minute_bucket))
+            conn.execute(insert(models.OIRollupDaily), daily)
+            compacted += 1
+            logger.info(f"Compacted {len(rows)} raw rows for {day}")
+        day += datetime.timedelta(days=1)
+    return compacted
+
+
+def apply_retention(conn, today, retention_days=RAW_RETENTION_DAYS):
+    """
+    Drops raw partitions older than retention_days that have already been compacted (or are empty).
+    """
+    cutoff = today - datetime.timedelta(days=retention_days)
+    done = compacted_until(conn) or datetime.date.min
+    dropped = 0
+    for day, name in sorted(day_partitions(conn).items()):
+        if day >= cutoff:
+            continue
+        # Partitions that never received rows have nothing to compact
+        empty = conn.execute(text(f"SELECT 1 FROM {name} LIMIT 1")).first() is None
+        if day < done or empty:
+            conn.execute(text(f"DROP TABLE {name}"))
+            dropped += 1
+            logger.info(f"Dropped raw partition {name}")
+    if conn.dialect.name == 'postgresql' and inspect(conn).has_table('option_data_legacy'):
+        newest = conn.execute(text("SELECT MAX(timestamp) FROM option_data_legacy")).scalar()
+        if newest is None or (newest.date() < cutoff and newest.date() < done):
+            conn.execute(text("DROP TABLE option_data_legacy"))
+            dropped += 1
+            logger.info("Dropped legacy raw partition option_data_legacy")
+    return dropped
+
+
+def run_maintenance(engine, today=None):
+    """
+    Creates upcoming partitions, rotates SQLite rows, compacts completed days and applies retention.
+    """
+    today = today or datetime.datetime.utcnow().date()
+    with engine.begin() as conn:
+        ensure_partitions(conn, today)
+        rotate_sqlite(conn, today)
+    with engine.begin() as conn:
+        compact(conn, today)
+    with engine.begin() as conn:
+        apply_retention(conn, today)
+
+
+def rollup_model_for(start, end):
+    """
+    Picks the cheapest source for an OI history query over [start, end):
+    daily rollups beyond 30 days, 15-minute rollups beyond 2 days, raw rows otherwise.
+    """
+    span = end - start
+    if span > datetime.timedelta(days=30):
+        return models.OIRollupDaily
+    if span > datetime.timedelta(days=2):
+        return models.OIRollup15m
+    return None
+
+
+def oi_history(conn, instrument_key, start, end):
+    """
+    Returns OI history for one instrument as [{'timestamp', 'ltp', 'oi'}], oldest first.
+    Compacted days come from the rollup picked by rollup_model_for; the uncompacted tail is served raw.
+    """
+    model = rollup_model_for(start, end)
+    history = []
+    raw_start = start
+    if model is not None:
+        done = compacted_until(conn)
+        if done is not None:
+            rollup_end = min(end, _day_start(done))
+            rows = conn.execute(
+                select(model.bucket, model.ltp, model.oi)
+                .where(model.instrument_key == instrument_key, model.bucket >= start, model.bucket < rollup_end)
+                .order_by(model.bucket)
+            ).all()
+            history.extend({'timestamp': bucket, 'ltp': ltp, 'oi': oi} for bucket, ltp, oi in rows)
+            raw_start = max(start, rollup_end)
+    if raw_start < end:
+        history.extend({'timestamp': row['timestamp'], 'ltp': row['ltp'], 'oi': row['oi']}
+                       for row in raw_rows(conn, raw_start, end, instrument_key))
+    return history
@@ -0,0 +1,90 @@
+"""
+Pluggable market-quote sources for the option-chain ingestion pipeline.
+
+A quote source provides the underlying spot price and LTP/OI quotes for a batch of
+instrument keys. UpstoxQuoteSource batches keys into full-market-quote requests
+(up to QUOTE_BATCH_SIZE instruments per call); fakes.FakeQuoteSource serves
+synthetic quotes so the pipeline can be load-tested offline.
+"""
+import os
+import threading
+import upstox_client
+from logger_config import get_logger
+
+# Get logger instance
+logger = get_logger(__name__)
+
+# The full market quote API accepts up to 500 instruments per request
+QUOTE_BATCH_SIZE = int(os.environ.get("QUOTE_BATCH_SIZE", 500))
+
+
+class QuoteSource:
+    """
+    Interface for quote sources. Tracks how many upstream calls were made.
+    """
+
+    def __init__(self):
+        self.upstream_calls = 0
+        self._calls_lock = threading.Lock()
+
+    def _count_call(self):
+        with self._calls_lock:
+            self.upstream_calls += 1
+
+    def get_spot(self):
+        """
+        Returns the current spot price of the underlying.
+        """
+        raise NotImplementedError
+
+    def get_quotes(self, instrument_keys):
+        """
+        Returns {instrument_key: {'ltp': float, 'oi': float}} for the keys that have a quote.
+        """
+        raise NotImplementedError
+
+
+def chunked(items, size):
+    """
+    Splits a list into consecutive chunks of at most `size` items.
+    """
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class UpstoxQuoteSource(QuoteSource):
+    """
+    Quote source backed by the Upstox full market quote API.
+    """
+
+    def __init__(self, batch_size=QUOTE_BATCH_SIZE, api=None):
+        super().__init__()
+        self.batch_size = batch_size
+        self.api = api or upstox_client.MarketQuoteV3Api()
+
+    def get_spot(self):
+        from data_fetcher import get_nifty_50_price
+        self._count_call()
+        return get_nifty_50_price()
+
+    def get_quotes(self, instrument_keys):
+        quotes = {}
+        for batch in chunked(list(instrument_keys), self.batch_size):
+            self._count_call()
+            response = self.api.get_full_market_quote_v3(instrument_key=','.join(batch))
+            # Response data is keyed by trading symbol; instrument_token carries the instrument key
+            for quote in (getattr(response, 'data', None) or {}).values():
+                quotes[quote.instrument_token] = {'ltp': quote.last_price, 'oi': quote.oi}
+        logger.info(f"Fetched {len(quotes)} quotes for {len(instrument_keys)} instruments")
+        return quotes
+
+
+def get_quote_source(name):
+    """
+    Returns a quote source by name: 'upstox' or 'fake'.
+    """
+    if name == 'upstox':
+        return UpstoxQuoteSource()
+    if name == 'fake':
+        from fakes import FakeQuoteSource
+        return FakeQuoteSource()
+    raise ValueError(f"Unknown quote source: {name}")
@@ -0,0 +1,201 @@
+"""
+Precomputed API responses, materialized once per poll cycle.
+
+The poll loop puts each cacheable payload (the option-data response, the stream
+snapshot) here as soon as it changes. put() serializes it to JSON bytes the way the
+app's FastJSONResponse would (json_encoding.encode), derives a strong ETag from the
+bytes and, for bodies of at least RESPONSE_COMPRESS_MIN bytes, precompresses them with
+gzip (and brotli if the optional `brotli` package is installed). Endpoints then answer with respond(),
+which only picks a representation from Accept-Encoding and returns 304 Not
+Modified when If-None-Match carries the current ETag. Nothing is rebuilt or
+serialized per request.
+
+Run `python response_cache.py` to compare it with building the response per request
+(the benchmark leaves out the database read the per-request path also paid).
+"""
+import gzip
+import hashlib
+import os
+import threading
+from fastapi import Response
+from json_encoding import encode
+from logger_config import get_logger
+
+# Get logger instance
+logger = get_logger(__name__)
+
+# Bodies smaller than this are not worth compressing
+RESPONSE_COMPRESS_MIN = int(os.environ.get("RESPONSE_COMPRESS_MIN", 1000))
+RESPONSE_GZIP_LEVEL = 6
+RESPONSE_BROTLI_QUALITY = 5
+
+_brotli = None
+
+
+def _brotli_module():
+    """
+    Returns the brotli module, or None if it is not installed (brotli is optional).
+    """
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli
+            _brotli = brotli
+        except ImportError:
+            _brotli = False
+    return _brotli or None
+
+
+def accepted_encodings(accept_encoding):
+    """
+    Returns the content codings an Accept-Encoding header allows (q=0 excluded).
+    """
+    encodings = set()
+    for part in (accept_encoding or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if coding and params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            encodings.add(coding.lower())
+    return encodings
+
+
+class CachedResponse:
+    """
+    One serialized response: identity body plus precompressed variants, each with its own strong ETag.
+    """
+
+    def __init__(self, payload, version=None):
+        self.payload = payload
+        self.version = version
+        self.body = encode(payload)
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.variants = {}
+        if len(self.body) >= RESPONSE_COMPRESS_MIN:
+            self.variants['gzip'] = gzip.compress(self.body, compresslevel=RESPONSE_GZIP_LEVEL, mtime=0)
+            brotli = _brotli_module()
+            if brotli:
+                self.variants['br'] = brotli.compress(self.body, quality=RESPONSE_BROTLI_QUALITY)
+
+    def variant_etag(self, encoding):
+        # Byte-different representations need distinct strong ETags
+        return self.etag if encoding is None else f'"{self.etag[1:-1]}-{encoding}"'
+
+    def matches(self, if_none_match):
+        """
+        True if an If-None-Match header names this response in any of its encodings.
+        """
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == '*':
+            return True
+        tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        return any(self.variant_etag(encoding) in tags for encoding in [None, *self.variants])
+
+    def respond(self, request, headers=None):
+        """
+        Returns a 304 if the client already has this response, else the best precompressed body it accepts.
+        """
+        accepted = accepted_encodings(request.headers.get('accept-encoding'))
+        encoding = next((e for e in ('br', 'gzip') if e in self.variants and e in accepted), None)
+        headers = {
+            'ETag': self.variant_etag(encoding),
+            'Cache-Control': 'no-cache',
+            'Vary': 'Accept-Encoding',
+            **(headers or {}),
+        }
+        if self.matches(request.headers.get('if-none-match')):
+            return Response(status_code=304, headers=headers)
+        if encoding:
+            headers['Content-Encoding'] = encoding
+            return Response(self.variants[encoding], media_type='application/json', headers=headers)
+        return Response(self.body, media_type='application/json', headers=headers)
+
+
+class ResponseCache:
+    """
+    The latest CachedResponse per name, replaced whenever the poll loop materializes a new one.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def put(self, name, payload, version=None):
+        """
+        Serializes and compresses payload once and makes it the current response for name.
+        """
+        entry = CachedResponse(payload, version)
+        with self._lock:
+            self._entries[name] = entry
+        logger.debug(f"Cached {name} v{version}: {len(entry.body)} bytes, "
+                     f"{ {e: len(b) for e, b in entry.variants.items()} }")
+        return entry
+
+    def get(self, name):
+        with self._lock:
+            return self._entries.get(name)
+
+    def invalidate(self, name=None):
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """
+    Returns the process-wide ResponseCache.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
+
+
+if __name__ == '__main__':
+    import random
+    import time
+    from fastapi.responses import JSONResponse
+    from starlette.requests import Request
+
+    def build_payload(rows):
+        # What get_option_data did per request: re-sum, regroup and serialize
+        total_call_oi = sum(r['oi'] for r in rows if r['option_type'] == 'CE')
+        total_put_oi = sum(r['oi'] for r in rows if r['option_type'] == 'PE')
+        oi_by_strike = {}
+        for r in rows:
+            oi_by_strike.setdefault(r['strike_price'], {'call_oi': 0, 'put_oi': 0})
+            oi_by_strike[r['strike_price']]['call_oi' if r['option_type'] == 'CE' else 'put_oi'] = r['oi']
+        return {'contracts': rows, 'oi_chart_data': [{'strike': s, **o} for s, o in sorted(oi_by_strike.items())],
+                'pcr': total_put_oi / total_call_oi}
+
+    def request(headers):
+        scope = {'type': 'http', 'headers': [(k.lower().encode(), v.encode()) for k, v in headers.items()]}
+        return Request(scope)
+
+    rng = random.Random(1)
+    print(f"{'contracts':>10}{'rebuild (us)':>14}{'cached (us)':>13}{'304 (us)':>10}{'identity (B)':>14}{'gzip (B)':>10}")
+    for contracts in (22, 202, 1002):
+        rows = [{'strike_price': 20000.0 + 50 * (i // 2), 'option_type': 'CE' if i % 2 else 'PE',
+                 'ltp': round(rng.uniform(1, 500), 2), 'oi': float(rng.randint(1000, 100000)),
+                 'change_in_oi': float(rng.randint(-2000, 2000))} for i in range(contracts)]
+        entry = get_response_cache().put('option-data', build_payload(rows), 1)
+        zipped = request({'accept-encoding': 'gzip'})
+        conditional = request({'accept-encoding': 'gzip', 'if-none-match': entry.variant_etag('gzip')})
+        timings = {}
+        for label, fn in [('rebuild', lambda: JSONResponse(build_payload(rows)).body),
+                          ('cached', lambda: get_response_cache().get('option-data').respond(zipped)),
+                          ('304', lambda: get_response_cache().get('option-data').respond(conditional))]:
+            start = time.perf_counter()
+            for _ in range(1000):
+                response = fn()
+            timings[label] = (time.perf_counter() - start) / 1000 * 1e6
+        print(f"{contracts:>10}{timings['rebuild']:>14.1f}{timings['cached']:>13.1f}{timings['304']:>10.1f}"
+              f"{len(entry.body):>14,}{len(entry.variants.get('gzip', entry.body)):>10,}")
@@ -1,23 +1,129 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 from datetime import datetime
 import warnings
 
-import upstox_client
+from backtest_report import BacktestResult
+from indicator_utils import wilder_smooth
 
 warnings.filterwarnings('ignore')
 
 
+def smma_array(values, period):
+    """Smoothed Moving Average (SMMA/RMA) of a NumPy array; NaN before the first full period"""
+    values = np.asarray(values, dtype=float)
+    smma = np.full(len(values), np.nan)
+    if len(values) < period:
+        return smma
+    smma[period - 1] = values[:period].mean()
+    smma[period:] = wilder_smooth(values[period:], period, smma[period - 1])
+    return smma
+
+
 def calculate_smma(data, period):
     """Calculate Smoothed Moving Average (SMMA/RMA)"""
-    smma = pd.Series(index=data.index, dtype=float)
-    smma.iloc[period - 1] = data.iloc[:period].mean()
+    return pd.Series(smma_array(data.to_numpy(), period), index=data.index)
 
-    for i in range(period, len(data)):
-        smma.iloc[i] = (smma.iloc[i - 1] * (period - 1) + data.iloc[i]) / period
 
-    return smma
+def backtest_kernel(close, fast_period=5, slow_period=13, periods_per_year=252):
+    """
+    Array-only SMMA crossover backtest over close prices.
+
+    Returns a dict with the per-bar arrays (SMMAs, signal, position, returns, cumulative
+    returns, drawdown), the closed trades (entry/exit bar indexes and returns) and the
+    performance metrics, computed without iterating over rows.
+    """
+    close = np.asarray(close, dtype=float)
+    return crossover_backtest(close, smma_array(close, fast_period), smma_array(close, slow_period), periods_per_year)
+
+
+def crossover_backtest(close, smma_fast, smma_slow, periods_per_year=252):
+    """
+    backtest_kernel for precomputed fast/slow SMMA arrays, so sweeps can reuse them across pairs.
+    """
+    # 1 = long, -1 = short/exit, 0 while either SMMA is still undefined
+    signal = np.where(smma_fast > smma_slow, 1.0, np.where(smma_fast <= smma_slow, -1.0, 0.0))
+    position = np.full(len(close), np.nan)
+    position[1:] = np.diff(signal)
+
+    returns = np.full(len(close), np.nan)
+    returns[1:] = close[1:] / close[:-1] - 1
+    strategy_returns = np.full(len(close), np.nan)
+    strategy_returns[1:] = signal[:-1] * returns[1:]
+
+    # Cumulative products skip the leading NaN like pandas' cumprod
+    cumulative_market = np.cumprod(np.nan_to_num(1 + returns, nan=1.0))
+    cumulative_strategy = np.cumprod(np.nan_to_num(1 + strategy_returns, nan=1.0))
+    cumulative_market[0] = cumulative_strategy[0] = np.nan
+
+    # A sell closes a trade only when the event just before it was a buy
+    events = np.flatnonzero(np.abs(position) == 2)
+    is_buy = position[events] == 2
+    closes_trade = ~is_buy[1:] & is_buy[:-1]
+    entries = events[:-1][closes_trade]
+    exits = events[1:][closes_trade]
+    trade_returns = (close[exits] - close[entries]) / close[entries]
+
+    win_rate = (trade_returns > 0).mean() * 100 if len(trade_returns) else 0
+    strategy_std = np.nanstd(strategy_returns, ddof=1) if len(close) > 2 else 0
+    sharpe = np.nanmean(strategy_returns) / strategy_std * np.sqrt(periods_per_year) if strategy_std > 0 else 0
+    running_max = np.fmax.accumulate(cumulative_strategy)
+    drawdown = (cumulative_strategy - running_max) / running_max
+
+    return {
+        'smma_fast': smma_fast,
+        'smma_slow': smma_slow,
+        'signal': signal,
+        'position': position,
+        'returns': returns,
+        'strategy_returns': strategy_returns,
+        'cumulative_market': cumulative_market,
+        'cumulative_strategy': cumulative_strategy,
+        'drawdown': drawdown,
+        'trade_entries': entries,
+        'trade_exits': exits,
+        'trade_returns': trade_returns,
+        'metrics': {
+            'total_return': (cumulative_strategy[-1] - 1) * 100,
+            'market_return': (cumulative_market[-1] - 1) * 100,
+            'num_trades': int(is_buy.sum()),
+            'win_rate': win_rate,
+            'sharpe': sharpe,
+            'max_drawdown': np.nanmin(drawdown) * 100,
+        },
+    }
+
+
+def run_backtest(df, fast_period=5, slow_period=13, initial_capital=10000, periods_per_year=252):
+    """
+    Headless SMMA crossover backtest of a DataFrame with a 'Close' column; returns a BacktestResult
+    without printing or plotting anything.
+    """
+    close = df['Close'].to_numpy(dtype=float)
+    result = backtest_kernel(close, fast_period, slow_period, periods_per_year)
+    equity_curve = pd.DataFrame({
+        'Close': close,
+        'SMMA_fast': result['smma_fast'],
+        'SMMA_slow': result['smma_slow'],
+        'Signal': result['signal'].astype(int),
+        'Position': result['position'],
+        'Returns': result['returns'],
+        'Strategy_Returns': result['strategy_returns'],
+        'Cumulative_Market': result['cumulative_market'],
+        'Cumulative_Strategy': result['cumulative_strategy'],
+        'Portfolio_Value': initial_capital * result['cumulative_strategy'],
+        'Drawdown': result['drawdown'],
+    }, index=df.index)
+    entries, exits = result['trade_entries'], result['trade_exits']
+    trades = pd.DataFrame({
+        'entry_time': df.index[entries],
+        'exit_time': df.index[exits],
+        'entry_price': close[entries],
+        'exit_price': close[exits],
+        'return': result['trade_returns'],
+    })
+    params = {'fast_period': fast_period, 'slow_period': slow_period, 'initial_capital': initial_capital}
+    return BacktestResult(params, result['metrics'], equity_curve, trades)
 
 
 def load_data_from_csv(filepath):
@@ -26,9 +132,9 @@ def load_data_from_csv(filepath):
     return df
 
 
-def generate_sample_data(start='2020-01-01', end='2024-12-09', initial_price=10000):
+def generate_sample_data(start='2020-01-01', end='2024-12-09', initial_price=10000, freq='D'):
     """Generate sample price data for testing (simulates crypto-like volatility)"""
-    date_range = pd.date_range(start=start, end=end, freq='D')
+    date_range = pd.date_range(start=start, end=end, freq=freq)
 
     # Generate random walk with trend
     np.random.seed(42)
@@ -47,7 +153,7 @@ def generate_sample_data(start='2020-01-01', end='2024-12-09', initial_price=100
 
 
 def backtest_smma_cross(df=None, csv_path=None, use_sample=True,
-                        fast_period=5, slow_period=13, initial_capital=10000):
+                        fast_period=5, slow_period=13, initial_capital=10000, plot=True):
     """
     Backtest SMMA crossover strategy
 
@@ -58,6 +164,7 @@ def backtest_smma_cross(df=None, csv_path=None, use_sample=True,
     - fast_period: fast SMMA period (default 5)
     - slow_period: slow SMMA period (default 13)
     - initial_capital: starting capital
+    - plot: if True, show the charts after the backtest (default); use run_backtest for headless runs
 
     CSV format should have columns: Date, Open, High, Low, Close, Volume
     """
@@ -80,120 +187,95 @@ def backtest_smma_cross(df=None, csv_path=None, use_sample=True,
 
     print(f"Data loaded: {len(df)} rows from {df.index[0]} to {df.index[-1]}")
 
-    # Calculate SMMAs
-    df['SMMA_fast'] = calculate_smma(df['Close'], fast_period)
-    df['SMMA_slow'] = calculate_smma(df['Close'], slow_period)
-
-    # Generate signals
-    df['Signal'] = 0
-    df.loc[df['SMMA_fast'] > df['SMMA_slow'], 'Signal'] = 1  # Long
-    df.loc[df['SMMA_fast'] <= df['SMMA_slow'], 'Signal'] = -1  # Short/Exit
-
-    # Identify crossovers
-    df['Position'] = df['Signal'].diff()
-
-    # Calculate returns
-    df['Returns'] = df['Close'].pct_change()
-    df['Strategy_Returns'] = df['Signal'].shift(1) * df['Returns']
-
-    # Calculate cumulative returns
-    df['Cumulative_Market'] = (1 + df['Returns']).cumprod()
-    df['Cumulative_Strategy'] = (1 + df['Strategy_Returns']).cumprod()
-
-    # Portfolio value
-    df['Portfolio_Value'] = initial_capital * df['Cumulative_Strategy']
-
-    # Performance metrics
-    total_return = (df['Cumulative_Strategy'].iloc[-1] - 1) * 100
-    market_return = (df['Cumulative_Market'].iloc[-1] - 1) * 100
-
-    # Calculate trade statistics
-    buy_signals = df[df['Position'] == 2]
-    sell_signals = df[df['Position'] == -2]
-    num_trades = len(buy_signals)
-
-    # Winning trades
-    trades = []
-    entry_price = None
-    for idx, row in df.iterrows():
-        if row['Position'] == 2:  # Buy signal
-            entry_price = row['Close']
-        elif row['Position'] == -2 and entry_price:  # Sell signal
-            trades.append((row['Close'] - entry_price) / entry_price)
-            entry_price = None
-
-    if trades:
-        winning_trades = sum(1 for t in trades if t > 0)
-        win_rate = (winning_trades / len(trades)) * 100
-    else:
-        win_rate = 0
-
-    # Sharpe ratio (annualized)
-    strategy_std = df['Strategy_Returns'].std()
-    if strategy_std > 0:
-        sharpe = (df['Strategy_Returns'].mean() / strategy_std) * np.sqrt(252)
-    else:
-        sharpe = 0
-
-    # Maximum drawdown
-    cumulative = df['Cumulative_Strategy']
-    running_max = cumulative.expanding().max()
-    drawdown = (cumulative - running_max) / running_max
-    max_drawdown = drawdown.min() * 100
-
-    # Print results
-    print("\n" + "=" * 50)
-    print(f"SMMA {fast_period}/{slow_period} Crossover Strategy Backtest")
-    print("=" * 50)
-    print(f"Period: {df.index[0].date()} to {df.index[-1].date()}")
-    print(f"Initial Capital: ${initial_capital:,.2f}")
-    print(f"\nPerformance Metrics:")
-    print(f"  Strategy Return: {total_return:.2f}%")
-    print(f"  Buy & Hold Return: {market_return:.2f}%")
-    print(f"  Final Portfolio Value: ${df['Portfolio_Value'].iloc[-1]:,.2f}")
-    print(f"  Number of Trades: {num_trades}")
-    print(f"  Win Rate: {win_rate:.2f}%")
-    print(f"  Sharpe Ratio: {sharpe:.2f}")
-    print(f"  Max Drawdown: {max_drawdown:.2f}%")
-    print("=" * 50)
-
-    # Plot results
-    fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(14, 10), sharex=True)
-
-    # Price and SMMAs
-    ax1.plot(df.index, df['Close'], label='Close Price', linewidth=1.5)
-    ax1.plot(df.index, df['SMMA_fast'], label=f'SMMA {fast_period}', linewidth=1)
-    ax1.plot(df.index, df['SMMA_slow'], label=f'SMMA {slow_period}', linewidth=1)
-    ax1.scatter(buy_signals.index, df.loc[buy_signals.index, 'Close'],
-                color='green', marker='^', s=100, label='Buy', zorder=5)
-    ax1.scatter(sell_signals.index, df.loc[sell_signals.index, 'Close'],
-                color='red', marker='v', s=100, label='Sell', zorder=5)
-    ax1.set_ylabel('Price')
-    ax1.set_title(f'SMMA {fast_period}/{slow_period} Crossover Strategy')
-    ax1.legend()
-    ax1.grid(alpha=0.3)
-
-    # Cumulative returns
-    ax2.plot(df.index, df['Cumulative_Strategy'], label='Strategy', linewidth=2)
-    ax2.plot(df.index, df['Cumulative_Market'], label='Buy & Hold', linewidth=2, alpha=0.7)
-    ax2.set_ylabel('Cumulative Returns')
-    ax2.legend()
-    ax2.grid(alpha=0.3)
-
-    # Drawdown
-    ax3.fill_between(df.index, drawdown * 100, 0, alpha=0.3, color='red')
-    ax3.set_ylabel('Drawdown (%)')
-    ax3.set_xlabel('Date')
-    ax3.grid(alpha=0.3)
-
-    plt.tight_layout()
-    plt.show()
+    result = run_backtest(df, fast_period, slow_period, initial_capital)
+    curve = result.equity_curve
+    for column in ('SMMA_fast', 'SMMA_slow', 'Signal', 'Position', 'Returns', 'Strategy_Returns',
+                   'Cumulative_Market', 'Cumulative_Strategy', 'Portfolio_Value'):
+        df[column] = curve[column]
+
+    print("\n" + result.summary())
+
+    if plot:
+        result.show()
 
     return df
 
 
+def benchmark(years=5, legacy_bars=50_000):
+    """
+    Time backtest_kernel on `years` of 1-minute NSE bars (375 per session, 252 sessions a year)
+    against the previous loop-based implementation, which is timed on the first `legacy_bars`
+    bars and extrapolated. tests/test_smma_strategy.py checks that the two agree.
+    """
+    import time
+    from indicator_utils import _scipy_lfilter
+
+    def legacy_smma(data, period):
+        smma = pd.Series(index=data.index, dtype=float)
+        smma.iloc[period - 1] = data.iloc[:period].mean()
+        for i in range(period, len(data)):
+            smma.iloc[i] = (smma.iloc[i - 1] * (period - 1) + data.iloc[i]) / period
+        return smma
+
+    def legacy_backtest(df, fast_period=5, slow_period=13):
+        df = df.copy()
+        df['SMMA_fast'] = legacy_smma(df['Close'], fast_period)
+        df['SMMA_slow'] = legacy_smma(df['Close'], slow_period)
+        df['Signal'] = 0
+        df.loc[df['SMMA_fast'] > df['SMMA_slow'], 'Signal'] = 1
+        df.loc[df['SMMA_fast'] <= df['SMMA_slow'], 'Signal'] = -1
+        df['Position'] = df['Signal'].diff()
+        df['Returns'] = df['Close'].pct_change()
+        df['Strategy_Returns'] = df['Signal'].shift(1) * df['Returns']
+        df['Cumulative_Strategy'] = (1 + df['Strategy_Returns']).cumprod()
+        trades = []
+        entry_price = None
+        for idx, row in df.iterrows():
+            if row['Position'] == 2:
+                entry_price = row['Close']
+            elif row['Position'] == -2 and entry_price:
+                trades.append((row['Close'] - entry_price) / entry_price)
+                entry_price = None
+        strategy_std = df['Strategy_Returns'].std()
+        cumulative = df['Cumulative_Strategy']
+        drawdown = (cumulative - cumulative.expanding().max()) / cumulative.expanding().max()
+        return {
+            'total_return': (cumulative.iloc[-1] - 1) * 100,
+            'num_trades': int((df['Position'] == 2).sum()),
+            'win_rate': sum(1 for t in trades if t > 0) / len(trades) * 100 if trades else 0,
+            'sharpe': df['Strategy_Returns'].mean() / strategy_std * np.sqrt(252) if strategy_std > 0 else 0,
+            'max_drawdown': drawdown.min() * 100,
+        }
+
+    bars = years * 252 * 375
+    rng = np.random.default_rng(7)
+    close = 20000 * np.exp(np.cumsum(rng.normal(0, 0.0005, bars)))
+
+    _scipy_lfilter()  # keep the one-off SciPy import out of the timing
+    start = time.perf_counter()
+    result = backtest_kernel(close)
+    kernel_time = time.perf_counter() - start
+
+    sample = pd.DataFrame({'Close': close[:legacy_bars]}, index=pd.RangeIndex(legacy_bars))
+    start = time.perf_counter()
+    legacy_backtest(sample)
+    legacy_time = (time.perf_counter() - start) * bars / legacy_bars
+
+    print(f"{bars:,} bars ({years}y of 1m): kernel {kernel_time:.2f}s, "
+          f"legacy ~{legacy_time:.0f}s (extrapolated from {legacy_bars:,} bars), "
+          f"{legacy_time / kernel_time:.0f}x faster, {result['metrics']['num_trades']} trades")
+
+
 # Run the backtest
 if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        benchmark()
+        sys.exit()
+
+    from candle_store import get_candle_store
+
     # Option 1: Use sample data (no yfinance needed)
     # df_results = backtest_smma_cross(
     #     use_sample=True,
@@ -211,21 +293,16 @@ if __name__ == "__main__":
     # )
 
     # Option 3: Pass your own DataFrame (uncomment to use)
-    api = upstox_client.HistoryV3Api()
-    response = api.get_historical_candle_data1(instrument_key='NSE_INDEX|Nifty 50', unit='minutes', interval=15,
-                                               to_date='2025-12-09', from_date='2025-11-10')
-    candles = getattr(getattr(response, 'data', None), 'candles', [])
-
-    # Transform candles data into proper DataFrame format
-    # Candles format: [timestamp, open, high, low, close, volume, oi]
-    your_df = pd.DataFrame(candles, columns=['Date', 'Open', 'High', 'Low', 'Close', 'Volume', 'OI'])
-    your_df['Date'] = pd.to_datetime(your_df['Date'])
-    your_df = your_df.set_index('Date')
-    your_df = your_df.drop('OI', axis=1)  # Drop OI column if not needed
+    # 15-minute bars resampled from the local 1-minute candle store, as a (ts, open, ..., oi) array, oldest first
+    candles = get_candle_store().read_bars('NSE_INDEX|Nifty 50', 'minutes', 15, '2025-11-10', '2025-12-09')
+    your_df = pd.DataFrame({
+        'Open': candles['open'], 'High': candles['high'], 'Low': candles['low'],
+        'Close': candles['close'], 'Volume': candles['volume'],
+    }, index=pd.to_datetime(candles['ts'], unit='s', utc=True).tz_convert('Asia/Kolkata').rename('Date'))
 
     df_results = backtest_smma_cross(
         df=your_df,
         fast_period=5,
         slow_period=13,
         initial_capital=10000
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,384 @@
+"""
+Incremental (streaming) indicators: each closed candle is applied in O(1) amortized time.
+
+StreamingStochRSI reproduces indicator_utils.stochrsi_series bar for bar (including its
+seeding), StreamingSMMA matches smma_strategy.calculate_smma and StreamingPivots finds
+the same pivots as find_support_resistance_niftyfifty_daily. Rolling extrema use
+monotonic deques. Every indicator round-trips through to_dict()/from_dict() so state
+can be persisted.
+
+IndicatorService keeps one set of indicators per (instrument_key, timeframe), feeds them
+only candles newer than the last one applied and saves its state to disk, so reading
+the latest values does not recompute the candle history.
+"""
+import copy
+import json
+import os
+import threading
+from collections import deque
+from logger_config import get_logger
+
+# Get logger instance
+logger = get_logger(__name__)
+
+INDICATOR_STATE_FILE = os.environ.get(
+    "INDICATOR_STATE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'indicator_state.json')
+)
+# Most recent pivot highs/lows kept per series
+MAX_PIVOTS = 100
+
+
+class RollingExtreme:
+    """
+    Min or max over the last `window` values pushed, via a monotonic deque.
+    """
+
+    def __init__(self, window, mode='max'):
+        self.window = window
+        self.mode = mode
+        self.count = 0
+        self._deque = deque()  # (index, value), values monotonic
+
+    def _dominated(self, existing, value):
+        return existing <= value if self.mode == 'max' else existing >= value
+
+    def push(self, value):
+        while self._deque and self._dominated(self._deque[-1][1], value):
+            self._deque.pop()
+        self._deque.append((self.count, value))
+        self.count += 1
+        while self._deque[0][0] <= self.count - 1 - self.window:
+            self._deque.popleft()
+
+    @property
+    def value(self):
+        return self._deque[0][1] if self._deque else None
+
+    def to_dict(self):
+        return {'window': self.window, 'mode': self.mode, 'count': self.count, 'deque': list(self._deque)}
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls(state['window'], state['mode'])
+        obj.count = state['count']
+        obj._deque = deque(tuple(item) for item in state['deque'])
+        return obj
+
+
+class StreamingStochRSI:
+    """
+    Wilder RSI and Stochastic RSI updated one close at a time.
+
+    The batch implementation seeds its averages with the first period + 1 deltas, so the
+    first period + 2 closes are buffered and replayed once available.
+    """
+
+    def __init__(self, period=14):
+        self.period = period
+        self.count = 0
+        self.prev_close = None
+        self.up = None
+        self.down = None
+        self.rsi = None
+        self.stochrsi = None
+        self._warmup = []
+        self._min = RollingExtreme(period, 'min')
+        self._max = RollingExtreme(period, 'max')
+
+    @staticmethod
+    def _rsi(up, down):
+        rs = up / down if down != 0 else 0
+        return 100. - 100. / (1. + rs)
+
+    def _push_rsi(self, rsi):
+        self.rsi = rsi
+        self._min.push(rsi)
+        self._max.push(rsi)
+        index = self.count - 1
+        if index < self.period:
+            self.stochrsi = 0.0
+            return
+        lowest, highest = self._min.value, self._max.value
+        self.stochrsi = (rsi - lowest) / (highest - lowest) if highest != lowest else 0.0
+
+    def _smooth(self, close):
+        delta = close - self.prev_close
+        self.up = (self.up * (self.period - 1) + max(delta, 0.)) / self.period
+        self.down = (self.down * (self.period - 1) + max(-delta, 0.)) / self.period
+        self.prev_close = close
+
+    def update(self, candle):
+        self.update_close(float(candle[4]))
+
+    def update_close(self, close):
+        period = self.period
+        if self.up is None:
+            self._warmup.append(close)
+            if len(self._warmup) < period + 2:
+                return
+            closes, self._warmup = self._warmup, []
+            deltas = [b - a for a, b in zip(closes, closes[1:])]
+            self.up = sum(d for d in deltas if d >= 0) / period
+            self.down = -sum(d for d in deltas if d < 0) / period
+            seed_rsi = self._rsi(self.up, self.down)
+            for i, c in enumerate(closes):
+                self.count += 1
+                if i < period:
+                    self.prev_close = c
+                    self._push_rsi(seed_rsi)
+                else:
+                    self._smooth(c)
+                    self._push_rsi(self._rsi(self.up, self.down))
+            return
+        self.count += 1
+        self._smooth(close)
+        self._push_rsi(self._rsi(self.up, self.down))
+
+    @property
+    def value(self):
+        """
+        Latest Stochastic RSI, or None until 2 * period closes were seen (as in calculate_stochrsi).
+        """
+        if self.count < self.period * 2:
+            return None
+        return self.stochrsi
+
+    def to_dict(self):
+        state = {k: v for k, v in self.__dict__.items() if k not in ('_min', '_max')}
+        state['_min'] = self._min.to_dict()
+        state['_max'] = self._max.to_dict()
+        return state
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls(state['period'])
+        obj.__dict__.update({k: v for k, v in state.items() if k not in ('_min', '_max')})
+        obj._min = RollingExtreme.from_dict(state['_min'])
+        obj._max = RollingExtreme.from_dict(state['_max'])
+        return obj
+
+
+class StreamingSMMA:
+    """
+    Smoothed moving average: mean of the first `period` closes, then Wilder-style smoothing.
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self.count = 0
+        self.total = 0.0
+        self.value = None
+
+    def update(self, candle):
+        self.update_close(float(candle[4]))
+
+    def update_close(self, close):
+        self.count += 1
+        if self.count < self.period:
+            self.total += close
+        elif self.count == self.period:
+            self.value = (self.total + close) / self.period
+        else:
+            self.value = (self.value * (self.period - 1) + close) / self.period
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls(state['period'])
+        obj.__dict__.update(state)
+        return obj
+
+
+class StreamingPivots:
+    """
+    Confirms pivot highs/lows `right` bars after they occur: a bar is a pivot high when its
+    high equals the max of the `left` bars before it, itself and the `right` bars after it.
+    """
+
+    def __init__(self, left=15, right=15, max_pivots=MAX_PIVOTS):
+        self.left = left
+        self.right = right
+        self.max_pivots = max_pivots
+        self.window = left + right + 1
+        self._bars = deque(maxlen=self.window)  # (timestamp, high, low)
+        self._highs = RollingExtreme(self.window, 'max')
+        self._lows = RollingExtreme(self.window, 'min')
+        self.resistances = []
+        self.supports = []
+
+    def update(self, candle):
+        self._bars.append((candle[0], float(candle[2]), float(candle[3])))
+        self._highs.push(float(candle[2]))
+        self._lows.push(float(candle[3]))
+        if len(self._bars) < self.window:
+            return
+        timestamp, high, low = self._bars[self.left]
+        if high == self._highs.value:
+            self.resistances.append((timestamp, high))
+        if low == self._lows.value:
+            self.supports.append((timestamp, low))
+        # Keep state (and each update's copy of it) bounded
+        del self.resistances[:-self.max_pivots]
+        del self.supports[:-self.max_pivots]
+
+    def to_dict(self):
+        return {
+            'left': self.left, 'right': self.right, 'max_pivots': self.max_pivots, 'bars': list(self._bars),
+            'highs': self._highs.to_dict(), 'lows': self._lows.to_dict(),
+            'resistances': self.resistances, 'supports': self.supports,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls(state['left'], state['right'], state['max_pivots'])
+        obj._bars.extend(tuple(bar) for bar in state['bars'])
+        obj._highs = RollingExtreme.from_dict(state['highs'])
+        obj._lows = RollingExtreme.from_dict(state['lows'])
+        obj.resistances = [tuple(p) for p in state['resistances']]
+        obj.supports = [tuple(p) for p in state['supports']]
+        return obj
+
+
+INDICATOR_TYPES = {
+    'stochrsi': StreamingStochRSI,
+    'smma_fast': StreamingSMMA,
+    'smma_slow': StreamingSMMA,
+    'pivots': StreamingPivots,
+}
+
+
+class IndicatorSet:
+    """
+    The indicators tracked for one (instrument_key, timeframe) series.
+    """
+
+    def __init__(self, indicators=None, last_timestamp=None):
+        self.indicators = indicators or {
+            'stochrsi': StreamingStochRSI(14),
+            'smma_fast': StreamingSMMA(5),
+            'smma_slow': StreamingSMMA(13),
+            'pivots': StreamingPivots(15, 15),
+        }
+        self.last_timestamp = last_timestamp
+
+    def update(self, candle):
+        for indicator in self.indicators.values():
+            indicator.update(candle)
+        self.last_timestamp = candle[0]
+
+    def read(self):
+        pivots = self.indicators['pivots']
+        return {
+            'stochrsi': self.indicators['stochrsi'].value,
+            'rsi': self.indicators['stochrsi'].rsi,
+            'smma_fast': self.indicators['smma_fast'].value,
+            'smma_slow': self.indicators['smma_slow'].value,
+            'supports': pivots.supports,
+            'resistances': pivots.resistances,
+            'last_timestamp': self.last_timestamp,
+        }
+
+    def to_dict(self):
+        return {
+            'last_timestamp': self.last_timestamp,
+            'indicators': {name: indicator.to_dict() for name, indicator in self.indicators.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        indicators = {name: INDICATOR_TYPES[name].from_dict(s) for name, s in state['indicators'].items()}
+        return cls(indicators, state['last_timestamp'])
+
+
+class IndicatorService:
+    """
+    One IndicatorSet per (instrument_key, timeframe), persisted to a JSON state file.
+    """
+
+    def __init__(self, state_file=INDICATOR_STATE_FILE):
+        self.state_file = state_file
+        self._lock = threading.Lock()
+        self._series = {}
+        self._provisional = {}
+        self._load()
+
+    def _load(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'r') as f:
+                state = json.load(f)
+            self._series = {tuple(key.split('@', 1)): IndicatorSet.from_dict(s) for key, s in state.items()}
+            logger.info(f"Loaded indicator state for {len(self._series)} series from {self.state_file}")
+        except Exception as e:
+            logger.error(f"Could not load indicator state from {self.state_file}: {str(e)}", exc_info=True)
+
+    def _save(self):
+        if not self.state_file:
+            return
+        state = {f"{key[0]}@{key[1]}": series.to_dict() for key, series in self._series.items()}
+        tmp_path = self.state_file + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_file)
+
+    def feed(self, instrument_key, timeframe, candles):
+        """
+        Applies candles (newest-first, as returned by the history API) newer than the last one seen.
+        The newest candle may still be forming, so it is only previewed on a copy, never committed.
+        """
+        if not candles:
+            return
+        key = (instrument_key, timeframe)
+        with self._lock:
+            series = self._series.setdefault(key, IndicatorSet())
+            newest, closed = candles[0], candles[1:]
+            fresh = []
+            for candle in closed:
+                if series.last_timestamp is not None and candle[0] <= series.last_timestamp:
+                    break
+                fresh.append(candle)
+            for candle in reversed(fresh):
+                series.update(candle)
+            provisional = copy.deepcopy(series)
+            if series.last_timestamp is None or newest[0] > series.last_timestamp:
+                provisional.update(newest)
+            self._provisional[key] = provisional.read()
+            if fresh:
+                self._save()
+
+    def read(self, instrument_key, timeframe):
+        """
+        Returns the latest indicator values for a series (including the forming candle), or None.
+        """
+        with self._lock:
+            return self._provisional.get((instrument_key, timeframe))
+
+    def refresh(self, instrument_key, timeframe, fetch):
+        """
+        Feeds the candles returned by fetch() (a {'data': {'candles': [...]}} response or None)
+        and returns the latest values.
+        """
+        response = fetch()
+        if response:
+            self.feed(instrument_key, timeframe, response['data']['candles'])
+        return self.read(instrument_key, timeframe)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_indicator_service():
+    """
+    Returns the process-wide IndicatorService.
+    """
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = IndicatorService()
+    return _service
@@ -0,0 +1,95 @@
+"""
+Backend modules import each other as top-level modules (they run from backend/), so the tests do too.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the module-level engines in database.py (and so main.py) off the development database
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def candle_cache(monkeypatch):
+    """
+    A fresh process-wide CandleCache for every test.
+    """
+    import candle_cache
+    cache = candle_cache.CandleCache()
+    monkeypatch.setattr(candle_cache, '_cache', cache)
+    return cache
+
+
+@pytest.fixture
+def candle_store(tmp_path, monkeypatch):
+    """
+    A CandleStore in a temporary directory, installed as the process-wide store.
+    """
+    import candle_store
+    store = candle_store.CandleStore(root=str(tmp_path / 'candles'))
+    monkeypatch.setattr(candle_store, '_store', store)
+    return store
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """
+    A file-backed SQLite engine with every table created.
+    """
+    from sqlalchemy import create_engine
+    import models  # noqa: F401  (registers the tables)
+    from database import Base
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    """
+    A session on the test engine.
+    """
+    from sqlalchemy.orm import sessionmaker
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture(autouse=True)
+def last_oi_cache(monkeypatch):
+    """
+    An empty in-process previous-OI cache for every test.
+    """
+    import crud
+    cache = {}
+    monkeypatch.setattr(crud, '_last_oi', cache)
+    return cache
+
+
+@pytest.fixture
+def app_module(monkeypatch):
+    """
+    The main module with empty response caches and option tables. Startup events (the poll loop) do not run.
+    """
+    os.environ.setdefault("EXPIRY_DATE", "2099-01-01")
+    import main
+    import models
+    import response_cache
+    monkeypatch.setattr(response_cache, '_cache', response_cache.ResponseCache())
+    with main.database.engine.begin() as conn:
+        conn.execute(models.OptionData.__table__.delete())
+        conn.execute(models.Snapshot.__table__.delete())
+    return main
+
+
+@pytest.fixture
+def client(app_module):
+    """
+    An httpx.AsyncClient bound to the app in-process.
+    """
+    import httpx
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app_module.app), base_url='http://test')
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import random
+from contextlib import aclosing
+from broadcast import SnapshotBroadcaster, apply_delta, diff
+
+
+def make_chain(rng, strikes=20):
+    return {f"NSE_FO|{i}": {'strike_price': 20000 + 50 * (i // 2), 'option_type': 'CE' if i % 2 else 'PE',
+                            'ltp': 100.0, 'oi': 100000} for i in range(strikes * 2)}
+
+
+def next_snapshot(rng, chain, cycle):
+    for key in list(chain):
+        if rng.random() < 0.3:
+            chain[key]['ltp'] = round(chain[key]['ltp'] + rng.gauss(0, 2), 2)
+            chain[key]['oi'] += rng.randint(-500, 500)
+        if rng.random() < 0.02:
+            del chain[key]
+    if rng.random() < 0.2:
+        chain[f"NSE_FO|new{cycle}"] = {'strike_price': 30000, 'option_type': 'CE', 'ltp': 1.0, 'oi': 0}
+    snapshot = {'version_time': cycle, 'pcr': rng.random(), 'chain': {k: dict(v) for k, v in chain.items()}}
+    if cycle % 3:
+        snapshot['analytics'] = {'max_pain': rng.choice([24900, 25000]), 'bands': [rng.random(), rng.random()]}
+    return snapshot
+
+
+def test_diff_then_apply_rebuilds_the_new_snapshot():
+    rng = random.Random(1)
+    chain = make_chain(rng)
+    previous = next_snapshot(rng, chain, 0)
+    for cycle in range(1, 50):
+        snapshot = next_snapshot(rng, chain, cycle)
+        changed, removed = diff(previous, snapshot)
+        state = json.loads(json.dumps(previous))
+        assert apply_delta(state, changed, removed) == snapshot
+        previous = snapshot
+
+
+def test_diff_of_equal_snapshots_is_empty_and_non_dicts_replace_whole():
+    assert diff({'a': {'b': 1}}, {'a': {'b': 1}}) == ([], [])
+    assert diff({'a': [1, 2]}, {'a': [1, 3]}) == ([[['a'], [1, 3]]], [])
+    assert apply_delta({'a': 1}, *diff({'a': 1}, 5)) == 5
+
+
+def test_subscriber_replay_matches_the_last_snapshot():
+    async def scenario():
+        rng = random.Random(2)
+        chain = make_chain(rng)
+        broadcaster = SnapshotBroadcaster(queue_size=64)
+        stream = broadcaster.subscribe()
+        first = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        snapshots = [next_snapshot(rng, chain, cycle) for cycle in range(30)]
+        for snapshot in snapshots:
+            broadcaster.publish(snapshot)
+
+        message = json.loads(await first)
+        assert message['type'] == 'snapshot' and message['version'] == 1
+        state = message['data']
+        for version in range(2, 31):
+            message = json.loads(await anext(stream))
+            assert message['type'] == 'delta' and message['version'] == version and message['base'] == version - 1
+            state = apply_delta(state, message['changed'], message['removed'])
+        assert state == json.loads(json.dumps(snapshots[-1]))
+        await stream.aclose()
+        assert broadcaster.subscriber_count == 0
+
+    asyncio.run(scenario())
+
+
+def test_late_subscriber_starts_with_the_current_snapshot():
+    async def scenario():
+        broadcaster = SnapshotBroadcaster()
+        broadcaster.publish({'pcr': 1.0})
+        broadcaster.publish({'pcr': 1.1})
+        async with aclosing(broadcaster.subscribe()) as stream:
+            message = json.loads(await anext(stream))
+        assert message == {'type': 'snapshot', 'version': 2, 'data': {'pcr': 1.1}}
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_is_resynced_with_a_full_snapshot():
+    async def scenario():
+        broadcaster = SnapshotBroadcaster(queue_size=2)
+        broadcaster.publish({'pcr': 0})
+        async with aclosing(broadcaster.subscribe()) as stream:
+            assert json.loads(await anext(stream))['version'] == 1
+            for i in range(1, 5):
+                broadcaster.publish({'pcr': i})
+            # The backlog was dropped for the latest full snapshot, and deltas follow it again
+            assert json.loads(await anext(stream)) == {'type': 'snapshot', 'version': 4, 'data': {'pcr': 3}}
+            message = json.loads(await anext(stream))
+            assert message['type'] == 'delta' and message['base'] == 4
+            assert apply_delta({'pcr': 3}, message['changed'], message['removed']) == {'pcr': 4}
+
+    asyncio.run(scenario())
+
+
+def test_idle_subscriber_gets_keepalives():
+    async def scenario():
+        broadcaster = SnapshotBroadcaster(keepalive=0.01)
+        async with aclosing(broadcaster.subscribe()) as stream:
+            assert await anext(stream) is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,91 @@
+import datetime
+import pytest
+import bulk_writer
+import models
+from bulk_writer import OptionDataWriter
+
+
+def make_cycle(n, rows=6):
+    taken_at = datetime.datetime(2024, 1, 1, 9, 15) + datetime.timedelta(minutes=5 * n)
+    snapshot = {'taken_at': taken_at, 'spot': 25000.0 + n, 'expiry': 0}
+    option_rows = [{'instrument_key': f"NSE_FO|{i}", 'strike_price': 20000.0 + 50 * (i // 2),
+                    'option_type': 'CE' if i % 2 else 'PE', 'ltp': 100.0 + n, 'oi': 1000.0 * n + i,
+                    'change_in_oi': float(i), 'iv': 0.15 if i % 3 else None}
+                   for i in range(rows)]
+    return snapshot, option_rows
+
+
+def stored(db):
+    return sorted((r.snapshot.spot, r.timestamp, r.instrument_key, r.option_type, r.oi, r.iv)
+                  for r in db.query(models.OptionData))
+
+
+def test_rows_match_the_orm_path(engine, db):
+    cycles = [make_cycle(n) for n in range(3)]
+    writer = OptionDataWriter(engine)
+    assert [writer.add(*cycle) for cycle in cycles] == [6, 6, 6]
+
+    for snapshot, rows in cycles:
+        snap = models.Snapshot(**snapshot)
+        db.add(snap)
+        db.add_all([models.OptionData(snapshot=snap, timestamp=snapshot['taken_at'], **row) for row in rows])
+    db.commit()
+    # Every row the writer stored has an identical twin written through the ORM
+    written = stored(db)
+    assert written[::2] == written[1::2]
+    assert db.query(models.Snapshot).count() == 6
+
+
+def test_rows_point_at_their_own_snapshot(engine, db):
+    writer = OptionDataWriter(engine, flush_cycles=3)
+    for n in range(3):
+        writer.add(*make_cycle(n))
+    for snapshot in db.query(models.Snapshot):
+        rows = db.query(models.OptionData).filter(models.OptionData.snapshot_id == snapshot.id).all()
+        assert len(rows) == 6
+        assert {row.timestamp for row in rows} == {snapshot.taken_at}
+        assert {row.ltp for row in rows} == {snapshot.spot - 25000.0 + 100.0}
+
+
+def test_cycles_are_held_until_flush_cycles(engine, db):
+    writer = OptionDataWriter(engine, flush_cycles=3)
+    assert writer.add(*make_cycle(0)) == 0
+    assert writer.add(*make_cycle(1)) == 0
+    assert db.query(models.OptionData).count() == 0
+    assert writer.add(*make_cycle(2)) == 18
+    assert db.query(models.OptionData).count() == 18
+    assert writer.flush() == 0
+
+
+def test_failed_flush_keeps_snapshots_in_order(engine, db, monkeypatch):
+    writer = OptionDataWriter(engine, flush_cycles=10)
+    writer.add(*make_cycle(0))
+    writer.add(*make_cycle(1))
+
+    def fail(conn, rows):
+        # Another poll cycle is queued while the failing transaction is open
+        writer.add(*make_cycle(2))
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(writer, '_write_rows', fail)
+    with pytest.raises(RuntimeError):
+        writer.flush()
+    assert db.query(models.Snapshot).count() == 0
+    assert [snapshot['spot'] for snapshot, _ in writer._pending] == [25000.0, 25001.0, 25002.0]
+
+    monkeypatch.undo()
+    assert writer.flush() == 18
+    assert [s.spot for s in db.query(models.Snapshot).order_by(models.Snapshot.id)] == [25000.0, 25001.0, 25002.0]
+
+
+def test_multi_row_insert_path_batches_rows(engine, db, monkeypatch):
+    monkeypatch.setattr(bulk_writer, 'INSERT_BATCH_SIZE', 4)
+    writer = OptionDataWriter(engine)
+    snapshot, rows = make_cycle(0, rows=10)
+    with engine.begin() as conn:
+        snapshot_id = conn.execute(bulk_writer.insert(models.Snapshot).values(**snapshot)).inserted_primary_key[0]
+        rows = [{**row, 'snapshot_id': snapshot_id, 'timestamp': snapshot['taken_at']} for row in rows]
+        monkeypatch.setattr(conn.dialect, 'name', 'other')
+        writer._write_rows(conn, rows)
+    monkeypatch.undo()
+    assert db.query(models.OptionData).count() == 10
@@ -0,0 +1,102 @@
+import datetime
+import threading
+import time
+import pytest
+from candle_cache import CandleCache, next_candle_boundary
+from instrument_master import expiry_date
+
+IST = datetime.timezone(datetime.timedelta(hours=5, minutes=30))
+
+
+def ist(hour, minute, second=0, day=16):
+    return datetime.datetime(2026, 10, day, hour, minute, second, tzinfo=IST).timestamp()
+
+
+@pytest.mark.parametrize('unit, interval, now, boundary', [
+    ('minutes', 5, ist(9, 17), ist(9, 20)),
+    ('minutes', 15, ist(9, 15), ist(9, 30)),
+    ('minutes', 30, ist(15, 10), ist(15, 15)),
+    ('hours', 1, ist(9, 20), ist(10, 15)),
+    ('hours', 1, ist(10, 14, 59), ist(10, 15)),
+    ('hours', 1, ist(8, 0), ist(8, 15)),
+    ('days', 1, ist(23, 50), ist(0, 0, day=17)),
+    ('weeks', 1, ist(0, 10), ist(0, 0, day=17)),
+])
+def test_boundaries_are_in_exchange_time_from_the_session_open(unit, interval, now, boundary):
+    assert next_candle_boundary(unit, interval, now) == boundary
+
+
+def test_boundaries_do_not_depend_on_the_server_timezone(monkeypatch):
+    if not hasattr(time, 'tzset'):
+        pytest.skip("time.tzset is not available")
+    expected = next_candle_boundary('hours', 1, ist(9, 20))
+    for tz in ('UTC', 'America/New_York', 'Asia/Tokyo'):
+        monkeypatch.setenv('TZ', tz)
+        time.tzset()
+        assert next_candle_boundary('hours', 1, ist(9, 20)) == expected
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_expiry_date_is_the_exchange_date():
+    # The instrument master stamps expiries at 23:59:59 IST, which is 18:29:59 UTC
+    assert expiry_date(ist(23, 59, 59) * 1000) == datetime.date(2026, 10, 16)
+
+
+def test_entries_expire_at_the_next_boundary_plus_grace():
+    clock = [ist(9, 17)]
+    cache = CandleCache(grace=2, clock=lambda: clock[0])
+    calls = []
+
+    def fetch():
+        calls.append(clock[0])
+        return len(calls)
+
+    assert cache.get_or_fetch('K', 'minutes', 5, 'd', 'd', fetch) == 1
+    clock[0] = ist(9, 20, 1)
+    assert cache.get_or_fetch('K', 'minutes', 5, 'd', 'd', fetch) == 1
+    clock[0] = ist(9, 20, 2)
+    assert cache.get_or_fetch('K', 'minutes', 5, 'd', 'd', fetch) == 2
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 2
+
+
+def test_none_and_errors_are_not_cached():
+    cache = CandleCache()
+    assert cache.get_or_fetch('K', 'minutes', 5, 'd', 'd', lambda: None) is None
+    with pytest.raises(ValueError):
+        cache.get_or_fetch('K', 'minutes', 5, 'd', 'd', lambda: (_ for _ in ()).throw(ValueError('down')))
+    assert cache.get_or_fetch('K', 'minutes', 5, 'd', 'd', lambda: 'ok') == 'ok'
+    assert cache.stats()['size'] == 1
+
+
+def test_lru_eviction():
+    cache = CandleCache(maxsize=2)
+    for key in 'abc':
+        cache.get_or_fetch(key, 'days', 1, 'd', 'd', lambda: key)
+    assert cache.stats()['evictions'] == 1
+    assert cache.get_or_fetch('a', 'days', 1, 'd', 'd', lambda: 'refetched') == 'refetched'
+
+
+def test_concurrent_misses_are_coalesced_into_one_fetch():
+    cache = CandleCache()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return 'value'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch('K', 'minutes', 1, 'd', 'd', fetch)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while cache.stats()['coalesced'] < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ['value'] * 5
+    assert len(calls) == 1
@@ -0,0 +1,152 @@
+import datetime
+import os
+import threading
+import numpy as np
+import candle_store as candle_store_module
+from candle_store import CandleStore, to_array, to_candles
+from fakes import FakeHistoryV3Api, make_candles
+from resampler import resample
+
+KEY = 'NSE_INDEX|Nifty 50'
+TODAY = datetime.date(2026, 10, 16)
+YESTERDAY = TODAY - datetime.timedelta(days=1)
+
+
+def history(days=20, seed=5):
+    end = datetime.datetime.combine(YESTERDAY, datetime.time(15, 29))
+    return make_candles(count=days * 1440, unit_minutes=1, end=end, seed=seed)
+
+
+def closes_between(candles, first, last):
+    return [c[4] for c in reversed(candles) if first.isoformat() <= c[0][:10] <= last.isoformat()]
+
+
+def make_store(tmp_path, api, clock=None):
+    return CandleStore(root=str(tmp_path), api=api, today=lambda: TODAY, clock=clock or (lambda: 0.0))
+
+
+def test_to_array_round_trips_api_candles():
+    candles = make_candles(count=50, unit_minutes=1, seed=2)
+    assert to_candles(to_array(candles)) == candles
+
+
+def test_read_matches_the_api_and_is_served_from_disk_afterwards(tmp_path):
+    candles = history()
+    api = FakeHistoryV3Api(latency=0.0, candles=candles)
+    store = make_store(tmp_path, api)
+    first = YESTERDAY - datetime.timedelta(days=5)
+
+    assert store.read(KEY, 'minutes', 1, first, YESTERDAY)['close'].tolist() == closes_between(candles, first, YESTERDAY)
+    assert api.calls == 1
+    assert store.read(KEY, 'minutes', 1, first.isoformat(), YESTERDAY.isoformat())['close'].tolist() == \
+        closes_between(candles, first, YESTERDAY)
+    assert api.calls == 1
+
+
+def test_only_missing_days_are_fetched(tmp_path):
+    candles = history()
+    api = FakeHistoryV3Api(latency=0.0, candles=candles)
+    store = make_store(tmp_path, api)
+    store.read(KEY, 'minutes', 1, YESTERDAY - datetime.timedelta(days=5), YESTERDAY)
+
+    first = YESTERDAY - datetime.timedelta(days=10)
+    closes = store.read(KEY, 'minutes', 1, first, YESTERDAY)['close']
+    assert closes.tolist() == closes_between(candles, first, YESTERDAY)
+    # Only the five older days went upstream
+    assert api.calls == 2
+    assert store.upstream_calls == 2
+
+
+def test_long_ranges_are_split_to_the_api_limit(tmp_path):
+    api = FakeHistoryV3Api(latency=0.0, candles=history(days=40))
+    store = make_store(tmp_path, api)
+    store.read(KEY, 'minutes', 1, YESTERDAY - datetime.timedelta(days=39), YESTERDAY)
+    max_days = candle_store_module.MAX_FETCH_DAYS.get('minutes', 28)
+    assert api.calls == -(-40 // max_days)
+
+
+def test_empty_reply_is_retried_once_then_stored(tmp_path):
+    clock = [1000.0]
+    api = FakeHistoryV3Api(latency=0.0, candles=[])
+    store = make_store(tmp_path, api, clock=lambda: clock[0])
+    first = YESTERDAY - datetime.timedelta(days=2)
+    series_dir = store._series_dir(KEY, 'minutes', 1)
+
+    assert len(store.read(KEY, 'minutes', 1, first, YESTERDAY)) == 0
+    assert not os.path.exists(store._day_path(series_dir, YESTERDAY))
+    # Within the retry window the empty days are not fetched again
+    clock[0] += candle_store_module.EMPTY_RETRY_SECONDS - 1
+    store.read(KEY, 'minutes', 1, first, YESTERDAY)
+    assert api.calls == 1
+
+    clock[0] += 2
+    store.read(KEY, 'minutes', 1, first, YESTERDAY)
+    assert api.calls == 2
+    assert os.path.exists(store._day_path(series_dir, YESTERDAY))
+    clock[0] += candle_store_module.EMPTY_RETRY_SECONDS * 10
+    store.read(KEY, 'minutes', 1, first, YESTERDAY)
+    assert api.calls == 2
+
+
+def test_empty_reply_followed_by_candles_is_stored(tmp_path):
+    clock = [1000.0]
+    candles = history(days=3)
+    api = FakeHistoryV3Api(latency=0.0, candles=[])
+    store = make_store(tmp_path, api, clock=lambda: clock[0])
+    first = YESTERDAY - datetime.timedelta(days=2)
+    store.read(KEY, 'minutes', 1, first, YESTERDAY)
+
+    api.candles = candles
+    clock[0] += candle_store_module.EMPTY_RETRY_SECONDS
+    assert store.read(KEY, 'minutes', 1, first, YESTERDAY)['close'].tolist() == closes_between(candles, first, YESTERDAY)
+    assert api.calls == 2
+
+
+def test_concurrent_reads_of_one_series_fetch_once(tmp_path):
+    candles = history(days=5)
+    api = FakeHistoryV3Api(latency=0.05, candles=candles)
+    store = make_store(tmp_path, api)
+    first = YESTERDAY - datetime.timedelta(days=4)
+    results = []
+
+    def read():
+        results.append(store.read(KEY, 'minutes', 1, first, YESTERDAY)['close'].tolist())
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert api.calls == 1
+    assert results == [closes_between(candles, first, YESTERDAY)] * 8
+
+
+def test_today_is_read_from_the_intraday_api(tmp_path):
+    today_end = datetime.datetime.combine(TODAY, datetime.time(11, 0))
+    past = history(days=2)
+    today = make_candles(count=106, unit_minutes=1, end=today_end, seed=6)
+    api = FakeHistoryV3Api(latency=0.0, candles=today + past)
+    store = make_store(tmp_path, api)
+
+    closes = store.read(KEY, 'minutes', 1, YESTERDAY, TODAY)['close'].tolist()
+    assert closes == closes_between(past, YESTERDAY, YESTERDAY) + [c[4] for c in reversed(today)]
+    calls = api.calls
+    store.read(KEY, 'minutes', 1, TODAY, TODAY)
+    # Today's candles come from the candle cache until the next candle can close
+    assert api.calls == calls
+
+
+def test_read_bars_matches_resampling_the_minute_series(tmp_path):
+    today_end = datetime.datetime.combine(TODAY, datetime.time(11, 0))
+    past = history(days=3)
+    today = make_candles(count=106, unit_minutes=1, end=today_end, seed=7)
+    api = FakeHistoryV3Api(latency=0.0, candles=today + past)
+    store = make_store(tmp_path, api)
+    first = YESTERDAY - datetime.timedelta(days=2)
+
+    bars = store.read_bars(KEY, 'minutes', 5, first, TODAY)
+    expected = np.concatenate((resample(to_array(past), 'minutes', 5), resample(to_array(today), 'minutes', 5)))
+    expected = expected[candle_store_module.exchange_day(expected['ts']) >= np.datetime64(first)]
+    assert np.array_equal(bars, expected)
+    latest = store.latest_day(KEY, 'minutes', 5, TODAY)
+    assert np.array_equal(latest, resample(to_array(today), 'minutes', 5))
@@ -0,0 +1,166 @@
+import datetime
+import random
+import numpy as np
+import pytest
+from chain_analytics import (BUILDUPS, PCR_BANDS, ChainAnalytics, OptionChain, analyze, band_labels, expiry_key,
+                             max_pain, quote_chain)
+
+SPOT = 25000.0
+IST = datetime.timezone(datetime.timedelta(hours=5, minutes=30))
+
+
+def expiry_ms(day, hour=15, minute=30):
+    return int(datetime.datetime.combine(day, datetime.time(hour, minute), IST).timestamp() * 1000)
+
+
+EXPIRIES = [expiry_ms(datetime.date(2026, 10, 20) + datetime.timedelta(days=7 * week)) for week in range(3)]
+
+
+def make_rows(rng, previous=None, strikes=60, skip=0.1):
+    rows = []
+    for expiry in EXPIRIES:
+        for i in range(strikes):
+            strike = SPOT - 50 * (strikes // 2) + 50 * i
+            for option_type in ('CE', 'PE'):
+                # Some strikes are listed on one side only
+                if rng.random() < skip:
+                    continue
+                old = (previous or {}).get((expiry, strike, option_type))
+                oi = float(rng.randint(0, 200000)) if old is None else max(0.0, old['oi'] + rng.randint(-3000, 3000))
+                ltp = round(rng.uniform(1, 800), 2) if old is None else \
+                    max(0.05, round(old['ltp'] + rng.choice([-1, 0, 1]) * rng.uniform(0, 5), 2))
+                rows.append({'expiry': expiry, 'strike_price': strike, 'option_type': option_type, 'ltp': ltp,
+                             'oi': oi, 'change_in_oi': 0 if old is None else oi - old['oi']})
+    return rows
+
+
+def reference(rows, previous_rows, spot):
+    # Plain Python over the rows, one contract at a time
+    strikes = sorted({r['strike_price'] for r in rows})
+    calls = {r['strike_price']: r['oi'] for r in rows if r['option_type'] == 'CE'}
+    puts = {r['strike_price']: r['oi'] for r in rows if r['option_type'] == 'PE'}
+    payout = {k: sum(calls.get(s, 0) * max(k - s, 0) + puts.get(s, 0) * max(s - k, 0) for s in strikes)
+              for k in strikes}
+    bands = {label: [0.0, 0.0] for label in band_labels()}
+    for r in rows:
+        distance = abs(r['strike_price'] / spot - 1)
+        label = next((lab for lab, edge in zip(band_labels(), PCR_BANDS) if distance <= edge), band_labels()[-1])
+        bands[label][r['option_type'] == 'PE'] += r['oi']
+    previous_ltp = {(r['strike_price'], r['option_type']): r['ltp'] for r in previous_rows}
+    buildup = {t: {name: 0 for name in BUILDUPS} for t in ('CE', 'PE')}
+    for r in rows:
+        old = previous_ltp.get((r['strike_price'], r['option_type']))
+        if old is None or r['ltp'] == old or r['change_in_oi'] == 0:
+            continue
+        up, oi_up = r['ltp'] > old, r['change_in_oi'] > 0
+        name = BUILDUPS[0] if up and oi_up else BUILDUPS[1] if oi_up else BUILDUPS[2] if up else BUILDUPS[3]
+        buildup[r['option_type']][name] += 1
+    support = [(s, puts[s]) for s in strikes if s <= spot and puts.get(s)]
+    resistance = [(s, calls[s]) for s in strikes if s >= spot and calls.get(s)]
+    return {
+        'max_pain': min(strikes, key=lambda k: payout[k]),
+        'pcr_by_band': {label: p / c if c > 0 else None for label, (c, p) in bands.items()},
+        'buildup': buildup,
+        'support': sum(s * oi for s, oi in support) / sum(oi for _, oi in support),
+        'resistance': sum(s * oi for s, oi in resistance) / sum(oi for _, oi in resistance),
+        'max_put_oi_strike': max(support, key=lambda level: level[1])[0],
+        'max_call_oi_strike': max(resistance, key=lambda level: level[1])[0],
+    }
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_update_matches_the_reference(seed):
+    rng = random.Random(seed)
+    first = make_rows(rng)
+    second = make_rows(rng, {(r['expiry'], r['strike_price'], r['option_type']): r for r in first})
+    analytics = ChainAnalytics()
+    analytics.update(first, SPOT)
+    result = analytics.update(second, SPOT)
+
+    assert list(result) == [expiry_key(expiry) for expiry in EXPIRIES]
+    for expiry in EXPIRIES:
+        rows = [r for r in second if r['expiry'] == expiry]
+        expected = reference(rows, [r for r in first if r['expiry'] == expiry], SPOT)
+        analysis = result[expiry_key(expiry)]
+        assert analysis['max_pain'] == expected['max_pain']
+        for label, pcr in expected['pcr_by_band'].items():
+            assert analysis['pcr_by_band'][label]['pcr'] == pytest.approx(pcr)
+        assert {t: {name: v['count'] for name, v in s.items()} for t, s in analysis['buildup'].items()} == \
+            expected['buildup']
+        for name in ('support', 'resistance', 'max_put_oi_strike', 'max_call_oi_strike'):
+            assert analysis['levels'][name] == pytest.approx(expected[name])
+
+
+def test_max_pain_matches_brute_force_on_random_chains():
+    rng = np.random.default_rng(3)
+    for _ in range(50):
+        strikes = np.unique(rng.choice(np.arange(20000, 30000, 50), size=rng.integers(1, 40)).astype(float))
+        calls, puts = rng.integers(0, 1000, len(strikes)) * 1.0, rng.integers(0, 1000, len(strikes)) * 1.0
+        chain = OptionChain(strikes, None, calls, None, None, puts, None)
+        payout = [sum(c * max(k - s, 0) + p * max(s - k, 0) for s, c, p in zip(strikes, calls, puts)) for k in strikes]
+        assert max_pain(chain) == strikes[int(np.argmin(payout))]
+    assert max_pain(OptionChain.from_rows([])) is None
+
+
+def test_from_rows_aligns_sides_and_keeps_the_last_duplicate():
+    rows = [{'strike_price': 25050, 'option_type': 'PE', 'ltp': 10, 'oi': 5, 'change_in_oi': 1},
+            {'strike_price': 25000, 'option_type': 'CE', 'ltp': 20, 'oi': 7, 'change_in_oi': None},
+            {'strike_price': 25000, 'option_type': 'CE', 'ltp': 21, 'oi': 8, 'change_in_oi': 2}]
+    chain = OptionChain.from_rows(rows)
+    assert chain.strikes.tolist() == [25000.0, 25050.0]
+    assert chain.call_oi.tolist() == [8.0, 0.0] and chain.put_oi.tolist() == [0.0, 5.0]
+    assert chain.call_ltp[0] == 21 and np.isnan(chain.call_ltp[1]) and np.isnan(chain.put_ltp[0])
+
+
+def test_missing_change_in_oi_is_derived_from_the_previous_cycle():
+    analytics = ChainAnalytics()
+    expiry = EXPIRIES[0]
+    first = [{'strike_price': 25000, 'option_type': 'CE', 'ltp': 100, 'oi': 1000, 'expiry': expiry}]
+    second = [{'strike_price': 25000, 'option_type': 'CE', 'ltp': 110, 'oi': 1500, 'expiry': expiry},
+              {'strike_price': 25100, 'option_type': 'CE', 'ltp': 50, 'oi': 900, 'expiry': expiry}]
+    analytics.update(first, SPOT)
+    buildup = analytics.update(second, SPOT)[expiry_key(expiry)]['buildup']['CE']
+    assert buildup['long_buildup'] == {'count': 1, 'oi_change': 500.0}
+    # The new strike has no previous LTP, so it is not classified
+    assert sum(v['count'] for v in buildup.values()) == 1
+
+
+def test_expired_expiries_stop_being_tracked():
+    analytics = ChainAnalytics()
+    rows = make_rows(random.Random(1))
+    analytics.update(rows, SPOT)
+    result = analytics.update([r for r in rows if r['expiry'] != EXPIRIES[0]], SPOT)
+    assert expiry_key(EXPIRIES[0]) not in result
+    assert set(analytics._previous) == set(result)
+
+
+def test_rows_without_expiry_use_the_default():
+    rows = [{'strike_price': 25000, 'option_type': 'CE', 'ltp': 1, 'oi': 1}]
+    assert list(ChainAnalytics().update(rows, SPOT, expiry=EXPIRIES[1])) == [expiry_key(EXPIRIES[1])]
+    assert list(ChainAnalytics().update(rows, SPOT)) == ['unknown']
+
+
+def test_expiry_key_is_the_exchange_date():
+    # 00:30 IST is still the previous day in UTC
+    assert expiry_key(expiry_ms(datetime.date(2026, 10, 20), 0, 30)) == '2026-10-20'
+    assert expiry_key(expiry_ms(datetime.date(2026, 10, 20), 23, 59)) == '2026-10-20'
+
+
+def test_analyze_handles_an_empty_side():
+    chain = OptionChain.from_rows([{'strike_price': 25000, 'option_type': 'PE', 'ltp': 1, 'oi': 10,
+                                    'change_in_oi': 0}])
+    analysis = analyze(chain, SPOT)
+    assert analysis['pcr'] == 0 and analysis['levels']['resistance'] is None
+    assert analysis['pcr_by_band'][band_labels()[0]] == {'call_oi': 0.0, 'put_oi': 10.0, 'pcr': None}
+
+
+def test_quote_chain_skips_unquoted_contracts():
+    class Quotes:
+        def get_quotes(self, keys):
+            return {keys[0]: {'ltp': 5.0, 'oi': 100.0}}
+
+    contracts = [{'instrument_key': f"NSE_FO|{i}", 'expiry': EXPIRIES[0], 'strike_price': 25000.0,
+                  'instrument_type': 'CE'} for i in range(2)]
+    assert quote_chain(Quotes(), contracts) == [{'instrument_key': 'NSE_FO|0', 'expiry': EXPIRIES[0],
+                                                 'strike_price': 25000.0, 'option_type': 'CE', 'ltp': 5.0,
+                                                 'oi': 100.0}]
@@ -0,0 +1,137 @@
+import datetime
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+import data_fetcher
+from fakes import FakeHistoryV3Api, make_candles
+from fetch_engine import FetchEngine
+
+
+@pytest.fixture
+def engine():
+    engine = FetchEngine(max_workers=8, timeout=5)
+    yield engine
+    engine.shutdown()
+
+
+def options(count, option_type='CE'):
+    return [{'instrument_key': f'NSE_FO|{i}{option_type}', 'strike_price': 24000 + 50 * i} for i in range(count)]
+
+
+def test_map_returns_results_by_item_and_drops_duplicates(engine):
+    calls = []
+    results, failures = engine.map(lambda item: calls.append(item) or item * 2, [1, 2, 3, 2, 1])
+    assert results == {1: 2, 2: 4, 3: 6}
+    assert failures == {}
+    assert sorted(calls) == [1, 2, 3]
+
+
+def test_map_of_nothing(engine):
+    assert engine.map(lambda item: item, []) == ({}, {})
+
+
+def test_map_reports_exceptions_as_failures_and_keeps_partial_results(engine):
+    def func(item):
+        if item % 2:
+            raise ValueError(f"bad {item}")
+        return item
+
+    results, failures = engine.map(func, range(6))
+    assert results == {0: 0, 2: 2, 4: 4}
+    assert sorted(failures) == [1, 3, 5]
+    assert all(isinstance(e, ValueError) for e in failures.values())
+
+
+def test_map_reports_calls_past_the_deadline_as_timeouts(engine):
+    release = threading.Event()
+    try:
+        results, failures = engine.map(lambda item: release.wait(5) if item == 'slow' else item, ['fast', 'slow'],
+                                       timeout=0.1)
+    finally:
+        release.set()
+    assert results == {'fast': 'fast'}
+    assert isinstance(failures['slow'], TimeoutError)
+
+
+def test_map_runs_calls_concurrently(engine):
+    latency = 0.1
+    start = time.perf_counter()
+    results, failures = engine.map(lambda item: time.sleep(latency) or item, range(16))
+    elapsed = time.perf_counter() - start
+    assert len(results) == 16 and not failures
+    # Two waves of 8 workers, far below the 1.6 s a serial loop takes
+    assert elapsed < 16 * latency / 2
+
+
+def test_process_oi_data_concurrent_matches_serial(engine):
+    contracts = options(20)
+    api = FakeHistoryV3Api(latency=0, candles=make_candles(seed=2))
+    serial = {}
+    for option in contracts:
+        candles = data_fetcher.fetch_intraday_data(option['instrument_key'], api=api)['data']['candles']
+        serial[option['strike_price']] = (candles[-1][6], candles[0][6])
+    concurrent = data_fetcher.process_oi_data(contracts, api=api, engine=engine)
+    assert {strike: (d['initial_oi'], d['latest_oi']) for strike, d in concurrent.items()} == serial
+    assert api.calls == 2 * len(contracts)
+
+
+class LegApi(FakeHistoryV3Api):
+    """
+    Serves each leg its own OI, and fails for the instrument keys in `failing`.
+    """
+
+    def __init__(self, failing=()):
+        super().__init__(latency=0)
+        self.failing = set(failing)
+
+    def get_intra_day_candle_data(self, instrument_key, unit, interval, **kwargs):
+        self.calls += 1
+        if instrument_key in self.failing:
+            raise ConnectionError(f"upstream down for {instrument_key}")
+        base = 500 if instrument_key.endswith('CE') else 900
+        return SimpleNamespace(data=SimpleNamespace(candles=[
+            ['2026-10-16T15:25:00+05:30', 1, 1, 1, 1, 0, base + 10],
+            ['2026-10-16T09:15:00+05:30', 1, 1, 1, 1, 0, base],
+        ]))
+
+
+def test_process_oi_data_batch_keeps_legs_on_the_same_strike_apart(engine):
+    calls, puts = options(5, 'CE'), options(5, 'PE')
+    call_oi, put_oi = data_fetcher.process_oi_data_batch(calls, puts, api=LegApi(), engine=engine)
+    assert sorted(call_oi) == sorted(put_oi) == [option['strike_price'] for option in calls]
+    assert all(d['instrument_key'].endswith('CE') and d['latest_oi'] == 510 for d in call_oi.values())
+    assert all(d['instrument_key'].endswith('PE') and d['latest_oi'] == 910 for d in put_oi.values())
+
+
+def test_failed_fetches_fall_back_to_simulated_oi_and_are_retried_next_time(engine, candle_store):
+    contracts = options(4)
+    failing = contracts[0]['instrument_key']
+    api = LegApi(failing=[failing])
+    # The failing contract also falls back to the candle store, which this API serves nothing for
+    api.candles = []
+    oi_data = data_fetcher.process_oi_data(contracts, api=api, engine=engine)
+    strike = contracts[0]['strike_price']
+    assert oi_data[strike]['initial_oi'] == 1000
+    assert all(oi_data[o['strike_price']]['latest_oi'] == 510 for o in contracts[1:])
+
+    # Nothing about the failure is cached: the next cycle asks upstream again and gets the real value
+    api.failing.clear()
+    assert data_fetcher.process_oi_data(contracts, api=api, engine=engine)[strike]['latest_oi'] == 510
+
+
+def test_fetch_intraday_data_returns_no_candles_when_upstream_raises():
+    api = LegApi(failing=['NSE_FO|1CE'])
+    assert data_fetcher.fetch_intraday_data('NSE_FO|1CE', api=api) == {'data': {'candles': []}}
+
+
+def test_fetch_intraday_data_falls_back_to_the_latest_stored_day(candle_store):
+    yesterday_close = datetime.datetime.combine(datetime.date.today() - datetime.timedelta(days=1),
+                                                datetime.time(15, 29))
+    history = make_candles(count=3 * 1440, unit_minutes=1, end=yesterday_close, seed=4)
+    api = FakeHistoryV3Api(latency=0, candles=history)
+    api.get_intra_day_candle_data = lambda *args, **kwargs: SimpleNamespace(data=None)
+    candles = data_fetcher.fetch_intraday_data('NSE_FO|1CE', api=api)['data']['candles']
+    assert candles
+    assert {c[0][:10] for c in candles} == {yesterday_close.date().isoformat()}
+    assert candles[0][0] > candles[-1][0]
@@ -0,0 +1,125 @@
+import datetime
+import math
+from statistics import NormalDist
+import numpy as np
+import pytest
+import greeks
+from greeks import (GreeksEngine, bs_greeks, bs_price, implied_volatility, norm_cdf, settlement_epoch,
+                    years_to_expiry)
+
+SPOT = 25000.0
+NOW = datetime.datetime(2026, 10, 16, 10, 0, tzinfo=datetime.timezone.utc).timestamp()
+IST = datetime.timezone(datetime.timedelta(hours=5, minutes=30))
+
+
+def make_chain(seed=7, weeks=4, strikes=80):
+    # Weekly expiries x strikes around spot x CE/PE, priced off a volatility smile
+    rng = np.random.default_rng(seed)
+    strike = np.tile(np.repeat(SPOT + 50 * (np.arange(strikes) - strikes // 2), 2), weeks).astype(float)
+    is_call = np.tile([True, False], weeks * strikes)
+    years = np.repeat(np.arange(1, weeks + 1) * 7 / 365, 2 * strikes)
+    true_iv = 0.12 + 0.5 * (strike / SPOT - 1) ** 2 + rng.uniform(-0.005, 0.005, len(strike))
+    return strike, is_call, years, true_iv
+
+
+def test_solved_iv_reprices_rounded_market_prices():
+    strike, is_call, years, true_iv = make_chain()
+    prices = np.round(bs_price(SPOT, strike, years, true_iv, is_call), 2)
+    iv, _ = implied_volatility(prices, SPOT, strike, years, is_call)
+    solvable = np.isfinite(iv)
+    assert solvable.mean() > 0.9
+    assert np.max(np.abs(bs_price(SPOT, strike, years, iv, is_call) - prices)[solvable]) < 1e-4
+
+
+def test_solved_iv_recovers_the_pricing_volatility():
+    strike, is_call, years, true_iv = make_chain(seed=8)
+    prices = bs_price(SPOT, strike, years, true_iv, is_call)
+    iv, _ = implied_volatility(prices, SPOT, strike, years, is_call)
+    sensitive = bs_greeks(SPOT, strike, years, true_iv, is_call)['vega'] > 1
+    assert np.all(np.isfinite(iv[sensitive]))
+    assert np.max(np.abs(iv - true_iv)[sensitive]) < 1e-6
+
+
+def test_prices_outside_no_arbitrage_bounds_have_no_iv():
+    years = 30 / 365
+    intrinsic_call = SPOT - 24000 * math.exp(-greeks.RISK_FREE_RATE * years)
+    price = [intrinsic_call - 1, SPOT + 1, 0.0, -5.0, 100.0]
+    iv, _ = implied_volatility(price, SPOT, [24000, 24000, 25000, 25000, 25000],
+                               [years, years, years, years, np.nan], [True, True, False, True, True])
+    assert np.all(np.isnan(iv))
+
+
+def test_warm_start_converges_to_the_same_iv_in_fewer_iterations():
+    strike, is_call, years, true_iv = make_chain()
+    prices = bs_price(SPOT, strike, years, true_iv, is_call)
+    iv, _ = implied_volatility(prices, SPOT, strike, years, is_call)
+    moved_spot = SPOT * 1.001
+    moved = bs_price(moved_spot, strike, years, true_iv * 1.01, is_call)
+    cold, cold_iterations = implied_volatility(moved, moved_spot, strike, years, is_call)
+    warm, warm_iterations = implied_volatility(moved, moved_spot, strike, years, is_call, initial=iv)
+    assert warm_iterations < cold_iterations
+    both = np.isfinite(cold) & np.isfinite(warm)
+    assert np.array_equal(both, np.isfinite(cold))
+    assert np.allclose(bs_price(moved_spot, strike, years, warm, is_call)[both], moved[both], atol=1e-6)
+
+
+def test_norm_cdf_fallback_matches_the_exact_cdf(monkeypatch):
+    monkeypatch.setattr(greeks, '_ndtr', False)
+    x = np.linspace(-8, 8, 2001)
+    exact = np.array([NormalDist().cdf(v) for v in x])
+    assert np.max(np.abs(norm_cdf(x) - exact)) < 1.2e-7
+
+
+def test_greeks_match_finite_differences():
+    strike, is_call, years, sigma = make_chain(weeks=2, strikes=20)
+    g = bs_greeks(SPOT, strike, years, sigma, is_call)
+    h = 0.01
+    up, down = bs_price(SPOT + h, strike, years, sigma, is_call), bs_price(SPOT - h, strike, years, sigma, is_call)
+    price = bs_price(SPOT, strike, years, sigma, is_call)
+    assert np.allclose(g['delta'], (up - down) / (2 * h), atol=1e-5)
+    assert np.allclose(g['gamma'], (up - 2 * price + down) / h ** 2, atol=1e-4)
+    vega = (bs_price(SPOT, strike, years, sigma + 1e-5, is_call) - bs_price(SPOT, strike, years, sigma - 1e-5,
+                                                                            is_call)) / 2e-5
+    assert np.allclose(g['vega'], vega / 100, atol=1e-5)
+    day = 1 / 365
+    theta = (bs_price(SPOT, strike, years - day, sigma, is_call) - price)
+    assert np.allclose(g['theta'], theta, rtol=0.05, atol=0.05)
+
+
+def test_put_call_parity():
+    strike, _, years, sigma = make_chain(weeks=1, strikes=20)
+    call = bs_price(SPOT, strike, years, sigma, True)
+    put = bs_price(SPOT, strike, years, sigma, False)
+    parity = SPOT * np.exp(-greeks.DIVIDEND_YIELD * years) - strike * np.exp(-greeks.RISK_FREE_RATE * years)
+    assert np.allclose(call - put, parity)
+
+
+def test_settlement_is_the_close_on_the_expiry_date():
+    day = datetime.date(2026, 10, 20)
+    close = datetime.datetime.combine(day, datetime.time(15, 30), IST).timestamp()
+    master_expiry = datetime.datetime.combine(day, datetime.time(23, 59, 59), IST).timestamp() * 1000
+    early_expiry = datetime.datetime.combine(day, datetime.time(12, 0), IST).timestamp() * 1000
+    assert settlement_epoch(master_expiry) == close
+    assert settlement_epoch([master_expiry, early_expiry]).tolist() == [close, early_expiry / 1000]
+    years = years_to_expiry([master_expiry, master_expiry], close - 86400)
+    assert years[0] == pytest.approx(1 / 365)
+    assert np.isnan(years_to_expiry(master_expiry, close + 60))
+
+
+def test_engine_annotates_rows_and_warm_starts():
+    expiry = (NOW + 7 * 86400) * 1000
+    rows = [{'instrument_key': f"NSE_FO|{i}", 'strike_price': SPOT + 50 * (i // 2 - 5),
+             'option_type': 'CE' if i % 2 else 'PE'} for i in range(20)]
+    years = years_to_expiry(expiry, NOW)
+    for row in rows:
+        row['ltp'] = float(bs_price(SPOT, row['strike_price'], years, 0.15, row['option_type'] == 'CE'))
+    rows.append({'instrument_key': 'NSE_FO|bad', 'strike_price': SPOT, 'option_type': 'CE', 'ltp': 0.0})
+
+    engine = GreeksEngine()
+    engine.annotate(rows, SPOT, expiry=expiry, now=NOW)
+    for row in rows[:-1]:
+        assert row['iv'] == pytest.approx(0.15, abs=1e-6)
+        assert -1 <= row['delta'] <= 1 and row['gamma'] > 0 and row['vega'] > 0 and row['theta'] < 0
+    assert all(rows[-1][name] is None for name in greeks.GREEK_FIELDS)
+    assert set(engine._previous_iv) == {row['instrument_key'] for row in rows[:-1]}
+    assert engine.annotate([], SPOT) == []
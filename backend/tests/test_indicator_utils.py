@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+import indicator_utils
+from indicator_utils import (calculate_stochrsi, recursive_filter, rolling_max, rolling_min, rsi_series,
+                             stochrsi_series, wilder_smooth)
+
+
+def baseline_stochrsi(closes, period=14):
+    # The loop implementation indicator_utils replaced, returning the whole series
+    if len(closes) < period * 2:
+        return None
+    deltas = np.diff(closes)
+    seed = deltas[:period+1]
+    up = seed[seed >= 0].sum()/period
+    down = -seed[seed < 0].sum()/period
+    rs = up/down if down != 0 else 0
+    rsi = np.zeros_like(closes)
+    rsi[:period] = 100. - 100./(1.+rs)
+    for i in range(period, len(closes)):
+        delta = deltas[i-1]
+        if delta > 0:
+            upval = delta
+            downval = 0.
+        else:
+            upval = 0.
+            downval = -delta
+        up = (up*(period-1) + upval)/period
+        down = (down*(period-1) + downval)/period
+        rs = up/down if down != 0 else 0
+        rsi[i] = 100. - 100./(1.+rs)
+    stochrsi = np.zeros_like(rsi)
+    for i in range(period, len(rsi)):
+        min_rsi = np.min(rsi[i-period+1:i+1])
+        max_rsi = np.max(rsi[i-period+1:i+1])
+        stochrsi[i] = (rsi[i] - min_rsi) / (max_rsi - min_rsi) if max_rsi != min_rsi else 0
+    return stochrsi
+
+
+def random_closes(count, seed=0):
+    return 25000 + np.cumsum(np.random.default_rng(seed).normal(0, 10, count))
+
+
+@pytest.mark.parametrize('period', [1, 2, 3, 14, 50])
+def test_stochrsi_matches_baseline(period):
+    closes = random_closes(2000, seed=period)
+    np.testing.assert_allclose(stochrsi_series(closes, period), baseline_stochrsi(closes, period), atol=1e-9)
+
+
+@pytest.mark.parametrize('count', [28, 29, 45])
+def test_stochrsi_matches_baseline_near_minimum_length(count):
+    closes = random_closes(count, seed=count)
+    np.testing.assert_allclose(stochrsi_series(closes), baseline_stochrsi(closes), atol=1e-9)
+
+
+def test_stochrsi_needs_two_periods_of_closes():
+    assert stochrsi_series(random_closes(27)) is None
+    assert stochrsi_series(np.array([])) is None
+    assert rsi_series(random_closes(14), 14) is None
+
+
+def test_stochrsi_flat_and_monotonic_closes_match_baseline():
+    for closes in (np.full(60, 100.0), np.arange(60, dtype=float), np.arange(60, 0, -1, dtype=float)):
+        np.testing.assert_allclose(stochrsi_series(closes), baseline_stochrsi(closes), atol=1e-9)
+
+
+def test_stochrsi_nan_input_matches_baseline():
+    closes = random_closes(300, seed=7)
+    closes[100] = np.nan
+    with np.errstate(invalid='ignore'):
+        expected = baseline_stochrsi(closes)
+    np.testing.assert_allclose(stochrsi_series(closes), expected, atol=1e-9, equal_nan=True)
+
+
+def test_stochrsi_lfilter_and_numpy_paths_agree(monkeypatch):
+    pytest.importorskip('scipy')
+    closes = random_closes(5000, seed=3)
+    monkeypatch.setattr(indicator_utils, 'LFILTER_MIN_LENGTH', 1)
+    with_lfilter = stochrsi_series(closes)
+    monkeypatch.setattr(indicator_utils, 'LFILTER_MIN_LENGTH', 10 ** 9)
+    np.testing.assert_allclose(stochrsi_series(closes), with_lfilter, atol=1e-9)
+
+
+def test_calculate_stochrsi_returns_latest_value():
+    closes = random_closes(100, seed=11)
+    candles = {'data': {'candles': [[None, 0, 0, 0, close, 0, 0] for close in closes]}}
+    assert calculate_stochrsi(candles) == pytest.approx(baseline_stochrsi(closes)[-1], abs=1e-9)
+    candles['data']['candles'] = candles['data']['candles'][:10]
+    assert calculate_stochrsi(candles) is None
+
+
+def loop_filter(x, decay, initial):
+    y, prev = [], initial
+    for value in x:
+        prev = decay * prev + value
+        y.append(prev)
+    return np.array(y)
+
+
+@pytest.mark.parametrize('decay', [0.0, 1e-300, 1e-3, 0.05, 0.5, 13 / 14, 0.999])
+@pytest.mark.parametrize('count', [0, 1, 255, 256, 257, 1000])
+def test_recursive_filter_matches_loop(decay, count):
+    x = np.random.default_rng(count).normal(size=count)
+    np.testing.assert_allclose(recursive_filter(x, decay, 2.5), loop_filter(x, decay, 2.5), rtol=1e-9, atol=1e-9)
+
+
+def test_wilder_smooth_period_one_is_identity():
+    np.testing.assert_array_equal(wilder_smooth([1, 2, 3], 1, 10.0), [1.0, 2.0, 3.0])
+
+
+@pytest.mark.parametrize('window', [1, 2, 5, 14, 100])
+def test_rolling_extremes_match_naive_windows(window):
+    values = np.random.default_rng(window).normal(size=300)
+    expected_min = np.full(len(values), np.nan)
+    expected_max = np.full(len(values), np.nan)
+    for i in range(window - 1, len(values)):
+        expected_min[i] = values[i - window + 1:i + 1].min()
+        expected_max[i] = values[i - window + 1:i + 1].max()
+    np.testing.assert_array_equal(rolling_min(values, window), expected_min)
+    np.testing.assert_array_equal(rolling_max(values, window), expected_max)
+
+
+def test_rolling_extremes_shorter_than_window_are_nan():
+    assert np.isnan(rolling_min([1.0, 2.0], 3)).all()
+    assert np.isnan(rolling_max([1.0, 2.0], 3)).all()
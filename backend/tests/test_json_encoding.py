@@ -0,0 +1,83 @@
+import datetime
+import decimal
+import json
+import numpy as np
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+import json_encoding
+from candle_store import to_array, to_candles
+from fakes import make_candles
+from json_encoding import FastJSONResponse, columns, encode
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def encoder(request, monkeypatch):
+    """
+    Runs a test with each encoder.
+    """
+    if request.param == 'orjson':
+        pytest.importorskip('orjson')
+        monkeypatch.setattr(json_encoding, 'JSON_ENCODER', 'orjson')
+    monkeypatch.setattr(json_encoding, '_orjson', None if request.param == 'orjson' else False)
+    return request.param
+
+
+def contracts(count=50):
+    rng = np.random.default_rng(1)
+    return [{'strike_price': 20000.0 + 50 * (i // 2), 'option_type': 'CE' if i % 2 else 'PE',
+             'ltp': round(float(rng.uniform(1, 500)), 2), 'oi': float(rng.integers(1000, 100000)),
+             'change_in_oi': float(rng.integers(-2000, 2000)), 'symbol': 'NIFTY ₹'} for i in range(count)]
+
+
+def test_encoders_match_fastapi_for_plain_payloads(encoder):
+    start = datetime.datetime(2026, 10, 16, 9, 15)
+    payload = {'chain': contracts(), 'history': [{'timestamp': start + datetime.timedelta(minutes=15 * i),
+                                                  'day': start.date(), 'oi': i} for i in range(20)],
+               'pcr': None, 'ok': True}
+    assert json.loads(encode(payload)) == json.loads(JSONResponse(jsonable_encoder(payload)).body)
+
+
+def test_encoders_accept_numpy_values(encoder):
+    bars = to_array(make_candles(count=100, unit_minutes=1, seed=3))
+    payload = {**columns(bars), 'count': np.int64(len(bars)), 'mean': np.float64(bars['close'].mean()),
+               'matrix': np.arange(6, dtype=np.float32).reshape(2, 3), 'flag': np.bool_(True)}
+    decoded = json.loads(encode(payload))
+    assert decoded['close'] == bars['close'].tolist()
+    assert decoded['ts'] == bars['ts'].tolist()
+    assert decoded['count'] == 100 and decoded['mean'] == float(bars['close'].mean())
+    assert decoded['matrix'] == [[0, 1, 2], [3, 4, 5]] and decoded['flag'] is True
+
+
+def test_encoders_agree(monkeypatch):
+    pytest.importorskip('orjson')
+    bars = to_array(make_candles(count=100, unit_minutes=1, seed=4))
+    payload = {'candles': to_candles(bars), 'columns': columns(bars), 'rows': contracts(),
+               'at': datetime.datetime(2026, 10, 16, 9, 15), 'value': decimal.Decimal('1.25'), 1: 'int key'}
+    monkeypatch.setattr(json_encoding, 'JSON_ENCODER', 'orjson')
+    monkeypatch.setattr(json_encoding, '_orjson', None)
+    fast = encode(payload)
+    monkeypatch.setattr(json_encoding, '_orjson', False)
+    assert json.loads(fast) == json.loads(encode(payload))
+
+
+def test_compact_output_and_unserializable_values(encoder):
+    assert encode({'a': [1, 2.5, 'é']}) == '{"a":[1,2.5,"é"]}'.encode('utf-8')
+    with pytest.raises(TypeError):
+        encode({'a': object()})
+
+
+def test_fast_json_response_renders_with_encode():
+    payload = {'close': np.array([1.5, 2.5])}
+    assert FastJSONResponse(payload).body == encode(payload)
+
+
+def test_columns():
+    rows = contracts(3)
+    fields = ('strike_price', 'ltp')
+    assert columns(rows, fields) == {'strike_price': [r['strike_price'] for r in rows], 'ltp': [r['ltp'] for r in rows]}
+    assert list(columns(rows)) == list(rows[0])
+    assert columns([(1, 'a'), (2, 'b')], ('n', 's')) == {'n': [1, 2], 's': ['a', 'b']}
+    assert columns([]) == {}
+    bars = to_array(make_candles(count=5, seed=5))
+    assert np.array_equal(columns(bars, ['close'])['close'], bars['close'])
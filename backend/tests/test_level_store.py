@@ -0,0 +1,91 @@
+import datetime
+import os
+from candle_cache import get_candle_cache
+from candle_store import CandleStore
+from fakes import FakeHistoryV3Api, make_candles
+from find_support_resistance_niftyfifty_daily import find_pivots
+from level_store import LevelSeries, LevelStore
+
+DAY_BARS = 375
+
+
+def full_pivots(candles, oldest):
+    candles = sorted(candles, key=lambda c: c[0])
+    supports, resistances = find_pivots([c[0] for c in candles], [c[2] for c in candles], [c[3] for c in candles])
+    return [p for p in supports if p[0][:10] >= oldest], [p for p in resistances if p[0][:10] >= oldest]
+
+
+def test_incremental_merge_matches_full_recomputation():
+    history = make_candles(count=3000, unit_minutes=1, end=datetime.datetime(2026, 10, 16, 15, 29), seed=1)
+    series = LevelSeries()
+    # Newest-first chunks as the API returns them, each repeating the last (possibly forming) bar
+    chunks = [history[2000:], *[history[i:i + 101] for i in range(1900, -1, -100)]]
+    for chunk in chunks:
+        series.merge(chunk, '0000-00-00')
+    assert series.dates == sorted(c[0] for c in history)
+    supports, resistances = full_pivots(history, '0000-00-00')
+    assert [tuple(p) for p in series.supports] == supports
+    assert [tuple(p) for p in series.resistances] == resistances
+
+
+def test_merge_replaces_the_forming_bar_and_ignores_older_ones():
+    series = LevelSeries()
+    series.merge([['2026-10-16T09:16:00', 0, 10.0, 5.0], ['2026-10-16T09:15:00', 0, 11.0, 4.0]], '2026-10-01')
+    added = series.merge([['2026-10-16T09:16:00', 0, 12.0, 3.0], ['2026-10-16T09:15:00', 0, 99.0, 1.0]], '2026-10-01')
+    assert added == 1
+    assert series.highs == [11.0, 12.0] and series.lows == [4.0, 3.0]
+
+
+def test_trim_drops_old_bars_and_pivots():
+    series = LevelSeries(dates=['2026-09-01T09:15', '2026-10-01T09:15'], highs=[1.0, 2.0], lows=[0.0, 1.0],
+                         supports=[['2026-09-01T09:15', 0.0]], resistances=[['2026-10-01T09:15', 2.0]])
+    series.trim('2026-09-15')
+    assert series.dates == ['2026-10-01T09:15'] and series.supports == []
+    assert series.resistances == [['2026-10-01T09:15', 2.0]]
+
+
+def bar_time(candle):
+    return datetime.datetime.fromisoformat(candle[0][:19]).timestamp() + 60
+
+
+def test_store_refreshes_incrementally_and_restarts_warm(tmp_path):
+    close_time = datetime.datetime.combine(datetime.date.today(), datetime.time(15, 29))
+    history = make_candles(count=5 * DAY_BARS, unit_minutes=1, end=close_time, seed=3)
+    api = FakeHistoryV3Api(latency=0.0, candles=history[DAY_BARS:])
+    clock = [bar_time(history[DAY_BARS])]
+    candle_store = CandleStore(root=str(tmp_path / 'candles'), api=api,
+                               today=lambda: datetime.date.fromtimestamp(clock[0]))
+    path = str(tmp_path / 'levels.json')
+    store = LevelStore(candle_store=candle_store, path=path, clock=lambda: clock[0])
+    store.get(1, 'minutes')
+
+    for i in range(60, -1, -1):
+        api.candles = history[i:]
+        clock[0] = bar_time(history[i])
+        get_candle_cache().invalidate()
+        series = store.get(1, 'minutes')
+
+    supports, resistances = full_pivots(history[i:], series.dates[0][:10])
+    assert [tuple(p) for p in series.supports] == supports
+    assert [tuple(p) for p in series.resistances] == resistances
+
+    store.save()
+    assert os.path.exists(path)
+    warm = LevelStore(candle_store=candle_store, path=path, clock=lambda: clock[0])
+    assert warm._series[(1, 'minutes')].to_dict() == store._series[(1, 'minutes')].to_dict()
+
+
+def test_no_refresh_before_the_next_candle_can_close(tmp_path):
+    close_time = datetime.datetime.combine(datetime.date.today(), datetime.time(15, 29))
+    history = make_candles(count=DAY_BARS, unit_minutes=1, end=close_time, seed=4)
+    api = FakeHistoryV3Api(latency=0.0, candles=history)
+    clock = [bar_time(history[0])]
+    candle_store = CandleStore(root=str(tmp_path / 'candles'), api=api,
+                               today=lambda: datetime.date.fromtimestamp(clock[0]))
+    store = LevelStore(candle_store=candle_store, path=None, clock=lambda: clock[0])
+    first = store.get(5, 'minutes')
+    calls = api.calls
+    get_candle_cache().invalidate()
+    clock[0] += 10
+    assert store.get(5, 'minutes').dates == first.dates
+    assert api.calls == calls
@@ -0,0 +1,90 @@
+import asyncio
+import datetime
+import threading
+import time
+from fakes import FakeHistoryV3Api, make_candles
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_run_blocking_uses_the_upstream_executor(app_module):
+    name = run(app_module.run_blocking(lambda: threading.current_thread().name))
+    assert name.startswith('upstream')
+
+
+def test_slow_upstream_calls_do_not_block_other_requests(app_module, client, monkeypatch):
+    release = threading.Event()
+
+    def slow_candles(instrument_key):
+        release.wait(5)
+        return {'data': {'candles': make_candles(count=3, seed=1)}}
+
+    monkeypatch.setattr(app_module, 'fetch_intraday_data_without_filter', slow_candles)
+
+    async def scenario():
+        async with client:
+            slow = asyncio.create_task(client.get('/api/nifty_curr'))
+            await asyncio.sleep(0.05)
+            start = time.perf_counter()
+            fast = await client.get('/')
+            fast_seconds = time.perf_counter() - start
+            assert not slow.done()
+            release.set()
+            return fast, fast_seconds, await slow
+
+    fast, fast_seconds, slow = run(scenario())
+    assert fast.status_code == 200 and fast_seconds < 1
+    assert slow.status_code == 200 and set(slow.json()) == {'ltp', 'change', 'change_percent'}
+
+
+def test_candles_endpoint_reads_the_candle_store(app_module, client, candle_store, monkeypatch):
+    yesterday = datetime.date.today() - datetime.timedelta(days=1)
+    end = datetime.datetime.combine(yesterday, datetime.time(15, 29))
+    candle_store.api = FakeHistoryV3Api(latency=0, candles=make_candles(count=375, unit_minutes=1, end=end, seed=2))
+    monkeypatch.setattr(app_module, 'get_candle_store', lambda: candle_store)
+
+    async def scenario():
+        async with client:
+            rows = await client.get('/api/v1/candles', params={'unit': 'minutes', 'interval': 15,
+                                                               'start': yesterday, 'end': yesterday})
+            cols = await client.get('/api/v1/candles', params={'unit': 'minutes', 'interval': 15, 'start': yesterday,
+                                                               'end': yesterday, 'shape': 'columns'})
+            bad = await client.get('/api/v1/candles', params={'unit': 'minutes', 'interval': 15,
+                                                              'start': yesterday, 'end': yesterday - datetime.timedelta(days=1)})
+            return rows, cols, bad
+
+    rows, cols, bad = run(scenario())
+    candles = rows.json()['candles']
+    assert len(candles) == 25 and candles[0][0] > candles[-1][0]
+    assert cols.json()['candles']['close'] == [c[4] for c in reversed(candles)]
+    assert bad.status_code == 400
+
+
+def test_option_data_is_read_from_the_database_before_the_first_cycle(app_module, client):
+    from bulk_writer import OptionDataWriter
+    snapshot = {'taken_at': datetime.datetime(2024, 1, 1, 9, 15), 'spot': 25000.0, 'expiry': 0}
+    rows = [{'instrument_key': f"NSE_FO|{i}", 'strike_price': 25000.0 + 50 * (i // 2),
+             'option_type': 'CE' if i % 2 else 'PE', 'ltp': 10.0, 'oi': 100.0 * (i + 1), 'change_in_oi': 0.0}
+            for i in range(4)]
+    OptionDataWriter(app_module.database.engine).add(snapshot, rows)
+
+    async def scenario():
+        async with client:
+            return await client.get('/api/v1/option-data'), await client.get('/api/v1/option-data?shape=columns')
+
+    by_rows, by_columns = run(scenario())
+    body = by_rows.json()
+    assert len(body['contracts']) == 4
+    # PE oi 100 + 300, CE oi 200 + 400
+    assert body['pcr'] == 400 / 600
+    assert by_columns.json()['contracts']['oi'] == [c['oi'] for c in body['contracts']]
+
+
+def test_option_data_without_rows(app_module, client):
+    async def scenario():
+        async with client:
+            return await client.get('/api/v1/option-data')
+
+    assert run(scenario()).json() == {"error": "No data available yet."}
@@ -0,0 +1,82 @@
+import datetime
+import pytest
+from sqlalchemy import event, insert
+import crud
+import models
+from bulk_writer import OptionDataWriter
+from fakes import FakeQuoteSource
+from ingestion import ingest_option_chain
+from instrument_master import get_instrument_master
+
+
+def write_history(engine, keys, cycles):
+    start = datetime.datetime(2024, 1, 1, 9, 15)
+    with engine.begin() as conn:
+        for cycle in range(cycles):
+            taken_at = start + datetime.timedelta(minutes=5 * cycle)
+            snapshot_id = conn.execute(insert(models.Snapshot).values(taken_at=taken_at, spot=25000.0)).inserted_primary_key[0]
+            conn.execute(insert(models.OptionData), [
+                {'snapshot_id': snapshot_id, 'timestamp': taken_at, 'instrument_key': key, 'strike_price': 0.0,
+                 'option_type': 'CE', 'ltp': 0.0, 'oi': float(cycle * 100 + i), 'change_in_oi': 0.0}
+                for i, key in enumerate(keys)
+            ])
+
+
+@pytest.fixture
+def statements(engine):
+    executed = []
+    listener = lambda conn, cursor, statement, *args: executed.append(statement)  # noqa: E731
+    event.listen(engine, 'before_cursor_execute', listener)
+    yield executed
+    event.remove(engine, 'before_cursor_execute', listener)
+
+
+def test_bulk_latest_oi_matches_per_key_queries(engine, db):
+    keys = [f"NSE_FO|{i}" for i in range(20)]
+    write_history(engine, keys, cycles=5)
+    bulk = crud.get_latest_oi_bulk(db, keys + ['NSE_FO|unknown'])
+    assert bulk == {key: crud.get_previous_oi(db, key) for key in keys}
+    assert crud.get_latest_oi_bulk(db) == bulk
+
+
+def test_previous_oi_bulk_queries_only_unseen_keys_once(engine, db, statements):
+    keys = [f"NSE_FO|{i}" for i in range(10)]
+    write_history(engine, keys, cycles=3)
+    statements.clear()
+
+    previous = crud.get_previous_oi_bulk(db, keys + ['NSE_FO|new'])
+    assert previous == {**{key: 200.0 + i for i, key in enumerate(keys)}, 'NSE_FO|new': None}
+    assert len(statements) == 1
+
+    # Steady state: every key, including the one known to have no rows, comes from the cache
+    statements.clear()
+    assert crud.get_previous_oi_bulk(db, keys + ['NSE_FO|new']) == previous
+    assert statements == []
+
+
+def test_warmed_cache_and_recorded_writes_need_no_queries(engine, db, statements):
+    keys = [f"NSE_FO|{i}" for i in range(10)]
+    write_history(engine, keys, cycles=2)
+    assert crud.warm_last_oi_cache(db) == len(keys)
+    crud.record_latest_oi([(keys[0], 5.0), ('NSE_FO|new', 7.0)])
+    statements.clear()
+    previous = crud.get_previous_oi_bulk(db, [keys[0], keys[1], 'NSE_FO|new'])
+    assert previous == {keys[0]: 5.0, keys[1]: 101.0, 'NSE_FO|new': 7.0}
+    assert statements == []
+
+
+def test_ingestion_change_in_oi_uses_the_previous_cycle(engine, db):
+    master = get_instrument_master()
+    expiry = max(master.expiries('NIFTY'), key=lambda e: len(master.strikes('NIFTY', e)))
+    source = FakeQuoteSource(seed=3)
+    writer = OptionDataWriter(engine)
+
+    first = ingest_option_chain(db, source, expiry, strikes_each_side=3, writer=writer)
+    assert first['rows'] == 14
+    assert all(row['change_in_oi'] == 0 for row in first['chain'])
+    second = ingest_option_chain(db, source, expiry, strikes_each_side=3, writer=writer)
+    previous = {row['instrument_key']: row['oi'] for row in first['chain']}
+    for row in second['chain']:
+        if row['instrument_key'] in previous:
+            assert row['change_in_oi'] == row['oi'] - previous[row['instrument_key']]
+    assert db.query(models.OptionData).count() == first['rows'] + second['rows']
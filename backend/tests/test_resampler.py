@@ -0,0 +1,83 @@
+import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from candle_store import CANDLE_DTYPE, EXCHANGE_UTC_OFFSET, to_array
+from fakes import make_candles
+from resampler import SESSION_OPEN, BarResampler, bucket_starts, resample
+
+RULES = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum', 'oi': 'last'}
+
+
+@pytest.fixture(scope='module')
+def sessions():
+    days = pd.bdate_range(datetime.date(2026, 6, 1), periods=10)
+    candles = []
+    for i, day in enumerate(days):
+        end = datetime.datetime.combine(day.date(), datetime.time(15, 29))
+        candles += make_candles(count=375, unit_minutes=1, end=end, seed=i)
+    return days, to_array(candles)
+
+
+@pytest.mark.parametrize('unit, interval, rule', [
+    ('minutes', 5, '5min'), ('minutes', 15, '15min'), ('minutes', 30, '30min'), ('hours', 1, '1h'), ('days', 1, '1D'),
+])
+def test_resample_matches_pandas(sessions, unit, interval, rule):
+    days, minutes = sessions
+    frame = pd.DataFrame({name: minutes[name] for name in CANDLE_DTYPE.names[1:]},
+                         index=pd.to_datetime(minutes['ts'], unit='s', utc=True).tz_convert('Asia/Kolkata'))
+    origin = 'start_day' if unit == 'days' else \
+        pd.Timestamp(days[0].date()).tz_localize('Asia/Kolkata') + pd.Timedelta(seconds=SESSION_OPEN)
+    expected = frame.resample(rule, origin=origin).agg(RULES).dropna()
+
+    bars = resample(minutes, unit, interval)
+    assert np.array_equal(bars['ts'], expected.index.as_unit('s').asi8)
+    for name in ('open', 'high', 'low', 'close'):
+        assert np.allclose(bars[name], expected[name])
+    assert np.array_equal(bars['volume'], expected['volume'])
+    assert np.array_equal(bars['oi'], expected['oi'])
+
+
+def test_buckets_restart_at_each_session_open(sessions):
+    # Unlike pandas' single origin, buckets that do not divide a day still start at 09:15 every session
+    _, minutes = sessions
+    bars = resample(minutes, 'minutes', 75)
+    local = (bars['ts'] + int(EXCHANGE_UTC_OFFSET.total_seconds())) % 86400
+    assert sorted(set(local.tolist())) == [SESSION_OPEN + 75 * 60 * i for i in range(5)]
+
+
+def test_resample_empty():
+    assert len(resample(np.empty(0, dtype=CANDLE_DTYPE), 'minutes', 5)) == 0
+
+
+def test_unsupported_timeframes_raise():
+    with pytest.raises(ValueError):
+        bucket_starts([0], 'days', 2)
+    with pytest.raises(ValueError):
+        BarResampler('weeks', 1)
+
+
+def test_incremental_matches_batch_bar_by_bar(sessions):
+    _, minutes = sessions
+    session = minutes[-375:]
+    resampler = BarResampler('minutes', 5)
+    for i in range(len(session)):
+        resampler.update(session[i:i + 1])
+        assert np.array_equal(resampler.bars(), resample(session[:i + 1], 'minutes', 5))
+    assert np.array_equal(resampler.open_bar, resample(session[-5:], 'minutes', 5)[0])
+
+
+def test_incremental_replaces_the_forming_bar_and_ignores_older_ones(sessions):
+    _, minutes = sessions
+    session = minutes[-375:].copy()
+    resampler = BarResampler('hours', 1)
+    assert resampler.open_bar is None
+    # Overlapping batches, as a poll re-reading the whole session returns
+    resampler.update(session[:100])
+    forming = session[99:200].copy()
+    assert resampler.update(forming) == 101
+    revised = session.copy()
+    revised['close'][199] += 50.0
+    resampler.update(revised[150:])
+    assert resampler.update(session[:10]) == 0
+    assert np.array_equal(resampler.bars(), resample(revised, 'hours', 1))
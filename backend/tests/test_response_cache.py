@@ -0,0 +1,109 @@
+import asyncio
+import gzip
+import json
+import pytest
+from starlette.requests import Request
+import response_cache
+from json_encoding import FastJSONResponse
+from response_cache import CachedResponse, ResponseCache, accepted_encodings
+
+
+def request(headers):
+    return Request({'type': 'http', 'headers': [(k.lower().encode(), v.encode()) for k, v in headers.items()]})
+
+
+def payload(contracts):
+    rows = [{'strike_price': 20000.0 + 50 * (i // 2), 'option_type': 'CE' if i % 2 else 'PE', 'oi': float(i)}
+            for i in range(contracts)]
+    return {'contracts': rows, 'pcr': 1.0}
+
+
+def test_body_is_what_fastjsonresponse_renders():
+    data = payload(200)
+    assert CachedResponse(data).body == FastJSONResponse(data).body
+
+
+@pytest.mark.parametrize('header, expected', [
+    (None, set()),
+    ('gzip', {'gzip'}),
+    ('gzip, br;q=0.5', {'gzip', 'br'}),
+    ('GZIP;q=0, deflate', {'deflate'}),
+    ('br;q=0.0,gzip;q=1', {'gzip'}),
+])
+def test_accepted_encodings(header, expected):
+    assert accepted_encodings(header) == expected
+
+
+def test_large_bodies_are_served_precompressed_with_their_own_etag():
+    entry = CachedResponse(payload(200))
+    assert 'gzip' in entry.variants
+    response = entry.respond(request({'accept-encoding': 'gzip'}))
+    assert response.headers['content-encoding'] == 'gzip'
+    assert response.headers['etag'] == entry.variant_etag('gzip') != entry.etag
+    assert response.headers['vary'] == 'Accept-Encoding'
+    assert json.loads(gzip.decompress(response.body)) == payload(200)
+
+    identity = entry.respond(request({}))
+    assert 'content-encoding' not in identity.headers
+    assert identity.headers['etag'] == entry.etag and identity.body == entry.body
+
+
+def test_small_bodies_are_not_compressed():
+    entry = CachedResponse(payload(2))
+    assert entry.variants == {}
+    assert 'content-encoding' not in entry.respond(request({'accept-encoding': 'gzip'})).headers
+
+
+@pytest.mark.parametrize('if_none_match', ['{etag}', '{gzip_etag}', 'W/{gzip_etag}', '"other", {etag}', '*'])
+def test_matching_if_none_match_gets_304(if_none_match):
+    entry = CachedResponse(payload(200))
+    header = if_none_match.format(etag=entry.etag, gzip_etag=entry.variant_etag('gzip'))
+    response = entry.respond(request({'accept-encoding': 'gzip', 'if-none-match': header}))
+    assert response.status_code == 304
+    assert response.body == b''
+    assert response.headers['etag'] == entry.variant_etag('gzip')
+
+
+def test_stale_etag_gets_the_new_body():
+    cache = ResponseCache()
+    old = cache.put('option-data', payload(10), 1)
+    new = cache.put('option-data', payload(12), 2)
+    assert cache.get('option-data') is new and new.etag != old.etag
+    assert new.respond(request({'if-none-match': old.etag})).status_code == 200
+
+
+def test_same_payload_same_etag():
+    assert CachedResponse(payload(50)).etag == CachedResponse(payload(50)).etag
+
+
+def test_invalidate():
+    cache = ResponseCache()
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.invalidate('a')
+    assert cache.get('a') is None and cache.get('b') is not None
+    cache.invalidate()
+    assert cache.get('b') is None
+
+
+def test_option_data_endpoint_revalidates_with_304(app_module, client):
+    rows = [{'strike_price': 25000.0 + 50 * (i // 2), 'option_type': 'CE' if i % 2 else 'PE', 'ltp': 10.0,
+             'oi': 100.0 + i, 'change_in_oi': 0.0} for i in range(40)]
+    app_module.cache_option_data(rows, version=1)
+
+    async def scenario():
+        async with client:
+            first = await client.get('/api/v1/option-data', headers={'accept-encoding': 'gzip'})
+            again = await client.get('/api/v1/option-data', headers={'accept-encoding': 'gzip',
+                                                                      'if-none-match': first.headers['etag']})
+            app_module.cache_option_data(rows[:-2], version=2)
+            changed = await client.get('/api/v1/option-data', headers={'accept-encoding': 'gzip',
+                                                                        'if-none-match': first.headers['etag']})
+            return first, again, changed
+
+    first, again, changed = asyncio.run(scenario())
+    assert first.status_code == 200 and first.headers['content-encoding'] == 'gzip'
+    assert len(first.json()['contracts']) == 40
+    assert again.status_code == 304
+    assert changed.status_code == 200 and len(changed.json()['contracts']) == 38
+    assert response_cache.get_response_cache().get('option-data:columns').version == 2
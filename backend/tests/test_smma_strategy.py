@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+from smma_strategy import backtest_kernel, calculate_smma, run_backtest, smma_array
+
+
+def legacy_smma(data, period):
+    # The baseline calculate_smma
+    smma = pd.Series(index=data.index, dtype=float)
+    smma.iloc[period - 1] = data.iloc[:period].mean()
+    for i in range(period, len(data)):
+        smma.iloc[i] = (smma.iloc[i - 1] * (period - 1) + data.iloc[i]) / period
+    return smma
+
+
+def legacy_backtest(df, fast_period=5, slow_period=13):
+    # The baseline backtest_smma_cross, reduced to its results
+    df = df.copy()
+    df['SMMA_fast'] = legacy_smma(df['Close'], fast_period)
+    df['SMMA_slow'] = legacy_smma(df['Close'], slow_period)
+    df['Signal'] = 0
+    df.loc[df['SMMA_fast'] > df['SMMA_slow'], 'Signal'] = 1
+    df.loc[df['SMMA_fast'] <= df['SMMA_slow'], 'Signal'] = -1
+    df['Position'] = df['Signal'].diff()
+    df['Returns'] = df['Close'].pct_change()
+    df['Strategy_Returns'] = df['Signal'].shift(1) * df['Returns']
+    df['Cumulative_Strategy'] = (1 + df['Strategy_Returns']).cumprod()
+    trades = []
+    entry_price = None
+    for idx, row in df.iterrows():
+        if row['Position'] == 2:
+            entry_price = row['Close']
+        elif row['Position'] == -2 and entry_price:
+            trades.append((row['Close'] - entry_price) / entry_price)
+            entry_price = None
+    strategy_std = df['Strategy_Returns'].std()
+    cumulative = df['Cumulative_Strategy']
+    drawdown = (cumulative - cumulative.expanding().max()) / cumulative.expanding().max()
+    metrics = {
+        'total_return': (cumulative.iloc[-1] - 1) * 100,
+        'num_trades': int((df['Position'] == 2).sum()),
+        'win_rate': sum(1 for t in trades if t > 0) / len(trades) * 100 if trades else 0,
+        'sharpe': df['Strategy_Returns'].mean() / strategy_std * np.sqrt(252) if strategy_std > 0 else 0,
+        'max_drawdown': drawdown.min() * 100,
+    }
+    return df, trades, metrics
+
+
+def random_close(count, seed=0):
+    return 20000 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0, 0.005, count)))
+
+
+@pytest.mark.parametrize('period', [1, 2, 5, 13, 50])
+def test_smma_matches_baseline(period):
+    close = pd.Series(random_close(1000, seed=period))
+    np.testing.assert_allclose(calculate_smma(close, period), legacy_smma(close, period), rtol=1e-10)
+
+
+def test_smma_with_nan_input_matches_baseline():
+    close = pd.Series(random_close(200, seed=1))
+    close.iloc[50] = np.nan
+    np.testing.assert_allclose(smma_array(close, 5), legacy_smma(close, 5), rtol=1e-10, equal_nan=True)
+
+
+def test_smma_shorter_than_period_is_all_nan():
+    assert np.isnan(smma_array([1.0, 2.0], 3)).all()
+    assert len(smma_array([], 3)) == 0
+    np.testing.assert_allclose(smma_array([1.0, 2.0, 3.0], 3), [np.nan, np.nan, 2.0], equal_nan=True)
+
+
+@pytest.mark.parametrize('fast, slow', [(5, 13), (1, 5), (3, 30), (10, 11)])
+def test_backtest_kernel_matches_baseline(fast, slow):
+    close = random_close(3000, seed=fast * 100 + slow)
+    df = pd.DataFrame({'Close': close})
+    expected_df, expected_trades, expected = legacy_backtest(df, fast, slow)
+    result = backtest_kernel(close, fast, slow)
+    for name, value in expected.items():
+        assert result['metrics'][name] == pytest.approx(value, rel=1e-9, abs=1e-12), name
+    np.testing.assert_allclose(result['trade_returns'], expected_trades, rtol=1e-12)
+    np.testing.assert_array_equal(result['signal'], expected_df['Signal'])
+    np.testing.assert_allclose(result['cumulative_strategy'], expected_df['Cumulative_Strategy'], equal_nan=True)
+
+
+def test_run_backtest_equity_curve_and_trades():
+    index = pd.date_range('2024-01-01', periods=500, freq='D')
+    df = pd.DataFrame({'Close': random_close(500, seed=9)}, index=index)
+    expected_df, expected_trades, _ = legacy_backtest(df)
+    result = run_backtest(df, initial_capital=1000)
+    np.testing.assert_allclose(result.equity_curve['Portfolio_Value'], 1000 * expected_df['Cumulative_Strategy'],
+                               equal_nan=True)
+    np.testing.assert_allclose(result.trades['return'], expected_trades)
+    assert (result.trades['exit_time'] > result.trades['entry_time']).all()
+    assert result.trades['entry_time'].isin(index).all()
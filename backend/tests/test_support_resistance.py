@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from find_support_resistance_niftyfifty_daily import (check_trade_zone, cluster_levels, find_pivots,
+                                                      get_support_resistance, level_prices, trade_zone)
+
+
+def legacy_pivots(dates, highs, lows, left, right):
+    # The previous per-bar implementation
+    def is_pivot_high(idx):
+        if idx < left or idx + right >= len(highs):
+            return False
+        return highs[idx] == max(highs[idx - left:idx + right + 1])
+
+    def is_pivot_low(idx):
+        if idx < left or idx + right >= len(lows):
+            return False
+        return lows[idx] == min(lows[idx - left:idx + right + 1])
+
+    resistances = [(dates[i], float(highs[i])) for i in range(len(highs)) if is_pivot_high(i)]
+    supports = [(dates[i], float(lows[i])) for i in range(len(lows)) if is_pivot_low(i)]
+    return supports, resistances
+
+
+def legacy_trade_zone(current_price1, supports1, resistances1, tolerance=5):
+    for _, support in supports1:
+        if abs(current_price1 - support) <= tolerance:
+            return "on support"
+    for _, resistance in resistances1:
+        if abs(current_price1 - resistance) <= tolerance:
+            return "on resistance"
+    return "no trade"
+
+
+def random_bars(count, seed=0):
+    # Prices on the 0.05 tick, so equal highs/lows (ties) occur as they do in real data
+    rng = np.random.default_rng(seed)
+    closes = np.round((22000 + np.cumsum(rng.normal(0, 3, count))) / 0.05) * 0.05
+    highs = closes + np.round(rng.random(count) * 10 / 0.05) * 0.05
+    lows = closes - np.round(rng.random(count) * 10 / 0.05) * 0.05
+    return [str(i) for i in range(count)], highs, lows
+
+
+@pytest.mark.parametrize('left, right', [(15, 15), (1, 1), (0, 3), (5, 2), (3, 0)])
+def test_pivots_match_the_loop_implementation(left, right):
+    dates, highs, lows = random_bars(5000, seed=left * 10 + right)
+    assert find_pivots(dates, highs, lows, left, right) == legacy_pivots(dates, highs, lows, left, right)
+
+
+def test_pivots_with_ties_match_the_loop_implementation():
+    dates = [str(i) for i in range(40)]
+    highs = np.tile([1.0, 2.0, 2.0, 1.0], 10)
+    lows = np.tile([1.0, 1.0, 2.0, 2.0], 10)
+    assert find_pivots(dates, highs, lows, 2, 2) == legacy_pivots(dates, highs, lows, 2, 2)
+
+
+@pytest.mark.parametrize('count', [0, 1, 30, 31, 32])
+def test_pivots_near_the_window_length(count):
+    dates, highs, lows = random_bars(count, seed=count)
+    assert find_pivots(dates, highs, lows) == legacy_pivots(dates, highs, lows, 15, 15)
+
+
+def test_trade_zone_matches_the_linear_scan():
+    dates, highs, lows = random_bars(20000, seed=3)
+    supports, resistances = find_pivots(dates, highs, lows)
+    support_prices, resistance_prices = level_prices(supports), level_prices(resistances)
+    for price in (highs + lows)[::7] / 2:
+        assert trade_zone(price, support_prices, resistance_prices) == legacy_trade_zone(price, supports, resistances)
+
+
+def test_trade_zone_tolerance_is_inclusive_and_support_wins():
+    supports, resistances = [('a', 100.0)], [('b', 103.0)]
+    assert check_trade_zone(105.0, supports, resistances) == "on support"
+    assert check_trade_zone(108.0, supports, resistances) == "on resistance"
+    assert check_trade_zone(108.5, supports, resistances) == "no trade"
+    assert check_trade_zone(100.0, [], []) == "no trade"
+
+
+def test_cluster_levels():
+    levels = [('a', 100.0), ('b', 104.0), ('c', 110.0), ('d', 111.0), ('e', 130.0)]
+    assert cluster_levels(levels, tolerance=10) == [
+        {'low': 100.0, 'high': 110.0, 'level': pytest.approx(314 / 3), 'touches': 3},
+        {'low': 111.0, 'high': 111.0, 'level': 111.0, 'touches': 1},
+        {'low': 130.0, 'high': 130.0, 'level': 130.0, 'touches': 1},
+    ]
+    assert cluster_levels([]) == []
+
+
+def test_invalid_unit_is_reported():
+    assert 'error' in get_support_resistance(1, 'weeks')
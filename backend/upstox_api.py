@@ -2,12 +2,16 @@ import requests
 import gzip
 import json
 import io
+import os
 from functools import lru_cache
 import numpy as np
 import datetime
+from instrument_snapshot import InstrumentSnapshot
 from logger_config import get_logger
 
 INSTRUMENTS_URL = "https://assets.upstox.com/market-quote/instruments/exchange/NSE.json.gz"
+# Optional snapshot of NSE.json.gz, built with: python instrument_snapshot.py build --source <url> --out <path>
+NSE_SNAPSHOT = os.environ.get("NSE_SNAPSHOT", os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'NSE.snap'))
 
 # Get logger instance
 logger = get_logger(__name__)
@@ -16,8 +20,19 @@ logger = get_logger(__name__)
 def get_nifty_50_instrument_key():
     """
     Downloads the instruments file from Upstox, finds the instrument key for Nifty 50,
-    and caches the result.
+    and caches the result. A prebuilt NSE snapshot is used instead of the download if present.
     """
+    if os.path.exists(NSE_SNAPSHOT):
+        try:
+            snapshot = InstrumentSnapshot(NSE_SNAPSHOT)
+            rows = snapshot.select(name='Nifty 50', instrument_type='INDEX', segment='NSE_INDEX')
+            if len(rows):
+                logger.info("Found Nifty 50 instrument key in snapshot")
+                return str(snapshot.columns['instrument_key'][rows[0]])
+            logger.warning(f"Nifty 50 not found in {NSE_SNAPSHOT}, downloading instruments file")
+        except Exception as e:
+            logger.error(f"Error reading instrument snapshot {NSE_SNAPSHOT}, downloading instruments file: {e}",
+                         exc_info=True)
     try:
         response = requests.get(INSTRUMENTS_URL)
         response.raise_for_status()
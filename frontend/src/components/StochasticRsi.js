@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import axios from '../config/axios';
+import { subscribeSnapshot } from '../config/snapshotStream';
 import { Typography, Box, Table, TableBody, TableCell, TableContainer, TableRow, Paper, CircularProgress, Collapse, IconButton } from '@mui/material';
 import ArrowUpwardIcon from '@mui/icons-material/ArrowUpward';
 import ArrowDownwardIcon from '@mui/icons-material/ArrowDownward';
@@ -13,26 +13,18 @@ const StochasticRsi = () => {
   const [isTableVisible, setTableVisible] = useState(false);
 
   useEffect(() => {
-    let intervalId;
-
-    const fetchData = async () => {
-      setLoading(true);
-      try {
-        const response = await axios.get(`/api/stochrsi_nifty50_5m`);
-        setData(response.data);
-        setError(null);
-        console.log('Stochastic RSI API response:', response.data);
-      } catch (err) {
-        setError('Failed to fetch Stochastic RSI 14: ' + err.message);
-      } finally {
-        setLoading(false);
+    // Pushed by the backend once per poll cycle instead of polled per component
+    const unsubscribe = subscribeSnapshot((snapshot) => {
+      if (snapshot.stochrsi === null || snapshot.stochrsi === undefined) {
+        setData({ error: 'Not enough data to calculate Stochastic RSI' });
+      } else {
+        setData({ stochrsi: snapshot.stochrsi, analysis: snapshot.stochrsi_analysis, timestamp: snapshot.taken_at });
       }
-    };
-
-    fetchData(); // Initial fetch
-    intervalId = setInterval(fetchData, 60000); // Poll every 60 seconds
+      setError(null);
+      setLoading(false);
+    });
 
-    return () => clearInterval(intervalId); // Cleanup on unmount
+    return unsubscribe; // Cleanup on unmount
   }, []);
 
   const handleToggleTable = () => {
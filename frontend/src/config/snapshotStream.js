@@ -0,0 +1,72 @@
+import axios from './axios';
+
+// One shared server-sent-events connection to /api/v1/stream for the whole app.
+// The backend sends a full snapshot first, then one delta per poll cycle:
+//   { type: 'snapshot', version, data }
+//   { type: 'delta', version, base, changed: [[path, value], ...], removed: [path, ...] }
+// EventSource reconnects by itself, and the backend starts every connection with a full snapshot.
+
+let eventSource = null;
+let snapshot = null;
+let version = 0;
+const listeners = new Set();
+
+const applyDelta = (state, changed, removed) => {
+  const next = structuredClone(state);
+  removed.forEach((path) => {
+    const parent = path.slice(0, -1).reduce((node, key) => node[key], next);
+    delete parent[path[path.length - 1]];
+  });
+  for (const [path, value] of changed) {
+    if (path.length === 0) {
+      return value;
+    }
+    const parent = path.slice(0, -1).reduce((node, key) => (node[key] ??= {}), next);
+    parent[path[path.length - 1]] = value;
+  }
+  return next;
+};
+
+const handleMessage = (event) => {
+  const message = JSON.parse(event.data);
+  if (message.type === 'snapshot') {
+    snapshot = message.data;
+  } else if (snapshot !== null && message.base === version) {
+    snapshot = applyDelta(snapshot, message.changed, message.removed);
+  } else {
+    // Missed a delta: reconnect to get a fresh full snapshot
+    eventSource.close();
+    eventSource = null;
+    connect();
+    return;
+  }
+  version = message.version;
+  listeners.forEach((listener) => listener(snapshot));
+};
+
+const connect = () => {
+  if (eventSource) {
+    return;
+  }
+  const baseURL = (axios.defaults.baseURL || '/').replace(/\/$/, '');
+  eventSource = new EventSource(`${baseURL}/api/v1/stream`);
+  eventSource.onmessage = handleMessage;
+};
+
+// Calls listener with every new snapshot (and the current one, if any). Returns an unsubscribe function.
+export const subscribeSnapshot = (listener) => {
+  listeners.add(listener);
+  connect();
+  if (snapshot !== null) {
+    listener(snapshot);
+  }
+  return () => {
+    listeners.delete(listener);
+    if (listeners.size === 0 && eventSource) {
+      eventSource.close();
+      eventSource = null;
+      snapshot = null;
+      version = 0;
+    }
+  };
+};